@@ -0,0 +1,78 @@
+"""
+Compares enriching flights data with coordinates and timezones of their airports by
+pd.merge() on IATA codes with gathering rows of the airport details by airport codes.
+Results of both are checked to be the same.
+
+Run from the src directory: python -m benchmarks.airport_details [rows]
+"""
+import os
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+
+from utils.data_preparation.constants import AIRPORTS_DETAILS_FILE
+from utils.data_preparation.dictionaries import load_dictionaries
+from utils.data_preparation.load_airports_additional import (
+    airport_details,
+    load_airports_details,
+)
+from utils.data_preparation.storage import read_partition
+
+from .helpers import write_years, measure, report, YEAR_ROWS
+
+COLUMNS = ["lat", "lon", "tz"]
+
+
+def write_details(dir: str) -> None:
+    # openflights lists some airports of the flights data only, and a lot of others
+    rng = np.random.default_rng(42)
+    codes = list(load_dictionaries(dir)["airport"][::3]) + [
+        f"X{i:03d}" for i in range(7000)
+    ]
+    zones = np.array(["America/New_York", "America/Chicago", "America/Los_Angeles"])
+    details = pd.DataFrame(
+        {
+            "airportID": np.arange(len(codes)),
+            "name": [f"{code} Airport" for code in codes],
+            "city": "City",
+            "country": "United States",
+            "iata": codes,
+            "icao": ["K" + code for code in codes],
+            "lat": rng.uniform(25, 49, len(codes)).round(4),
+            "lon": rng.uniform(-125, -67, len(codes)).round(4),
+            "altitude": rng.integers(0, 5000, len(codes)),
+            "timezone": -5,
+            "dst": "A",
+            "tz": zones[rng.integers(0, len(zones), len(codes))],
+            "type": "airport",
+            "source": "OurAirports",
+        }
+    )
+    details.to_csv(os.path.join(dir, AIRPORTS_DETAILS_FILE), header=False, index=False)
+
+
+def merge(flights: pd.DataFrame, details: pd.DataFrame) -> pd.DataFrame:
+    details = details[["iata"] + COLUMNS].drop_duplicates(subset=["iata"])
+    return pd.merge(
+        flights, details, how="left", left_on="Origin", right_on="iata"
+    ).drop(columns=["Origin", "iata"])
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else YEAR_ROWS
+
+    with tempfile.TemporaryDirectory() as dir:
+        paths = write_years(dir, [2007], rows)
+        write_details(dir)
+        seconds, details = measure(load_airports_details, dir, repeat=1)
+        report("prepare airport details", seconds)
+
+        flights = read_partition(paths[0], ["Origin"])
+        baseline, expected = measure(merge, flights, details)
+        seconds, result = measure(airport_details, flights["Origin"], COLUMNS, dir)
+        expected["tz"] = expected["tz"].astype(result["tz"].dtype)
+        pd.testing.assert_frame_equal(result, expected)
+        print(f"{rows} flights")
+        report("pd.merge() on IATA codes", baseline)
+        report("airport_details()", seconds, baseline)
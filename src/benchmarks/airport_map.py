@@ -0,0 +1,106 @@
+"""
+Compares the map of airports drawn by geopandas, reading the naturalearth shapefile and
+merging airports data every time, with the one drawn out of the stored basemap and
+airport geometry tables kept in memory. Both maps are checked to render the same image.
+
+Run from the src directory: python -m benchmarks.airport_map
+"""
+import io
+import tempfile
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from matplotlib.collections import PatchCollection
+from matplotlib.patches import PathPatch
+
+from utils.data_preparation.constants import FLIGHTS_CATEGORIES
+from utils.data_preparation.dictionaries import save_dictionaries
+from utils.data_preparation.geometry import airport_geometry, load_basemap
+from utils.data_preparation.load_data import load_airports
+from utils.data_preparation.storage import partition_path, write_partition
+
+from .helpers import measure, report
+
+AIRPORTS = 3000
+
+
+def write_airports(dir: str) -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    codes = pd.Index([f"A{i:04d}" for i in range(AIRPORTS)])
+    airports = pd.DataFrame(
+        {
+            "iata": codes,
+            "city": [f"City {i}" for i in range(AIRPORTS)],
+            "lat": rng.uniform(25, 49, AIRPORTS).astype(np.float32),
+            "long": rng.uniform(-125, -67, AIRPORTS).astype(np.float32),
+        }
+    )
+    write_partition(airports, partition_path("airports", dir))
+    save_dictionaries({FLIGHTS_CATEGORIES["Origin"]: codes}, dir)
+    # airports with their numbers of flights, the most popular first
+    counts = rng.pareto(1, AIRPORTS) * 1000
+    return pd.DataFrame({"Airport": codes, "Combined": counts}).sort_values(
+        "Combined", ascending=False
+    )
+
+
+def render(fig) -> bytes:
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="raw")
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+def geopandas_map(counts: pd.DataFrame, dir: str) -> plt.Figure:
+    dt = pd.merge(counts, load_airports(dir), left_on="Airport", right_on="iata")
+    fig, ax = plt.subplots(figsize=(15, 15))
+    world = gpd.read_file(gpd.datasets.get_path("naturalearth_lowres"))
+    usa = world[world["name"] == "United States of America"]
+    usa.plot(ax=ax, color="white", edgecolor="black", alpha=0.5)
+    points = gpd.GeoDataFrame(dt, geometry=gpd.points_from_xy(dt["long"], dt["lat"]))
+    points.plot(ax=ax, markersize=points["Combined"] / 100, color="red", alpha=0.5)
+    for x, y, label in zip(points["long"][:20], points["lat"][:20], points["city"]):
+        ax.annotate(label, xy=(x, y), xytext=(4, -4), textcoords="offset points")
+    return fig
+
+
+def cached_map(counts: pd.DataFrame, dir: str) -> plt.Figure:
+    points = airport_geometry(dir).iloc[np.arange(AIRPORTS)[counts.index]]
+    fig, ax = plt.subplots(figsize=(15, 15))
+    basemap = [PathPatch(path) for path in load_basemap(dir)]
+    ax.add_collection(
+        PatchCollection(basemap, facecolor="white", edgecolor="black", alpha=0.5),
+        autolim=True,
+    )
+    ax.autoscale_view()
+    ax.set_aspect("equal")
+    ax.scatter(
+        points["long"].values.astype(np.float64),
+        points["lat"].values.astype(np.float64),
+        s=counts["Combined"].values / 100,
+        color="red",
+        marker="o",
+        alpha=0.5,
+    )
+    for x, y, label in zip(points["long"][:20], points["lat"][:20], points["city"]):
+        ax.annotate(label, xy=(x, y), xytext=(4, -4), textcoords="offset points")
+    return fig
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as dir:
+        counts = write_airports(dir)
+        seconds, _ = measure(
+            lambda: (load_basemap(dir), airport_geometry(dir)), repeat=1
+        )
+        report("prepare basemap and airport geometry", seconds)
+
+        baseline, expected = measure(geopandas_map, counts, dir)
+        seconds, result = measure(cached_map, counts, dir)
+        assert render(result) == render(expected), "Maps differ"
+        report(f"geopandas map of {AIRPORTS} airports", baseline)
+        report("cached map", seconds, baseline)
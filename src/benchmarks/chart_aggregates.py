@@ -0,0 +1,102 @@
+"""
+Compares computing the aggregates of all the charts with separate scans of loaded flights data,
+the way every chart used to do it, with chart_aggregates(), which generate_charts() computes them with
+out of the per-year rollups stored by prepare_data(), one year at a time. Aggregates of both are
+checked to be the same.
+
+Run from the src directory: python -m benchmarks.chart_aggregates [rows per year]
+"""
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+
+from utils.charts import chart_aggregates
+from utils.data_preparation.load_data import prepare_data
+from utils.data_preparation.storage import list_partitions, read_partitions
+
+from .helpers import write_years, peak_memory, measure, report, YEAR_ROWS
+
+
+def per_chart(paths) -> dict:
+    """
+    Aggregates of the charts computed by separate scans of loaded flights (previous implementation)
+
+    :param paths: paths of the year partitions
+    :returns: mapping of chart name into its aggregates
+    """
+    flights = read_partitions(paths)
+    cancelled = flights[~(flights["Cancelled"] == 0)]
+    month = flights["Departure"].dt.month
+    return {
+        "chart_1": flights.groupby("UniqueCarrier")["CRSElapsedTime"].sum(),
+        "chart_2": flights.groupby("UniqueCarrier")[["DepDelay", "ArrDelay"]].max(),
+        "chart_4": cancelled.groupby(["UniqueCarrier"])["Cancelled"].count(),
+        "chart_5": cancelled.groupby(["CancellationCode"])["CancellationCode"].count(),
+        "chart_6": flights.groupby([flights["Arrival"].dt.floor("D"), "DayOfWeek"])[
+            "DayOfWeek"
+        ].count(),
+        "chart_7": flights.groupby(["Route", "Cancelled"], observed=True)[
+            "TailNum"
+        ].count(),
+        "chart_8": (
+            flights.groupby(month)["DepDelay"].count(),
+            flights.groupby(month)["ArrDelay"].sum(),
+            flights.groupby(month)["DepDelay"].sum(),
+        ),
+        "chart_9": [
+            flights[~pd.isna(flights[name])][name].dt.hour.value_counts().sort_index()
+            for name in ["Departure", "Arrival"]
+        ],
+        "chart_10": flights["UniqueCarrier"].value_counts(),
+        "chart_11": (flights["Dest"].value_counts(), flights["Origin"].value_counts()),
+    }
+
+
+def check(expected: dict, aggregates: dict) -> None:
+    """
+    Asserts that aggregates of chart_aggregates() hold the same values as the ones computed chart by chart
+
+    :param expected: result of per_chart()
+    :param aggregates: result of chart_aggregates()
+    """
+
+    def same(a: pd.Series, b: pd.Series) -> None:
+        a, b = a[a.fillna(1) != 0], b[b.fillna(1) != 0]  # counts of absent keys
+        b = b.reindex(a.index)
+        assert np.allclose(a.values, b.values, equal_nan=True), a.name
+
+    same(expected["chart_1"], aggregates["chart_1"]["elapsed"])
+    for col in ["DepDelay", "ArrDelay"]:
+        same(expected["chart_2"][col], aggregates["chart_2"][col])
+    same(expected["chart_4"], aggregates["chart_4"]["cancelled"])
+    same(expected["chart_5"], aggregates["chart_5"]["causes"])
+    same(expected["chart_6"], aggregates["chart_6"]["days"])
+    same(expected["chart_7"], aggregates["chart_7"]["routes"])
+    for e, key in zip(expected["chart_8"], ["flights", "arr_delay", "dep_delay"]):
+        same(e, aggregates["chart_8"][key])
+    for e, key in zip(expected["chart_9"], ["Departure", "Arrival"]):
+        same(e, aggregates["chart_9"][key])
+    same(expected["chart_10"].sort_index(), aggregates["chart_10"]["carriers"])
+    for e, key in zip(expected["chart_11"], ["Dest", "Origin"]):
+        same(e.sort_index(), aggregates["chart_11"][key])
+
+
+def run(paths) -> None:
+    baseline, expected = measure(per_chart, paths, repeat=1)
+    report("load + separate scans per chart", baseline)
+    seconds, aggregates = measure(chart_aggregates, paths, cache=None)
+    check(expected, aggregates)
+    report("chart_aggregates() of the rollups", seconds, baseline)
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else YEAR_ROWS // 7
+
+    with tempfile.TemporaryDirectory() as dir:
+        peak_memory(write_years, dir, [1988, 1989, 1990], rows)
+        # rollups of the years are built the way prepare_data() backfills them
+        peak_memory(prepare_data, dir)
+        print(f"3 years, {rows} rows each")
+        # run in a separate process, so memory of the written data is released
+        peak_memory(run, list_partitions("all", dir))
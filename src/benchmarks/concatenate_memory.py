@@ -0,0 +1,76 @@
+"""
+Compares peak memory of concatenate() with its previous implementation, which
+re-encoded categorical columns of the input frames in place and copied everything
+once more in pd.concat. Inputs are years of flights data encoded with the dataset
+wide dictionaries (as they are loaded) and with categories of their own.
+
+Run from the src directory: python -m benchmarks.concatenate_memory [rows per year]
+"""
+import sys
+import tempfile
+import pandas as pd
+
+from typing import List
+
+from utils.data_preparation.constants import THRESHOLD
+from utils.data_preparation.optimize import concatenate
+from utils.data_preparation.storage import read_partition
+
+from .helpers import write_years, peak_memory, report_memory, YEAR_ROWS
+
+
+def concatenate_previous(
+    dfs: List[pd.DataFrame], threshold: int = THRESHOLD
+) -> pd.DataFrame:
+    """
+    Previous implementation of concatenate()
+    """
+    assert len(dfs) >= 1, "dfs cannot be empty"
+    target_size = sum([df.shape[0] for df in dfs])
+
+    for col in dfs[-1].select_dtypes(include="category").columns:
+        # if not category than it must have been all empty
+        uc = pd.api.types.union_categoricals(
+            [df[col] for df in dfs if df[col].dtype == "category"]
+        )
+        if len(uc.categories) / target_size <= threshold / 100.0:
+            for df in dfs:
+                df[col] = pd.Categorical(df[col].values, categories=uc.categories)
+    return pd.concat(dfs, ignore_index=True)
+
+
+def own_categories(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Replaces categories of df with the values present in it, as in data prepared per year.
+    They are ordered by first appearance, so they differ between years even if all values are present.
+    """
+    for col in df.select_dtypes(include="category").columns:
+        df[col] = df[col].cat.set_categories(df[col].dropna().unique().tolist())
+    return df
+
+
+def run(func, dfs: List[pd.DataFrame]) -> int:
+    return len(func(dfs))
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else YEAR_ROWS // 14
+
+    for n_years in [2, 5, 22]:
+        with tempfile.TemporaryDirectory() as dir:
+            years = list(range(1987, 1987 + n_years))
+            _, _, paths = peak_memory(write_years, dir, years, rows)
+
+            for name, prepare in [
+                ("shared", lambda df: df),
+                ("own", own_categories),
+            ]:
+                dfs = [prepare(read_partition(path)) for path in paths]
+                size = sum(df.memory_usage(deep=True).sum() for df in dfs)
+                print(
+                    f"{n_years} years, {rows} rows each, {name} categories, {size / 2**20:.1f} MiB"
+                )
+                for func in [concatenate_previous, concatenate]:
+                    seconds, peak, _ = peak_memory(run, func, dfs)
+                    report_memory(func.__name__, seconds, peak, size)
+                del dfs
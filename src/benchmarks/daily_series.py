@@ -0,0 +1,69 @@
+"""
+Compares the aggregates of the "Planned Flights over Time" chart and weekly and monthly time series
+computed out of flights data of several years with the ones computed out of their daily time series,
+including loading either of them. Results of both are checked to be the same.
+
+Run from the src directory: python -m benchmarks.daily_series [rows per year]
+"""
+import os
+import sys
+import tempfile
+import numpy as np
+
+from utils.data_preparation.storage import read_partitions
+from utils.data_preparation.timeseries import (
+    daily_path,
+    load_daily,
+    resample_daily,
+    write_daily,
+)
+
+from .helpers import write_years, measure, report, YEAR_ROWS
+
+
+def days_of_flights(paths):
+    flights = read_partitions(paths, ["Arrival", "DayOfWeek"])
+    return flights.groupby([flights["Arrival"].dt.date, "DayOfWeek"])[
+        "DayOfWeek"
+    ].count()
+
+
+def days_of_series(dir):
+    daily = load_daily("all", dir)
+    return daily.set_index(["Day", "DayOfWeek"])["count"]
+
+
+def resample_flights(paths, rule):
+    flights = read_partitions(paths, ["Arrival", "ArrDelay"])
+    resampled = flights.set_index("Arrival").resample(rule, label="left", closed="left")
+    return resampled["ArrDelay"].mean().dropna()
+
+
+def resample_series(dir, freq):
+    return resample_daily(load_daily("all", dir), freq)["ArrDelay_mean"].dropna()
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else YEAR_ROWS // 7
+
+    with tempfile.TemporaryDirectory() as dir:
+        years = list(range(1988, 1992))
+        paths = write_years(dir, years, rows)
+        seconds, _ = measure(lambda: [write_daily(path) for path in paths], repeat=1)
+        size = sum(os.path.getsize(daily_path(path)) for path in paths)
+        print(f"{len(years)} years, {rows} rows each")
+        report(f"build daily time series ({size / 2**10:.0f} KiB)", seconds)
+
+        baseline, expected = measure(days_of_flights, paths, repeat=1)
+        seconds, result = measure(days_of_series, dir)
+        assert np.array_equal(expected.values, result.values), "Days differ"
+        report("flights per day of flights data", baseline)
+        report("flights per day of the time series", seconds, baseline)
+
+        for freq, rule in [("week", "W-MON"), ("month", "MS")]:
+            baseline, expected = measure(resample_flights, paths, rule, repeat=1)
+            seconds, result = measure(resample_series, dir, freq)
+            assert np.allclose(expected.values, result.values), "Means differ"
+            assert expected.index.equals(result.index), "Periods differ"
+            report(f"{freq}ly mean delays of flights data", baseline)
+            report(f"{freq}ly mean delays of the time series", seconds, baseline)
@@ -0,0 +1,94 @@
+"""
+Compares the delay distribution plots drawn by seaborn out of flights data of several years
+with the ones drawn out of their t-digests, including loading either of them.
+Sizes of the digests and the worst rank errors of their quartiles are reported too.
+
+Run from the src directory: python -m benchmarks.delay_digests [rows per year]
+"""
+import os
+import sys
+import tempfile
+import numpy as np
+import seaborn as sns
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+from utils.charts.distributions import digest_boxplot, digest_violinplot
+from utils.charts.constants import SEASONS
+from utils.data_preparation.cube import time_part
+from utils.data_preparation.digests import (
+    digest_path,
+    load_digests,
+    merge_digests,
+    quantiles,
+    write_digests,
+)
+from utils.data_preparation.storage import read_partitions
+
+from .helpers import write_years, measure, report, YEAR_ROWS
+
+COLUMNS = ["UniqueCarrier", "Departure", "DepDelay", "ArrDelay"]
+
+
+def boxplot_flights(paths):
+    flights = read_partitions(paths, COLUMNS)
+    sns.boxplot(y="UniqueCarrier", x="DepDelay", data=flights, orient="h")
+    plt.close()
+    return flights
+
+
+def boxplot_digests(dir):
+    digest = load_digests("all", ["DepDelay"], dir)
+    digest_boxplot(digest, "DepDelay")
+    plt.close()
+    return digest
+
+
+def violinplot_flights(paths):
+    flights = read_partitions(paths, COLUMNS)
+    flights["Season"] = time_part(flights["Departure"], "month")
+    flights["Season"] = flights["Season"].map(SEASONS)
+    sns.violinplot(x="Season", y="ArrDelay", data=flights, scale="count")
+    plt.close()
+
+
+def violinplot_digests(dir):
+    digest_violinplot(load_digests("all", ["ArrDelay"], dir), "ArrDelay")
+    plt.close()
+
+
+def rank_errors(flights, digest) -> float:
+    estimates = merge_digests([digest.drop(columns="Month")])
+    estimates = quantiles(estimates, [0.25, 0.5, 0.75])
+    worst = 0
+    for carrier, values in flights.groupby("UniqueCarrier", observed=True):
+        values = np.sort(values["DepDelay"].dropna().values)
+        q = estimates.loc[(carrier, "DepDelay")]
+        ranks = np.searchsorted(values, q.values) / len(values)
+        worst = max(worst, np.abs(ranks - q.index.values).max())
+    return worst
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else YEAR_ROWS // 7
+
+    with tempfile.TemporaryDirectory() as dir:
+        years = list(range(1988, 1992))
+        paths = write_years(dir, years, rows)
+        seconds, _ = measure(lambda: [write_digests(path) for path in paths], repeat=1)
+        size = sum(os.path.getsize(digest_path(path)) for path in paths)
+        print(f"{len(years)} years, {rows} rows each")
+        report(f"build digests ({size / 2**20:.1f} MiB)", seconds)
+
+        baseline, flights = measure(boxplot_flights, paths, repeat=1)
+        seconds, digest = measure(boxplot_digests, dir, repeat=1)
+        report("sns.boxplot of flights data", baseline)
+        report("digest_boxplot", seconds, baseline)
+        print(f"worst rank error of the quartiles {rank_errors(flights, digest):.4f}")
+
+        baseline, _ = measure(violinplot_flights, paths, repeat=1)
+        seconds, _ = measure(violinplot_digests, dir, repeat=1)
+        report("sns.violinplot of flights data", baseline)
+        report("digest_violinplot", seconds, baseline)
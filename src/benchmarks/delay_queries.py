@@ -0,0 +1,109 @@
+"""
+Compares the grouped delay statistics of queries_results computed out of flights data
+with the ones answered out of statistics stored for every year, see run_query(),
+and with updating the answer once a new year is added. Results are checked to be the same.
+Given a directory of prepared flights data instead, results of the queries answered out of it
+are compared with the ones checked in queries_results.
+
+Run from the src directory: python -m benchmarks.delay_queries [rows per year | data directory]
+"""
+import os
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+
+from utils.data_preparation.constants import DELAY_STATS_COLUMNS, QUERIES_RESULTS_DIR
+from utils.data_preparation.delay_stats import (
+    QUERIES,
+    delay_stats_path,
+    query_results,
+    run_query,
+    write_delay_stats,
+)
+from utils.data_preparation.dimensions import enrich
+from utils.data_preparation.storage import read_partitions
+
+from .dimension_joins import write_dimensions
+from .helpers import write_years, measure, report, YEAR_ROWS
+
+
+def scan(paths, query, dir):
+    flights = read_partitions(paths, ["UniqueCarrier", "TailNum"] + DELAY_STATS_COLUMNS)
+    attributes = [key for key in query.keys if key not in flights.columns]
+    if len(attributes) > 0:
+        flights = pd.concat(
+            [flights, enrich(flights, {"TailNum": attributes}, dir)], axis=1
+        )
+    results = {}
+    for col in DELAY_STATS_COLUMNS:
+        values = flights[col]
+        grouped = pd.DataFrame(
+            {"value": values, "positive": (values > 0).where(values.notna())}
+        ).groupby([flights[key] for key in query.keys], observed=True)
+        results[f"mean_{col}"] = grouped["value"].mean()
+        results[f"percentage_delayed_by_{col}"] = grouped["positive"].mean() * 100
+    return pd.DataFrame(results).reset_index()
+
+
+def check(results, expected, keys) -> None:
+    merged = pd.merge(results, expected, on=keys, suffixes=("", "_expected"))
+    assert len(merged) == len(results) == len(expected), "Groups differ"
+    for col in results.columns[len(keys) :]:
+        np.testing.assert_allclose(merged[col], merged[col + "_expected"], rtol=1e-6)
+
+
+def compare(dir: str, decimals: int = 2) -> None:
+    """
+    Prints how far results of the queries answered out of prepared data are from the ones
+    checked in QUERIES_RESULTS_DIR, columns of both are rounded the same way
+
+    :param dir: directory of prepared flights data, e.g. DATASETS_FOLDER
+    :param decimals: number of decimals the checked in results are rounded to
+    """
+    for name, query in QUERIES.items():
+        results = query_results(run_query(query, dir)).round(decimals)
+        checked = pd.read_csv(os.path.join(QUERIES_RESULTS_DIR, name + ".csv"))
+        results[query.keys] = results[query.keys].astype(str)
+        checked[query.keys] = checked[query.keys].astype(str)
+        merged = pd.merge(checked, results, on=query.keys, suffixes=("", "_new"))
+        print(f"{name}: {len(merged)} of {len(checked)} groups found")
+        for col in checked.columns[len(query.keys) :]:
+            diff = np.abs(merged[col] - merged[col + "_new"]).max()
+            print(f"  {col:45s} max difference {diff:.2f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and os.path.isdir(sys.argv[1]):
+        compare(sys.argv[1])
+        sys.exit()
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else YEAR_ROWS // 2
+
+    with tempfile.TemporaryDirectory() as dir:
+        years = list(range(2003, 2008))
+        paths = write_years(dir, years, rows)
+        write_dimensions(dir)
+        seconds, _ = measure(
+            lambda: [write_delay_stats(path) for path in paths], repeat=1
+        )
+        size = sum(os.path.getsize(delay_stats_path(path)) for path in paths)
+        print(f"{len(years)} years, {rows} rows each")
+        report(f"build statistics ({size / 2**20:.1f} MiB)", seconds)
+
+        for name, query in QUERIES.items():
+            print(f"{name}:")
+            baseline, expected = measure(scan, paths, query, dir, repeat=1)
+            seconds, state = measure(run_query, query, dir)
+            check(query_results(state), expected, query.keys)
+            report("scan of flights data", baseline)
+            report("run_query()", seconds, baseline)
+
+            # the last year is added after the query was answered
+            last = paths.pop()
+            os.rename(last, last + ".new")
+            state = run_query(query, dir)
+            os.rename(last + ".new", last)
+            paths.append(last)
+            seconds, state = measure(run_query, query, dir, state=state, repeat=1)
+            check(query_results(state), expected, query.keys)
+            report("run_query() of a new year", seconds, baseline)
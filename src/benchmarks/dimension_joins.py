@@ -0,0 +1,85 @@
+"""
+Compares enriching flights data with attributes of their planes and carriers by pd.merge()
+with gathering rows of the dimension tables by codes of TailNum and UniqueCarrier, see enrich().
+Some tail numbers have no plane data, results of both are checked to be the same.
+
+Run from the src directory: python -m benchmarks.dimension_joins [rows]
+"""
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+
+from utils.data_preparation.dictionaries import load_dictionaries
+from utils.data_preparation.dimensions import enrich
+from utils.data_preparation.storage import (
+    partition_path,
+    read_partition,
+    write_partition,
+)
+
+from .helpers import write_years, measure, report, YEAR_ROWS
+
+ATTRIBUTES = {
+    "TailNum": ["aircraft_type", "engine_type", "year"],
+    "UniqueCarrier": ["Description"],
+}
+
+
+def write_dimensions(dir: str) -> None:
+    rng = np.random.default_rng(42)
+    dictionaries = load_dictionaries(dir)
+    tail_nums = dictionaries["tail_num"][
+        rng.random(len(dictionaries["tail_num"])) < 0.9
+    ]
+    planes = pd.DataFrame(
+        {
+            "tailnum": tail_nums,
+            "aircraft_type": pd.Categorical(
+                np.array(["Fixed Wing Multi-Engine", "Rotorcraft"])[
+                    rng.integers(0, 2, len(tail_nums))
+                ]
+            ),
+            "engine_type": pd.Categorical(
+                np.array(["Turbo-Fan", "Turbo-Jet", "Turbo-Prop"])[
+                    rng.integers(0, 3, len(tail_nums))
+                ]
+            ),
+            "year": rng.integers(1960, 2008, len(tail_nums)).astype(np.uint16),
+        }
+    )
+    write_partition(planes, partition_path("plane-data", dir))
+    carriers = dictionaries["carrier"]
+    carriers = pd.DataFrame({"Code": carriers, "Description": carriers + " Airlines"})
+    write_partition(carriers, partition_path("carriers", dir))
+
+
+def merge(flights: pd.DataFrame, dir: str) -> pd.DataFrame:
+    planes = read_partition(partition_path("plane-data", dir))
+    carriers = read_partition(partition_path("carriers", dir))
+    flights = pd.merge(
+        flights, planes, how="left", left_on="TailNum", right_on="tailnum"
+    )
+    flights = pd.merge(
+        flights, carriers, how="left", left_on="UniqueCarrier", right_on="Code"
+    )
+    return flights[[col for cols in ATTRIBUTES.values() for col in cols]]
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else YEAR_ROWS
+
+    with tempfile.TemporaryDirectory() as dir:
+        paths = write_years(dir, [2007], rows)
+        write_dimensions(dir)
+        flights = read_partition(paths[0], list(ATTRIBUTES))
+        seconds, _ = measure(enrich, flights.iloc[:0], ATTRIBUTES, dir, repeat=1)
+        report("prepare dimension indexes", seconds)
+
+        baseline, expected = measure(merge, flights, dir)
+        seconds, result = measure(enrich, flights, ATTRIBUTES, dir)
+        expected["year"] = expected["year"].astype(np.float64)
+        pd.testing.assert_frame_equal(result, expected)
+        print(f"{rows} flights")
+        report("pd.merge() on TailNum and UniqueCarrier", baseline)
+        report("enrich()", seconds, baseline)
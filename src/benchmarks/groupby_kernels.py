@@ -0,0 +1,72 @@
+"""
+Compares pandas groupby() with the numpy grouped aggregation kernels on the small dense keys
+the charts group by (carriers, months, hours, days of week and cancellation codes),
+then the chart rollups switched between both. Results of both are checked to be the same.
+
+Run from the src directory: python -m benchmarks.groupby_kernels [rows]
+"""
+import sys
+import tempfile
+import importlib
+import pandas as pd
+
+from utils.charts import aggregates, CHARTS
+from utils.data_preparation.cube import build_cube, build_rollups, cube_keys
+from utils.data_preparation.kernels import KERNELS, groupby_aggregate
+from utils.data_preparation.storage import read_partition
+
+from .helpers import write_years, measure, report, YEAR_ROWS
+
+KEYS = ["UniqueCarrier", "Month", "DepHour", "DayOfWeek", "CancellationCode"]
+VALUES = ["DepDelay", "ArrDelay", "CRSElapsedTime"]
+ROLLUPS = ["rollup_1", "rollup_2", "rollup_4", "rollup_8", "rollup_9"]
+
+
+def kernels(flights: pd.DataFrame) -> None:
+    for key in KEYS:
+        print(f"{key}:")
+        for how in KERNELS:
+            for col in VALUES if how != "count" else [None]:
+                values = None if col is None else flights[col]
+
+                def pandas():
+                    # groupby() is called every time, as grouping is cached by it
+                    grouped = flights.groupby(key, observed=False)
+                    return grouped.size() if col is None else grouped[col].agg(how)
+
+                baseline, expected = measure(pandas)
+                seconds, result = measure(groupby_aggregate, flights[key], values, how)
+                pd.testing.assert_series_equal(
+                    result, expected, check_names=col is not None
+                )
+                report(f"  {how} {col or 'rows'}", seconds, baseline)
+
+
+def rollups(sources: dict) -> None:
+    charts = importlib.import_module("utils.charts.generate_charts")
+    print(f"chart rollups of a cube of {len(sources['cube'])} rows:")
+    for name in ROLLUPS:
+        rollup = getattr(charts, name)
+        # every chart is computed from its own source, see SOURCES
+        source = sources[CHARTS[name.replace("rollup", "chart")].source]
+        aggregates.GROUPBY_KERNELS = False
+        baseline, expected = measure(rollup, source)
+        aggregates.GROUPBY_KERNELS = True
+        seconds, result = measure(rollup, source)
+        for key, partial in expected.items():
+            pd.testing.assert_series_equal(result[key].values, partial.values)
+        report(f"  {name}", seconds, baseline)
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else YEAR_ROWS // 7
+
+    with tempfile.TemporaryDirectory() as dir:
+        (path,) = write_years(dir, [2007], rows)
+        flights = read_partition(path)
+    keys = cube_keys(flights, ["Month", "DepHour"])
+    flights[keys.columns] = keys
+    print(f"{len(flights)} rows")
+
+    kernels(flights)
+    rollups({"cube": build_cube(flights), **build_rollups(flights)})
@@ -0,0 +1,225 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+import multiprocessing as mp
+
+from typing import Callable, Tuple, Any, List
+
+from utils.data_preparation.constants import (
+    FLIGHTS_DTYPES,
+    FLIGHTS_CATEGORIES,
+    PARTITION_CATEGORIES,
+    ROUTE_DICTIONARY,
+)
+from utils.data_preparation.routes import route_labels, route_codes
+from utils.data_preparation.optimize import optimize, decode_times, categorize
+from utils.data_preparation.storage import partition_path, write_partition
+from utils.data_preparation.dictionaries import (
+    load_dictionaries,
+    save_dictionaries,
+    update_dictionaries,
+    column_categories,
+)
+
+# roughly the size of the largest years of the dataset
+YEAR_ROWS = 7_000_000
+
+
+def raw_flights(rows: int = YEAR_ROWS, year: int = 2007, seed: int = 42):
+    """
+    Generates synthetic flights data, as it is read from the .csv.bz2 files
+
+    :param rows: number of rows
+    :param year: value of the Year column
+    :param seed: random seed
+    :returns: DataFrame with FLIGHTS_DTYPES columns
+    """
+    rng = np.random.default_rng(seed)
+
+    def hhmm(missing: float) -> np.ndarray:
+        times = rng.integers(0, 24, rows) * 100 + rng.integers(0, 60, rows)
+        times = times.astype(np.float32)
+        times[rng.random(rows) < 0.005] = 2400
+        times[rng.random(rows) < missing] = np.nan
+        return times
+
+    months = rng.integers(1, 13, rows)
+    days = rng.integers(1, 29, rows)
+    carriers = np.array([f"C{i}" for i in range(20)], dtype=object)
+    airports = np.array([f"A{i:02d}" for i in range(300)], dtype=object)
+    tail_nums = np.array([f"N{i}" for i in range(5000)], dtype=object)
+    cancelled = (rng.random(rows) < 0.02).astype(np.uint8)
+
+    df = pd.DataFrame(
+        {
+            "Year": year,
+            "Month": months,
+            "DayofMonth": days,
+            "DayOfWeek": rng.integers(1, 8, rows),
+            "DepTime": hhmm(0.02),
+            "CRSDepTime": hhmm(0.0),
+            "ArrTime": hhmm(0.02),
+            "CRSArrTime": hhmm(0.0),
+            "UniqueCarrier": carriers[rng.integers(0, len(carriers), rows)],
+            "FlightNum": rng.integers(1, 8000, rows),
+            "TailNum": tail_nums[rng.integers(0, len(tail_nums), rows)],
+            "ActualElapsedTime": rng.normal(120, 60, rows),
+            "CRSElapsedTime": rng.normal(120, 60, rows),
+            "AirTime": rng.normal(100, 60, rows),
+            "ArrDelay": rng.normal(5, 30, rows),
+            "DepDelay": rng.normal(5, 30, rows),
+            "Origin": airports[rng.integers(0, len(airports), rows)],
+            "Dest": airports[rng.integers(0, len(airports), rows)],
+            "Distance": rng.integers(50, 3000, rows),
+            "TaxiIn": rng.integers(0, 30, rows),
+            "TaxiOut": rng.integers(0, 30, rows),
+            "Cancelled": cancelled,
+            "CancellationCode": np.where(
+                cancelled == 1, np.array(list("ABCD"))[rng.integers(0, 4, rows)], None
+            ),
+            "Diverted": 0,
+            "CarrierDelay": rng.integers(0, 100, rows),
+            "WeatherDelay": rng.integers(0, 100, rows),
+            "NASDelay": rng.integers(0, 100, rows),
+            "SecurityDelay": rng.integers(0, 100, rows),
+            "LateAircraftDelay": rng.integers(0, 100, rows),
+        }
+    )
+    return df.astype(FLIGHTS_DTYPES)
+
+
+def categories(df: pd.DataFrame) -> dict:
+    """
+    Collects sorted categories of the categorical columns of raw flights data
+
+    :param df: DataFrame returned by raw_flights()
+    :returns: mapping of column name into its categories
+    """
+    return {
+        col: pd.Index(sorted(df[col].dropna().unique())) for col in FLIGHTS_CATEGORIES
+    }
+
+
+def write_years(dir: str, years: List[int], rows: int = YEAR_ROWS) -> List[str]:
+    """
+    Writes synthetic flights data of years into dir, the same way prepare_data() does
+
+    :param dir: target data directory
+    :param years: years to be written, each one with a different seed
+    :param rows: number of rows of each year
+    :returns: paths of the written partitions
+    """
+    os.makedirs(dir, exist_ok=True)
+    paths = []
+    for year in years:
+        df = raw_flights(rows, year, seed=year)
+        found = {
+            name: set(df[col].dropna().unique())
+            for col, name in FLIGHTS_CATEGORIES.items()
+        }
+        found[ROUTE_DICTIONARY] = route_labels(df["Origin"], df["Dest"])
+        dictionaries = update_dictionaries(load_dictionaries(dir), [found])
+        save_dictionaries(dictionaries, dir)
+        categorize(df, column_categories(dictionaries))
+        decode_times(df)
+        df["Route"] = route_codes(df["Origin"], df["Dest"], dictionaries)
+        paths.append(partition_path(str(year), dir))
+        write_partition(df, paths[-1], PARTITION_CATEGORIES)
+    return paths
+
+
+def write_legacy_years(
+    dir: str, years: List[int], rows: int = YEAR_ROWS
+) -> List[pd.DataFrame]:
+    """
+    Writes synthetic flights data of years into dir as .pkl files, the way older versions
+    prepared it, every year has categories of its own
+
+    :param dir: target data directory
+    :param years: years to be written, each one with a different seed
+    :param rows: number of rows of each year
+    :returns: written DataFrames
+    """
+    os.makedirs(dir, exist_ok=True)
+    dfs = []
+    for year in years:
+        df = raw_flights(rows, year, seed=year)
+        optimize(df, flights_data=True)
+        df.to_pickle(os.path.join(dir, f"{year}.pkl"))
+        dfs.append(df)
+    return dfs
+
+
+def _peak_memory_child(queue: mp.Queue, func: Callable, args, kwargs) -> None:
+    with open("/proc/self/status") as f:
+        status = dict(line.split(":", 1) for line in f)
+    start_rss = int(status["VmRSS"].split()[0])
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    seconds = time.perf_counter() - start
+    with open("/proc/self/status") as f:
+        status = dict(line.split(":", 1) for line in f)
+    queue.put((seconds, (int(status["VmHWM"].split()[0]) - start_rss) * 1024, result))
+
+
+def peak_memory(func: Callable, *args, **kwargs) -> Tuple[float, int, Any]:
+    """
+    Runs func(*args, **kwargs) in a forked process and measures how much its resident memory grew at peak.
+    Allocations made outside of Python (e.g. by Arrow) are counted too. Works on Linux only.
+    Running everything that allocates a lot in such processes keeps the measurements independent.
+
+    :param func: function to be measured, its result must be picklable
+    :returns: wall time in seconds, peak memory growth in bytes and the result of func
+    """
+    ctx = mp.get_context("fork")
+    queue = ctx.Queue()
+    process = ctx.Process(target=_peak_memory_child, args=(queue, func, args, kwargs))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def measure(func: Callable, *args, repeat: int = 3, **kwargs) -> Tuple[float, Any]:
+    """
+    Measures the best wall time of func(*args, **kwargs) out of repeat runs
+
+    :param func: function to be measured
+    :param repeat: number of runs
+    :returns: best time in seconds and the result of the last run
+    """
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def report(name: str, seconds: float, baseline: float = None) -> None:
+    """
+    Prints a single benchmark result
+
+    :param name: name of the measured variant
+    :param seconds: measured time
+    :param baseline: time of the variant that name is compared with
+    """
+    line = f"{name:<40} {seconds:10.3f} s"
+    if baseline is not None:
+        line += f"  ({baseline / seconds:6.1f}x)"
+    print(line)
+
+
+def report_memory(name: str, seconds: float, peak: int, size: int) -> None:
+    """
+    Prints a single memory benchmark result
+
+    :param name: name of the measured variant
+    :param seconds: measured time
+    :param peak: peak memory growth in bytes
+    :param size: size of the result in bytes
+    """
+    print(
+        f"{name:<40} {seconds:10.3f} s {peak / 2**20:10.1f} MiB  ({peak / size:4.2f}x result)"
+    )
@@ -0,0 +1,70 @@
+"""
+Compares loading several years of flights data into a single DataFrame by reading them
+one after another and concatenating, with the parallel reader filling preallocated columns.
+Both wall time and peak memory growth are reported, the latter relative to the loaded data.
+Years migrated from the legacy .pkl format by prepare_data() are checked to be read the same way
+they were written, along with the artefacts built for them.
+
+Run from the src directory: python -m benchmarks.multi_year_load [rows per year]
+"""
+import sys
+import tempfile
+import pandas as pd
+
+from utils.data_preparation.load_data import prepare_data
+from utils.data_preparation.sketches import fleet_sizes
+from utils.data_preparation.optimize import concatenate
+from utils.data_preparation.storage import (
+    list_partitions,
+    read_partition,
+    read_partitions,
+)
+
+from .helpers import (
+    write_years,
+    write_legacy_years,
+    peak_memory,
+    report_memory,
+    YEAR_ROWS,
+)
+
+
+def read_sequential(paths) -> int:
+    df = concatenate([read_partition(path) for path in paths])
+    return df.memory_usage(deep=True).sum()
+
+
+def read_parallel(paths) -> int:
+    return read_partitions(paths).memory_usage(deep=True).sum()
+
+
+def check_migrated(rows: int) -> None:
+    with tempfile.TemporaryDirectory() as dir:
+        legacy = concatenate(write_legacy_years(dir, [1988, 1989], rows))
+        prepare_data(dir)
+        flights = read_partitions(list_partitions("all", dir), list(legacy.columns))
+        # migrated years are encoded with the dictionaries, whatever types they had
+        pd.testing.assert_frame_equal(
+            flights, legacy, check_dtype=False, check_categorical=False
+        )
+        sizes = fleet_sizes("all", dir=dir)
+        expected = legacy.groupby("UniqueCarrier", observed=True)["TailNum"].nunique()
+        assert (sizes.loc[expected.index].values == expected.values).all()
+    print("years migrated from the legacy format are read as they were written")
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else YEAR_ROWS // 7
+
+    for n_years in [2, 5]:
+        with tempfile.TemporaryDirectory() as dir:
+            years = list(range(1988, 1988 + n_years))
+            _, _, paths = peak_memory(write_years, dir, years, rows)
+
+            baseline, peak, size = peak_memory(read_sequential, paths)
+            print(f"{n_years} years, {rows} rows each, {size / 2**20:.1f} MiB loaded")
+            report_memory("read one by one + concatenate", baseline, peak, size)
+            seconds, peak, _ = peak_memory(read_parallel, paths)
+            report_memory("read_partitions", seconds, peak, size)
+
+    check_migrated(rows // 10)
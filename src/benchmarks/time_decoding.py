@@ -0,0 +1,78 @@
+"""
+Compares decoding of the hhmm times of flights data into datetime columns
+with the string based implementation it replaced, on a year-sized input.
+
+Run from the src directory: python -m benchmarks.time_decoding
+"""
+import numpy as np
+import pandas as pd
+
+from utils.data_preparation.optimize import decode_times
+from utils.data_preparation.constants import TIMES
+
+from .helpers import raw_flights, measure, report, YEAR_ROWS
+
+
+def convert_to_hhmm(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts every column of df into a hhmm string format (previous implementation)
+
+    :returns: modified df
+    """
+    df = df.fillna(0).astype(np.int16).astype(str)
+    for col in df.columns:
+        df[col] = df[col].str.zfill(4)
+        bad_idxs = df[col] >= "2400"
+        df.loc[bad_idxs, col] = (
+            (df.loc[bad_idxs, col].astype(np.int16) - 2400).astype(str).str.zfill(4)
+        )
+
+    return df
+
+
+def decode_times_strings(df: pd.DataFrame) -> None:
+    """
+    Previous implementation of decode_times(), based on string slicing and pd.to_datetime
+
+    :param df: DataFrame holding flights data
+    """
+    df.loc[:, list(TIMES.keys())] = convert_to_hhmm(df.loc[:, list(TIMES.keys())])
+
+    for original_name, new_name in TIMES.items():
+        df[new_name] = pd.to_datetime(
+            dict(
+                year=df["Year"],
+                month=df["Month"],
+                day=df["DayofMonth"],
+                hour=df[original_name].str[:2],
+                minute=df[original_name].str[2:],
+            )
+        )
+
+    df.drop(
+        columns=["Year", "Month", "DayofMonth"] + list(TIMES.keys()),
+        inplace=True,
+    )
+
+
+def run(func, df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    func(df)
+    return df
+
+
+def main(rows: int = YEAR_ROWS) -> None:
+    cols = ["Year", "Month", "DayofMonth"] + list(TIMES.keys())
+    df = raw_flights(rows).loc[:, cols]
+    print(f"Decoding times of {rows} flights")
+
+    baseline, expected = measure(run, decode_times_strings, df, repeat=1)
+    report("strings + pd.to_datetime", baseline)
+    seconds, result = measure(run, decode_times, df)
+    report("integers", seconds, baseline)
+
+    pd.testing.assert_frame_equal(result, expected)
+
+
+if __name__ == "__main__":
+    main()
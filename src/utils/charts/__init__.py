@@ -1,3 +1,12 @@
-from .generate_charts import generate_charts
+from .generate_charts import generate_charts, chart_aggregates
+from .registry import CHARTS, Chart, register, required_columns
+from .distributions import digest_boxplot, digest_violinplot
 
 generate_charts = generate_charts
+CHARTS = CHARTS
+Chart = Chart
+register = register
+required_columns = required_columns
+chart_aggregates = chart_aggregates
+digest_boxplot = digest_boxplot
+digest_violinplot = digest_violinplot
@@ -0,0 +1,172 @@
+import numpy as np
+import pandas as pd
+
+from typing import Callable, Dict, Iterable, List, NamedTuple
+
+from ..data_preparation.kernels import groupby_aggregate
+from .cache import ResultCache, result_key
+from .constants import GROUPBY_KERNELS
+
+# ways partial aggregates of separate partitions are combined, "or" merges bitsets
+MERGES = ["sum", "max", "or"]
+
+
+class Partial(NamedTuple):
+    """
+    Aggregate computed over a single partition of flights data, which can be merged
+    with aggregates of other partitions into the aggregate of all of them.
+    Distinct sets are kept as counts of the distinct keys and merged with "sum",
+    or as bitsets over codes of the keys and merged with "or".
+
+    :param values: aggregated values indexed by their group keys
+    :param how: one of MERGES
+    """
+
+    values: pd.Series
+    how: str
+
+
+def merge(left: Partial, right: Partial) -> Partial:
+    """
+    Merges partial aggregates of two partitions. Groups are ordered the same way as groupby() orders them.
+
+    :param left: partial aggregate
+    :param right: partial aggregate of the same kind
+    :returns: partial aggregate of both partitions
+    """
+    assert left.how == right.how, "Only aggregates of the same kind can be merged"
+    assert left.how in MERGES, f"Unknown merge {left.how}"
+    a, b = left.values, right.values
+
+    if not a.index.equals(b.index):
+        index = a.index.union(b.index)
+        fill_value = np.nan if left.how == "max" else 0
+        a = a.reindex(index, fill_value=fill_value).sort_index()
+        b = b.reindex(index, fill_value=fill_value).sort_index()
+
+    if left.how == "sum":
+        values = a.values + b.values
+    elif left.how == "or":
+        values = np.bitwise_or(a.values, b.values)
+    else:
+        values = np.fmax(a.values, b.values)
+    return Partial(pd.Series(values, index=a.index, name=a.name), left.how)
+
+
+def merge_all(
+    partials: Iterable[Dict[str, Dict[str, Partial]]]
+) -> Dict[str, Dict[str, Partial]]:
+    """
+    Merges partial aggregates of consecutive partitions
+
+    :param partials: mappings of aggregator name into its named partial aggregates of a partition
+    :raises: ValueError if there are no partitions
+    :returns: mapping of aggregator name into its named partial aggregates of all the partitions
+    """
+    merged = None
+    for partial in partials:
+        if merged is None:
+            merged = partial
+        else:
+            merged = {
+                name: {key: merge(merged[name][key], p) for key, p in named.items()}
+                for name, named in partial.items()
+            }
+        del partial
+
+    if merged is None:
+        raise ValueError("No flights data to aggregate")
+    return merged
+
+
+def grouped(
+    frame: pd.DataFrame, key: str, col: str, how: str, observed: bool = False
+) -> pd.Series:
+    """
+    Aggregates a column grouped by a key column, the same way frame.groupby(key)[col].agg(how) does.
+    Keys being small dense integers or categories, the grouped aggregation kernels are used
+    unless GROUPBY_KERNELS is switched off, then pandas groupby() is.
+
+    :param frame: DataFrame holding both columns
+    :param key: name of the key column
+    :param col: name of the aggregated column
+    :param how: one of "count", "sum", "max", "min" or "mean"
+    :param observed: if False all the categories of a categorical key are listed
+    :returns: Series indexed by the keys
+    """
+    if GROUPBY_KERNELS:
+        return groupby_aggregate(frame[key], frame[col], how, observed)
+    return frame.groupby(key, observed=observed)[col].agg(how)
+
+
+def combine(
+    partials: Iterable[Dict[str, Dict[str, Partial]]]
+) -> Dict[str, Dict[str, pd.Series]]:
+    """
+    Merges partial aggregates of consecutive partitions, see merge_all()
+
+    :param partials: mappings of aggregator name into its named partial aggregates of a partition
+    :raises: ValueError if there are no partitions
+    :returns: mapping of aggregator name into its named aggregates of all the partitions
+    """
+    return {
+        name: {key: p.values for key, p in named.items()}
+        for name, named in merge_all(partials).items()
+    }
+
+
+def aggregate(
+    partitions: Iterable[pd.DataFrame],
+    aggregators: Dict[str, Callable[[pd.DataFrame], Dict[str, Partial]]],
+) -> Dict[str, Dict[str, pd.Series]]:
+    """
+    Computes aggregates of flights data one partition at a time, so only a single partition
+    is held in memory. Every aggregator is called with each partition and its partial aggregates
+    are merged with the ones of the previous partitions.
+
+    :param partitions: DataFrames holding consecutive partitions of flights data
+    :param aggregators: mapping of name into a function computing named partial aggregates of a partition
+    :raises: ValueError if there are no partitions
+    :returns: mapping of aggregator name into its named aggregates of all the partitions
+    """
+    return combine(
+        {name: func(flights) for name, func in aggregators.items()}
+        for flights in partitions
+    )
+
+
+def aggregate_files(
+    paths: List[str],
+    read: Callable[[str], pd.DataFrame],
+    aggregators: Dict[str, Callable[[pd.DataFrame], Dict[str, Partial]]],
+    cache: ResultCache | None = None,
+) -> Dict[str, Dict[str, pd.Series]]:
+    """
+    Computes aggregates of files one at a time, like aggregate(). Partial aggregates of each file
+    are looked up in the cache first, a file is read only if some of them are missing.
+
+    :param paths: paths of the files
+    :param read: function reading a file into a DataFrame
+    :param aggregators: mapping of name into a function computing named partial aggregates of a partition
+    :param cache: cache of the partial aggregates, if None nothing is cached
+    :raises: ValueError if there are no files
+    :returns: mapping of aggregator name into its named aggregates of all the files
+    """
+
+    def partials(path: str) -> Dict[str, Dict[str, Partial]]:
+        found, keys = {}, {}
+        if cache is not None:
+            for name, func in aggregators.items():
+                keys[name] = result_key(func, path)
+                found[name] = cache.get(keys[name])
+
+        missing = [name for name in aggregators if found.get(name) is None]
+        if len(missing) > 0:
+            df = read(path)
+            for name in missing:
+                found[name] = aggregators[name](df)
+                if cache is not None:
+                    cache.put(keys[name], found[name])
+        return {name: found[name] for name in aggregators}
+
+    return combine(partials(path) for path in paths)
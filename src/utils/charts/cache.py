@@ -0,0 +1,182 @@
+import os
+import json
+import pickle
+import inspect
+import hashlib
+import importlib
+
+from typing import Any, Callable
+from functools import lru_cache
+from collections import OrderedDict
+
+from ..data_preparation.manifest import signature
+from ..data_preparation.dictionaries import dictionaries_path
+from .constants import CACHE_DIR, CACHE_MEMORY_BYTES, CACHE_DISK_BYTES
+
+# modules, relative to this package, holding code the cached results are computed with
+# besides the functions computing them, e.g. the grouped aggregations they call
+CODE_DEPENDENCIES = [
+    ".aggregates",
+    "..data_preparation.cube",
+    "..data_preparation.kernels",
+]
+
+
+def data_version(path: str) -> dict:
+    """
+    Describes the version of a prepared file, it changes whenever prepare_data() rewrites the file.
+    Categories of the file are decoded with the dataset wide dictionaries, so their version is included.
+
+    :param path: file path
+    :returns: signatures of the file and of the dictionaries
+    """
+    version = {"file": signature(path)}
+    dictionaries = dictionaries_path(os.path.dirname(path))
+    if os.path.exists(dictionaries):
+        version["dictionaries"] = signature(dictionaries)
+    return version
+
+
+@lru_cache
+def dependencies_version(modules: tuple = tuple(CODE_DEPENDENCIES)) -> str:
+    """
+    Describes the version of the code results depend on besides the functions computing them
+
+    :param modules: names of the modules relative to this package, see CODE_DEPENDENCIES
+    :returns: hex digest of the source of the modules
+    """
+    code = hashlib.sha1()
+    for name in modules:
+        module = importlib.import_module(name, __package__)
+        code.update(inspect.getsource(module).encode())
+    return code.hexdigest()
+
+
+def result_key(func: Callable, path: str) -> str:
+    """
+    Creates the cache key of the result of func computed out of the file, it changes whenever
+    the code of func, the code of CODE_DEPENDENCIES or the file changes
+
+    :param func: function computing the result
+    :param path: file path
+    :returns: hex digest identifying the result
+    """
+    code = hashlib.sha1(inspect.getsource(func).encode()).hexdigest()
+    key = [func.__module__, func.__qualname__, code, dependencies_version()]
+    key += [path, data_version(path)]
+    return hashlib.sha1(json.dumps(key).encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    Cache of computed results kept both in memory and on disk. Each part is bounded in size,
+    least recently used results are evicted first. Results are stored pickled on disk,
+    so they are reused between runs.
+
+    :param dir: directory of the on-disk part, if None results are kept only in memory
+    :param memory_bytes: maximum size of the pickled results kept in memory
+    :param disk_bytes: maximum size of the results kept on disk
+    """
+
+    def __init__(
+        self,
+        dir: str | None = CACHE_DIR,
+        memory_bytes: int = CACHE_MEMORY_BYTES,
+        disk_bytes: int = CACHE_DISK_BYTES,
+    ):
+        self.dir = dir
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.memory = OrderedDict()  # key -> (size, result), most recently used last
+        self.memory_size = 0
+
+    def path(self, key: str) -> str:
+        """
+        Returns path of the file holding a result
+
+        :param key: result key
+        :returns: file path
+        """
+        return os.path.join(self.dir, key + ".pkl")
+
+    def get(self, key: str) -> Any | None:
+        """
+        Looks a result up, in memory first
+
+        :param key: result key
+        :returns: result or None if it is not cached
+        """
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return self.memory[key][1]
+        if self.dir is None or not os.path.exists(self.path(key)):
+            return None
+
+        with open(self.path(key), "rb") as f:
+            data = f.read()
+        os.utime(self.path(key))  # modification time orders files by their last use
+        result = pickle.loads(data)
+        self.remember(key, result, len(data))
+        return result
+
+    def put(self, key: str, result: Any) -> None:
+        """
+        Stores a result
+
+        :param key: result key
+        :param result: picklable result
+        """
+        data = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        self.remember(key, result, len(data))
+        if self.dir is None:
+            return
+
+        os.makedirs(self.dir, exist_ok=True)
+        path = self.path(key)
+        with open(path + ".part", "wb") as f:
+            f.write(data)
+        os.replace(path + ".part", path)
+        self.evict()
+
+    def remember(self, key: str, result: Any, size: int) -> None:
+        """
+        Keeps a result in memory, evicting the least recently used ones if needed
+
+        :param key: result key
+        :param result: result
+        :param size: size of the pickled result
+        """
+        if key in self.memory:
+            self.memory_size -= self.memory.pop(key)[0]
+        self.memory[key] = (size, result)
+        self.memory_size += size
+        while self.memory_size > self.memory_bytes and len(self.memory) > 0:
+            self.memory_size -= self.memory.popitem(last=False)[1][0]
+
+    def evict(self) -> None:
+        """
+        Removes the least recently used results from disk until they fit in disk_bytes
+        """
+        files = []
+        for entry in os.scandir(self.dir):
+            if entry.name.endswith(".pkl"):
+                stat = entry.stat()
+                files.append((stat.st_mtime_ns, stat.st_size, entry.path))
+
+        size = sum(file_size for _, file_size, _ in files)
+        for _, file_size, path in sorted(files):
+            if size <= self.disk_bytes:
+                break
+            os.remove(path)
+            size -= file_size
+
+    def clear(self) -> None:
+        """
+        Removes all the results
+        """
+        self.memory.clear()
+        self.memory_size = 0
+        if self.dir is not None and os.path.exists(self.dir):
+            for entry in os.scandir(self.dir):
+                if entry.name.endswith(".pkl"):
+                    os.remove(entry.path)
@@ -7,6 +7,12 @@ ROOT_DIR = os.path.split(
     os.path.split(os.path.split(os.path.split(__file__)[0])[0])[0]
 )[0]
 PLOTS_DIR = os.path.join(ROOT_DIR, "plots")
+# computed chart aggregates are kept there between runs, it is ignored by git
+CACHE_DIR = os.path.join(ROOT_DIR, ".cache")
+CACHE_MEMORY_BYTES = 256 * 2**20
+CACHE_DISK_BYTES = 2**30
+# charts group by small dense keys with the numpy kernels instead of pandas groupby()
+GROUPBY_KERNELS = True
 
 MONTHS = np.array(
     [
@@ -35,17 +41,18 @@ WEEK_DAYS = [
     "Sunday",
 ]
 
-REQUIRE = [
-    "UniqueCarrier",
-    "CRSElapsedTime",
-    "DepDelay",
-    "ArrDelay",
-    "TailNum",
-    "Cancelled",
-    "CancellationCode",
-    "DayOfWeek",
-    "Origin",
-    "Dest",
-    "Departure",
-    "Arrival",
-]
+# seasons of the months of the year, in the order they are plotted
+SEASONS = {
+    12: "Winter",
+    1: "Winter",
+    2: "Winter",
+    3: "Spring",
+    4: "Spring",
+    5: "Spring",
+    6: "Summer",
+    7: "Summer",
+    8: "Summer",
+    9: "Fall",
+    10: "Fall",
+    11: "Fall",
+}
@@ -0,0 +1,169 @@
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from scipy.ndimage.filters import uniform_filter1d
+from typing import Iterator, Tuple
+
+from ..data_preparation.digests import merge_digests, quantiles
+from .constants import SEASONS
+
+
+def digest_groups(digest: pd.DataFrame, column: str, by: str) -> pd.DataFrame:
+    """
+    Merges t-digests of a delay column into digests of every value of a key,
+    e.g. digests of every carrier and month into digests of every carrier.
+    "Season" is derived from Month, see SEASONS. Digests with missing keys are skipped.
+
+    :param digest: DataFrame returned by load_digests()
+    :param column: one of DIGEST_COLUMNS
+    :param by: key column of the digests, or "Season"
+    :returns: DataFrame with the key, mean and weight columns, sorted by the key
+    """
+    digest = digest.loc[digest["column"] == column]
+    if by == "Season":
+        seasons = digest["Month"].map(SEASONS)
+        key = pd.Categorical(seasons, categories=list(dict.fromkeys(SEASONS.values())))
+    else:
+        key = digest[by]
+    digest = pd.DataFrame(
+        {by: key, "mean": digest["mean"].values, "weight": digest["weight"].values}
+    )
+    return merge_digests([digest.loc[digest[by].notna().values]])
+
+
+def centroids(digest: pd.DataFrame) -> Iterator[Tuple[object, np.ndarray, np.ndarray]]:
+    """
+    Iterates over digests of a single key, see digest_groups()
+
+    :param digest: DataFrame with a key column, mean and weight columns, sorted by the key
+    :returns: iterator over the key, means and weights of the centroids of every digest
+    """
+    key = digest.iloc[:, 0].values
+    starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+    means = np.split(digest["mean"].values, starts[1:])
+    weights = np.split(digest["weight"].values, starts[1:])
+    yield from zip(key[starts], means, weights)
+
+
+def digest_boxplot(
+    digest: pd.DataFrame,
+    column: str,
+    by: str = "UniqueCarrier",
+    vert: bool = False,
+    color: str = "lightblue",
+    ax: plt.Axes = None,
+) -> plt.Axes:
+    """
+    Draws boxplots of a delay column for every value of a key out of t-digests, like
+    sns.boxplot() does out of flights data. Quartiles are estimated by the digests, whiskers
+    reach 1.5 IQR past the box but no further than the extreme values, outliers aren't drawn.
+
+    :param digest: DataFrame returned by load_digests()
+    :param column: one of DIGEST_COLUMNS
+    :param by: key column of the digests, or "Season"
+    :param vert: whether boxes are vertical
+    :param color: color of the boxes
+    :param ax: axes to draw on, if None the current ones are used
+    :returns: the axes
+    """
+    ax = ax or plt.gca()
+    digest = digest_groups(digest, column, by)
+    q = quantiles(digest, [0, 0.25, 0.5, 0.75, 1])
+    stats = []
+    for key, (low, q1, median, q3, high) in zip(q.index.get_level_values(0), q.values):
+        iqr = q3 - q1
+        stats.append(
+            {
+                "label": str(key),
+                "q1": q1,
+                "med": median,
+                "q3": q3,
+                "whislo": max(low, q1 - 1.5 * iqr),
+                "whishi": min(high, q3 + 1.5 * iqr),
+                "fliers": [],
+            }
+        )
+    ax.bxp(
+        stats,
+        vert=vert,
+        patch_artist=True,
+        showfliers=False,
+        boxprops={"facecolor": color},
+        medianprops={"color": "black"},
+    )
+    ax.set_xlabel(by if vert else column)
+    ax.set_ylabel(column if vert else by)
+    return ax
+
+
+def digest_violinplot(
+    digest: pd.DataFrame,
+    column: str,
+    by: str = "Season",
+    vert: bool = True,
+    points: int = 200,
+    color: str = "lightblue",
+    ax: plt.Axes = None,
+) -> plt.Axes:
+    """
+    Draws violin plots of a delay column for every value of a key out of t-digests, like
+    sns.violinplot(scale="count", inner="quartile") does out of flights data.
+    Densities are derivatives of the cumulative distributions interpolated between
+    the centroids, smoothed a little. Widths of the violins are proportional to their counts.
+
+    :param digest: DataFrame returned by load_digests()
+    :param column: one of DIGEST_COLUMNS
+    :param by: key column of the digests, or "Season"
+    :param vert: whether violins are vertical
+    :param points: number of points the densities are evaluated at
+    :param color: color of the violins
+    :param ax: axes to draw on, if None the current ones are used
+    :returns: the axes
+    """
+    ax = ax or plt.gca()
+    digest = digest_groups(digest, column, by)
+    q = quantiles(digest, [0.25, 0.5, 0.75])
+
+    labels, stats, counts = [], [], []
+    for key, means, weights in centroids(digest):
+        total = weights.sum()
+        coords = np.linspace(means[0], means[-1], points)
+        cdf = np.interp(coords, means, (np.cumsum(weights) - weights / 2) / total)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            density = np.nan_to_num(np.gradient(cdf, coords))
+        density = uniform_filter1d(density, max(points // 50, 1))
+        labels.append(str(key))
+        counts.append(total)
+        stats.append(
+            {
+                "coords": coords,
+                "vals": density,
+                "mean": np.average(means, weights=weights),
+                "median": np.interp(0.5, cdf, coords),
+                "min": means[0],
+                "max": means[-1],
+            }
+        )
+
+    positions = np.arange(len(stats))
+    widths = 0.8 * np.array(counts) / max(counts, default=1)
+    parts = ax.violin(stats, positions, vert=vert, widths=widths, showextrema=False)
+    for body in parts["bodies"]:
+        body.set_facecolor(color)
+        body.set_edgecolor("black")
+        body.set_alpha(1)
+
+    # quartiles are drawn across the violins, dashed but the median
+    lines = ax.hlines if vert else ax.vlines
+    for i, stat in enumerate(stats):
+        scale = widths[i] / 2 / max(stat["vals"].max(), np.finfo(float).tiny)
+        for p, style in zip(q.columns, ["--", "-", "--"]):
+            value = q[p].values[i]
+            half = np.interp(value, stat["coords"], stat["vals"]) * scale
+            lines(value, i - half, i + half, colors="black", linestyles=style)
+
+    ticks = ax.set_xticks if vert else ax.set_yticks
+    ticks(positions, labels)
+    ax.set_xlabel(by if vert else column)
+    ax.set_ylabel(column if vert else by)
+    return ax
@@ -3,14 +3,27 @@ import warnings
 import inspect
 import numpy as np
 import pandas as pd
-import geopandas as gpd
 import seaborn as sns
+import matplotlib
 import matplotlib.pyplot as plt
+from matplotlib.collections import PatchCollection
+from matplotlib.patches import PathPatch
 from scipy.ndimage.filters import uniform_filter1d
-
-from ..data_preparation.load_data import load_flights, load_airports
+from multiprocessing import Pool
+from typing import Dict, List
+
+from ..data_preparation.load_data import prepare_data
+from ..data_preparation.geometry import airport_geometry, load_basemap
+from ..data_preparation.storage import list_partitions, read_partition
+from ..data_preparation.cube import cube_path, rollup_path, group_keys
+from ..data_preparation.kernels import group_count, group_sum
+from ..data_preparation.sketches import SKETCH_COLUMNS, count_distinct, sketch_path
+from ..data_preparation.timeseries import daily_path
+from .aggregates import Partial, aggregate_files, grouped
+from .cache import ResultCache
+from .registry import CHARTS, SOURCES, Chart, register, required_columns, select_charts
 from .helpers import save_fig, finish
-from .constants import REQUIRE, MONTHS, WEEK_DAYS, PLOTS_DIR
+from .constants import MONTHS, WEEK_DAYS, PLOTS_DIR
 
 
 plt.set_loglevel("WARNING")
@@ -18,14 +31,31 @@ sns.set_style("whitegrid")
 warnings.simplefilter(action="ignore")
 np.random.seed(42)
 
+# partial aggregates of every year, shared by all calls of generate_charts()
+CACHE = ResultCache()
+
 
-def generate_charts(years: str | list = "all", dir: str = None):
+def generate_charts(
+    years: str | list = "all",
+    dir: str = None,
+    cache: ResultCache | None = CACHE,
+    processes: int | None = 1,
+    charts: List[str] = None,
+):
     """
     Function that wraps all eda_Pawel code and generates its charts
     for given year. Charts are saved to dir.
+    Aggregates of the registered charts are computed one year at a time, mostly from
+    the rollup cubes built by prepare_data(), loading only the columns the charts declare.
+    Partial aggregates of each year are cached, so they are computed again only if
+    the year's data or the code computing them changes.
 
     :param years: choice of years that will be passed to utils.load_flights()
     :param dir: directory to save charts. If None, the chart will be saved to "plots/{{year}}"
+    :param cache: cache of partial aggregates, if None nothing is cached
+    :param processes: number of worker processes drawing the charts with the Agg backend,
+        if None os.cpu_count() is used, 1 draws them in this process
+    :param charts: names of the charts to draw, if None all the registered ones are drawn
     """
     if dir is None:
         if isinstance(years, str):
@@ -34,18 +64,85 @@ def generate_charts(years: str | list = "all", dir: str = None):
             dir = os.path.join(PLOTS_DIR, "_".join(years))
     os.makedirs(dir, exist_ok=True)
 
-    flights = load_flights(years, cols=REQUIRE)
+    prepare_data()
+    assert len(years) > 0, "Must have at least one year specified"
+    aggregates = chart_aggregates(list_partitions(years), charts, cache)
+
+    names = [chart.name for chart in select_charts(charts)]
+    if processes == 1:
+        for name in names:
+            render(name, aggregates[name], dir)
+    else:
+        # workers get only the aggregates of the charts they draw
+        with Pool(processes, initializer=matplotlib.use, initargs=("Agg",)) as p:
+            p.starmap(
+                render, [(name, aggregates[name], dir) for name in names], chunksize=1
+            )
+
+
+def chart_aggregates(
+    paths: List[str], charts: List[str] = None, cache: ResultCache | None = CACHE
+) -> Dict[str, Dict[str, pd.Series]]:
+    """
+    Computes aggregates the charts are drawn out of, one year at a time. Every chart reads
+    only the columns it declares from the files of its source, see SOURCES.
+
+    :param paths: paths of the year partitions of flights data
+    :param charts: names of the charts, if None all the registered ones are computed
+    :param cache: cache of partial aggregates, if None nothing is cached
+    :returns: mapping of chart name into its named aggregates, they are shared with the cache
+        so they must not be modified
+    """
+    files = {
+        "flights": paths,
+        "cube": [cube_path(path) for path in paths],
+        "hours": [rollup_path(path, "hours") for path in paths],
+        "cancellations": [rollup_path(path, "cancellations") for path in paths],
+        "sketch": [sketch_path(path, "exact") for path in paths],
+        "daily": [daily_path(path) for path in paths],
+    }
+
+    aggregates = {}
+    for source in SOURCES:
+        computes = {
+            chart.name: chart.compute for chart in select_charts(charts, source)
+        }
+        if len(computes) > 0:
+            cols = required_columns(charts, source)
+            aggregates.update(
+                aggregate_files(
+                    files[source],
+                    lambda path: read_partition(path, cols),
+                    computes,
+                    cache,
+                )
+            )
+    return aggregates
+
+
+def render(name: str, aggregates: Dict[str, pd.Series], dir: str):
+    """
+    Draws a registered chart and closes its figures
+
+    :param name: name of the chart
+    :param aggregates: aggregates the chart is drawn out of
+    :param dir: directory to save the chart to
+    """
+    CHARTS[name].render(aggregates, dir)
+    plt.close("all")
+
 
-    for item in list(globals().keys()):
-        if item.startswith("chart_"):
-            globals()[item](flights, dir)
+def rollup_1(cube: pd.DataFrame) -> Dict[str, Partial]:
+    """Partial aggregates of chart_1"""
+    dt = grouped(cube, "UniqueCarrier", "CRSElapsedTime_sum", "sum", observed=True)
+    return {"elapsed": Partial(dt, "sum")}
 
 
-def chart_1(flights: pd.DataFrame, dir: str):
+def chart_1(aggregates: Dict[str, pd.Series], dir: str):
     """ "Total Planned Flight Time for each Carrier" chart"""
     title = "Total Planned Flight Time for each Carrier"
 
-    dt = flights.groupby("UniqueCarrier")["CRSElapsedTime"].sum()
+    dt = aggregates["elapsed"]
     dt = np.c_[dt.index, dt / (60 * 1000)]
     dt = pd.DataFrame(
         dt, columns=["UniqueCarrier", "Total CRSElapsedTime [hours * 10^3]"]
@@ -80,11 +177,19 @@ def chart_1(flights: pd.DataFrame, dir: str):
     finish(ax, title, plot=False, dir=dir)
 
 
-def chart_2(flights: pd.DataFrame, dir: str):
+def rollup_2(cube: pd.DataFrame) -> Dict[str, Partial]:
+    """Partial aggregates of chart_2"""
+    return {
+        col: Partial(grouped(cube, "UniqueCarrier", col + "_max", "max", True), "max")
+        for col in ["DepDelay", "ArrDelay"]
+    }
+
+
+def chart_2(aggregates: Dict[str, pd.Series], dir: str):
     """ "Max Departure and Arrival Delay for each Carrier" chart"""
     title = "Max Departure and Arrival Delay for each Carrier"
 
-    dt = flights.groupby("UniqueCarrier")[["DepDelay", "ArrDelay"]].max()
+    dt = pd.DataFrame(aggregates)
     dt_DepDelay = np.c_[
         dt.index, dt["DepDelay"] / 60, np.full(dt.index.shape, "DepDelay")
     ]
@@ -111,13 +216,18 @@ def chart_2(flights: pd.DataFrame, dir: str):
     finish(ax, title, plot=False, dir=dir)
 
 
-def chart_3(flights: pd.DataFrame, dir: str):
+def aggregate_3(sketch: pd.DataFrame) -> Dict[str, Partial]:
+    """Partial aggregates of chart_3, bitsets of distinct tail numbers of every carrier"""
+    fleet = sketch.set_index(["UniqueCarrier", "position"])["register"]
+    return {"fleet": Partial(fleet, "or")}
+
+
+def chart_3(aggregates: Dict[str, pd.Series], dir: str):
     """ "Number of Aircrafts in fleet of each Carrier" chart"""
     title = "Number of Aircrafts in fleet of each Carrier"
 
-    dt1 = flights.groupby(["UniqueCarrier"])["TailNum"].unique()
-    dt2 = [len(dt1[i][~pd.isna(dt1[i])]) for i in range(len(dt1))]
-    dt = np.c_[dt1.index, dt2]
+    counts = count_distinct(aggregates["fleet"])
+    dt = np.c_[counts.index, counts.tolist()]
     dt = pd.DataFrame(dt, columns=["UniqueCarrier", "Known Airplanes Count"])
     dt = dt.sort_values(
         by="Known Airplanes Count", axis=0, ascending=False
@@ -146,20 +256,22 @@ def chart_3(flights: pd.DataFrame, dir: str):
     finish(ax, title, plot=False, dir=dir)
 
 
-def chart_4(flights: pd.DataFrame, dir: str):
+def rollup_4(cube: pd.DataFrame) -> Dict[str, Partial]:
+    """Partial aggregates of chart_4"""
+    cube = cube[["UniqueCarrier", "Cancelled", "count"]]
+    dt1 = grouped(cube[~(cube["Cancelled"] == 0)], "UniqueCarrier", "count", "sum")
+    dt2 = grouped(cube, "UniqueCarrier", "count", "sum")
+    return {"cancelled": Partial(dt1, "sum"), "all": Partial(dt2, "sum")}
+
+
+def chart_4(aggregates: Dict[str, pd.Series], dir: str):
     """ "Cancelation Rate for each Carrier" chart"""
     title = "Cancelation Rate for each Carrier"
 
-    dt1 = (
-        flights[~(flights["Cancelled"] == 0)]
-        .groupby(["UniqueCarrier"])["Cancelled"]
-        .count()
-    )
-    dt2 = (
-        flights[~(flights["Cancelled"].isna())]
-        .groupby(["UniqueCarrier"])["Cancelled"]
-        .count()
-    )
+    dt1, dt2 = aggregates["cancelled"], aggregates["all"]
+    # categories are shared by all the years, skip carriers absent in the loaded ones
+    present = dt2 > 0
+    dt1, dt2 = dt1[present], dt2[present]
     dt = np.c_[dt1.index, dt1, dt2, dt1 / dt2 * 100]
     dt = pd.DataFrame(
         dt,
@@ -195,15 +307,21 @@ def chart_4(flights: pd.DataFrame, dir: str):
     finish(ax, title, plot=False, dir=dir)
 
 
-def chart_5(flights: pd.DataFrame, dir: str):
+def rollup_5(cancellations: pd.DataFrame) -> Dict[str, Partial]:
+    """Partial aggregates of chart_5"""
+    dt = (
+        cancellations[~(cancellations["Cancelled"] == 0)]
+        .groupby(["CancellationCode"], observed=True)["count"]
+        .sum()
+    )
+    return {"causes": Partial(dt, "sum")}
+
+
+def chart_5(aggregates: Dict[str, pd.Series], dir: str):
     """ "Cancelation Causes" chart"""
     title = "Cancelation Causes"
 
-    dt = (
-        flights[~(flights["Cancelled"] == 0)]
-        .groupby(["CancellationCode"])["CancellationCode"]
-        .count()
-    )
+    dt = aggregates["causes"].copy()
     dt.name = "Number"
     dt = pd.DataFrame(dt).reset_index()
     if dt.empty:
@@ -220,12 +338,25 @@ def chart_5(flights: pd.DataFrame, dir: str):
     finish(ax, title, plot=False, dir=dir)
 
 
-def chart_6(flights: pd.DataFrame, dir: str):
+def rollup_6(daily: pd.DataFrame) -> Dict[str, Partial]:
+    """Partial aggregates of chart_6, days of flights are turned into dates only once they are counted"""
+    index = pd.MultiIndex.from_arrays(
+        [
+            daily["Day"].values.astype("datetime64[D]").astype("datetime64[ns]"),
+            daily["DayOfWeek"].values,
+        ],
+        names=["Arrival", "DayOfWeek"],
+    )
+    dt = pd.Series(daily["count"].values, index=index, name="DayOfWeek").sort_index()
+    return {"days": Partial(dt, "sum")}
+
+
+def chart_6(aggregates: Dict[str, pd.Series], dir: str):
     """ "Planned Flights over Time" chart (x2)"""
     title = "Planned Flights over Time"
     bins = [0, 1, 2, 3, 4, 5, 6, np.inf]
 
-    dt = flights.groupby([flights["Arrival"].dt.date, "DayOfWeek"])["DayOfWeek"].count()
+    dt = aggregates["days"].copy()
     dt.name = "Number of flights"
     dt = pd.DataFrame(dt).reset_index()
     dt["DayOfWeek"] = pd.cut(dt["DayOfWeek"], bins, labels=WEEK_DAYS)
@@ -234,7 +365,7 @@ def chart_6(flights: pd.DataFrame, dir: str):
         return  # all values were nan
 
     w = int(np.ceil(len(dt["Arrival"].unique()) / 300))
-    dt["Arrival"] = dt["Arrival"].astype(str)
+    dt["Arrival"] = np.datetime_as_string(dt["Arrival"].values, unit="D")
     xmin, xmax = dt["Arrival"].min(), dt["Arrival"].max()
     dt["Smoothed"] = uniform_filter1d(dt["Number of flights"], w * 10)
 
@@ -298,24 +429,23 @@ def chart_6(flights: pd.DataFrame, dir: str):
         save_fig(f"{title}_{nn}", dir, dpi=max(min(w * 25, 400), 200))
 
 
-def chart_7(flights: pd.DataFrame, dir: str):
+def rollup_7(cube: pd.DataFrame) -> Dict[str, Partial]:
+    """Partial aggregates of chart_7, flights between two airports in either direction share their route"""
+    cube = cube[["Route", "Cancelled", "TailNum_count"]]
+    ids, routes = group_keys(cube[["Route", "Cancelled"]])
+    flights = group_sum(ids, len(routes), cube["TailNum_count"].values)
+    present = (group_count(ids, len(routes)) > 0) & routes["Route"].notna().values
+    index = pd.MultiIndex.from_frame(routes.loc[present])
+    dt = pd.Series(flights[present].astype(np.int64), index=index, name="TailNum")
+    return {"routes": Partial(dt, "sum")}
+
+
+def chart_7(aggregates: Dict[str, pd.Series], dir: str):
     """ "Most popular routes" chart"""
     title = "Most popular routes"
 
-    dt = (
-        flights.groupby(["Origin", "Dest", "Cancelled"])["TailNum"]
-        .count()
-        .reset_index()
-    )
-
-    # treat flights from ABE to ATL and from ATL to ABE as same route
-    dt1 = dt[dt["Origin"].astype("U3") < dt["Dest"].astype("U3")]
-    dt2 = dt[dt["Origin"].astype("U3") > dt["Dest"].astype("U3")]
-    dt2 = dt2.rename(
-        columns={"Origin": "Dest", "Dest": "Origin", "TailNum": "Number of flights"}
-    )
-    dt = pd.concat([dt1, dt2])
-    dt["Route"] = dt["Origin"].astype("U3") + " - " + dt["Dest"].astype("U3")
+    dt = aggregates["routes"].rename("Number of flights").reset_index()
+    dt["Route"] = dt["Route"].astype(str)
 
     dt1 = dt.groupby(["Route", "Cancelled"])["Number of flights"].sum().reset_index()
     dt2 = (
@@ -349,21 +479,36 @@ def chart_7(flights: pd.DataFrame, dir: str):
     finish(ax, title, plot=False, dir=dir)
 
 
-def chart_8(flights: pd.DataFrame, dir: str):
+def rollup_8(cube: pd.DataFrame) -> Dict[str, Partial]:
+    """Partial aggregates of chart_8"""
+    measures = {
+        "flights": "DepDelay_count",
+        "arr_delay": "ArrDelay_sum",
+        "dep_delay": "DepDelay_sum",
+    }
+    months = cube[["Month"] + list(measures.values())]
+    months = months[months["Month"] >= 0]
+    return {
+        key: Partial(grouped(months, "Month", col, "sum"), "sum")
+        for key, col in measures.items()
+    }
+
+
+def chart_8(aggregates: Dict[str, pd.Series], dir: str):
     """ "Total Delay Time for Each Month" and "Delay Coefficient for Each Month" charts"""
     title = "Total Delay Time for Each Month"
 
-    dt3 = flights.groupby(flights["Departure"].dt.month)["DepDelay"].count() / 1000
+    dt3 = aggregates["flights"] / 1000
     dt3.name = "All flights [x1000]"
     dt3 = dt3.reset_index()
 
-    dt1 = flights.groupby(flights["Departure"].dt.month)["ArrDelay"].sum()
+    dt1 = aggregates["arr_delay"].copy()
     dt1.name = "Delay [hr * 10^3]"
     dt1 = dt1.reset_index()
     dt1["type"] = "Arrival"
     dt1 = pd.merge(dt1, dt3)
 
-    dt2 = flights.groupby(flights["Departure"].dt.month)["DepDelay"].sum()
+    dt2 = aggregates["dep_delay"].copy()
     dt2.name = "Delay [hr * 10^3]"
     dt2 = dt2.reset_index()
     dt2["type"] = "Departure"
@@ -371,7 +516,6 @@ def chart_8(flights: pd.DataFrame, dir: str):
 
     dt = pd.merge(dt1, dt2, how="outer")
     dt["Delay [hr * 10^3]"] = dt["Delay [hr * 10^3]"] / 60000
-    dt.rename(columns={"Departure": "Month"}, errors="raise", inplace=True)
     if dt.empty:
         warnings.warn(f"Empty final data set: {inspect.currentframe().f_code.co_name}")
         return  # all values were nan
@@ -450,16 +594,23 @@ def chart_8(flights: pd.DataFrame, dir: str):
     save_fig(title, dir, bbox_extra_artists=(ax.get_legend(),), bbox_inches="tight")
 
 
-def chart_9(flights: pd.DataFrame, dir: str):
+def rollup_9(rollup: pd.DataFrame) -> Dict[str, Partial]:
+    """Partial aggregates of chart_9"""
+    hours = {"Departure": "DepHour", "Arrival": "ArrHour"}
+    rollup = rollup[list(hours.values()) + ["count"]]
+    return {
+        name: Partial(grouped(rollup[rollup[hour] >= 0], hour, "count", "sum"), "sum")
+        for name, hour in hours.items()
+    }
+
+
+def chart_9(aggregates: Dict[str, pd.Series], dir: str):
     """ "Number of Departures over hours" chart"""
     title = "Number of flights over hours"
 
     dts = []
     for name in ["Departure", "Arrival"]:
-        dt = (
-            flights[~pd.isna(flights[name])][name].dt.hour.value_counts().sort_index()
-            / 1000
-        ).to_frame(name=name + "s")
+        dt = (aggregates[name].sort_index() / 1000).to_frame(name=name + "s")
         dt.index.name = "Hour"
         dt.reset_index(inplace=True)
         dts.append(dt)
@@ -487,11 +638,18 @@ def chart_9(flights: pd.DataFrame, dir: str):
     finish(ax, title, plot=False, dir=dir)
 
 
-def chart_10(flights: pd.DataFrame, dir: str):
+def rollup_10(cube: pd.DataFrame) -> Dict[str, Partial]:
+    """Partial aggregates of chart_10"""
+    return {"carriers": Partial(cube.groupby("UniqueCarrier")["count"].sum(), "sum")}
+
+
+def chart_10(aggregates: Dict[str, pd.Series], dir: str):
     """ "Flights Count for each Carrier" chart"""
     title = "Flights Count for each Carrier chart"
 
-    dt = flights["UniqueCarrier"].value_counts()
+    # the same order value_counts() would give
+    dt = aggregates["carriers"].sort_values(ascending=False)
+    dt = dt[dt > 0]  # categories are shared by all the years
     dt = np.c_[dt.index, dt / (60 * 1000)]
     dt = pd.DataFrame(dt, columns=["UniqueCarrier", "Number of flights [* 10^3]"])
     dt = dt.sort_values(
@@ -524,12 +682,23 @@ def chart_10(flights: pd.DataFrame, dir: str):
     finish(ax, title, plot=False, dir=dir)
 
 
-def chart_11(flights: pd.DataFrame, dir: str):
+def rollup_11(cube: pd.DataFrame) -> Dict[str, Partial]:
+    """Partial aggregates of chart_11"""
+    return {
+        name: Partial(cube.groupby(name)["count"].sum(), "sum")
+        for name in ["Dest", "Origin"]
+    }
+
+
+def chart_11(aggregates: Dict[str, pd.Series], dir: str):
     """ "10 most popular Airports" and ""Airports and their popularity" charts"""
     title = "10 most popular Airports"
 
-    dt1 = flights["Dest"].value_counts()
-    dt2 = flights["Origin"].value_counts()
+    # the same order value_counts() would give
+    dt1 = aggregates["Dest"].sort_values(ascending=False)
+    dt2 = aggregates["Origin"].sort_values(ascending=False)
+    # categories are shared by all the years
+    dt1, dt2 = dt1[dt1 > 0], dt2[dt2 > 0]
     dt1 = pd.DataFrame(
         np.c_[dt1.index, dt1 / 1000], columns=["Airport", "Number of flights [* 10^3]"]
     )
@@ -579,23 +748,31 @@ def chart_11(flights: pd.DataFrame, dir: str):
     """ "Airports and their popularity" chart """
     title = "Airports and their popularity"
 
-    airports = load_airports()
-    dt = pd.merge(dt_copy, airports, left_on="Airport", right_on="iata")
-    dt.drop_duplicates(subset=["Airport"], inplace=True)
+    # locations of airports are looked up by their codes in the dictionary shared by all the years
+    first = dt_copy.drop_duplicates(subset=["Airport"])
+    codes = aggregates["Dest"].index.categories.get_indexer(first["Airport"])
+    geometry = airport_geometry()
+    known = geometry["known"].values[codes]
+    codes, combined = codes[known], first["Combined"].values[known]
+    points = geometry.iloc[codes]
 
     fig, ax = plt.subplots(figsize=(15, 15))
 
-    world = gpd.read_file(gpd.datasets.get_path("naturalearth_lowres"))
-    usa = world[world["name"] == "United States of America"]
-    usa.plot(ax=ax, color="white", edgecolor="black", alpha=0.5)
-
-    points = gpd.GeoDataFrame(dt, geometry=gpd.points_from_xy(dt["long"], dt["lat"]))
-
-    w = int(np.ceil(points["Combined"].max() / 300))
-    points.plot(
-        ax=ax,
-        markersize=points["Combined"].astype(np.float32) / w,
+    basemap = [PathPatch(path) for path in load_basemap()]
+    ax.add_collection(
+        PatchCollection(basemap, facecolor="white", edgecolor="black", alpha=0.5),
+        autolim=True,
+    )
+    ax.autoscale_view()
+    ax.set_aspect("equal")
+
+    w = int(np.ceil(combined.max() / 300))
+    ax.scatter(
+        points["long"].values.astype(np.float64),
+        points["lat"].values.astype(np.float64),
+        s=combined.astype(np.float32) / w,
         color="red",
+        marker="o",
         alpha=0.5,
         edgecolor="black",
         linewidth=0.5,
@@ -644,6 +821,52 @@ def chart_11(flights: pd.DataFrame, dir: str):
     finish(ax, title, plot=False, dir=dir)
 
 
+# every chart is drawn by chart_N out of the aggregates computed by rollup_N from rollup cubes
+# or by aggregate_N from flights data, if they can't be computed from the cubes
+for chart in [
+    Chart(
+        "chart_1", "cube", ["UniqueCarrier", "CRSElapsedTime_sum"], rollup_1, chart_1
+    ),
+    Chart(
+        "chart_2",
+        "cube",
+        ["UniqueCarrier", "DepDelay_max", "ArrDelay_max"],
+        rollup_2,
+        chart_2,
+    ),
+    Chart("chart_3", "sketch", SKETCH_COLUMNS, aggregate_3, chart_3),
+    Chart(
+        "chart_4", "cube", ["UniqueCarrier", "Cancelled", "count"], rollup_4, chart_4
+    ),
+    Chart(
+        "chart_5",
+        "cancellations",
+        ["CancellationCode", "Cancelled", "count"],
+        rollup_5,
+        chart_5,
+    ),
+    Chart("chart_6", "daily", ["Day", "DayOfWeek", "count"], rollup_6, chart_6),
+    Chart(
+        "chart_7",
+        "cube",
+        ["Route", "Cancelled", "TailNum_count"],
+        rollup_7,
+        chart_7,
+    ),
+    Chart(
+        "chart_8",
+        "cube",
+        ["Month", "DepDelay_count", "ArrDelay_sum", "DepDelay_sum"],
+        rollup_8,
+        chart_8,
+    ),
+    Chart("chart_9", "hours", ["DepHour", "ArrHour", "count"], rollup_9, chart_9),
+    Chart("chart_10", "cube", ["UniqueCarrier", "count"], rollup_10, chart_10),
+    Chart("chart_11", "cube", ["Dest", "Origin", "count"], rollup_11, chart_11),
+]:
+    register(chart)
+
+
 def main():
     generate_charts(["1989", "2007"])
     generate_charts(["2000", "2001", "2002"])
@@ -0,0 +1,75 @@
+import pandas as pd
+
+from typing import Callable, Dict, List, NamedTuple
+
+from .aggregates import Partial
+
+# data charts are computed from, year partitions of flights data, their rollup cubes, their small
+# rollups of departure and arrival hours or of cancellations, their exact sketches of distinct
+# tail numbers of every carrier or their daily time series
+SOURCES = ["flights", "cube", "hours", "cancellations", "sketch", "daily"]
+
+
+class Chart(NamedTuple):
+    """
+    Chart split into the computation of its aggregates and their rendering.
+    compute is called with every partition of source holding only columns
+    and its partial aggregates are merged, see aggregate().
+
+    :param name: name of the chart
+    :param source: one of SOURCES
+    :param columns: columns of source needed by compute
+    :param compute: function computing named partial aggregates of a partition
+    :param render: function drawing the chart out of the merged aggregates into a directory
+    """
+
+    name: str
+    source: str
+    columns: List[str]
+    compute: Callable[[pd.DataFrame], Dict[str, Partial]]
+    render: Callable[[Dict[str, pd.Series], str], None]
+
+
+# registered charts in the order they are drawn
+CHARTS: Dict[str, Chart] = {}
+
+
+def register(chart: Chart) -> None:
+    """
+    Adds a chart to the registry, replacing the one registered under the same name
+
+    :param chart: the chart
+    """
+    assert chart.source in SOURCES, f"Unknown source {chart.source}"
+    CHARTS[chart.name] = chart
+
+
+def select_charts(names: List[str] = None, source: str = None) -> List[Chart]:
+    """
+    Lists registered charts
+
+    :param names: names of the charts, if None all of them are listed
+    :param source: one of SOURCES to list only charts computed from it, if None charts of every source are listed
+    :raises: KeyError if some chart is not registered
+    :returns: the charts in the order they were registered
+    """
+    if names is None:
+        charts = list(CHARTS.values())
+    else:
+        charts = [CHARTS[name] for name in CHARTS if name in names]
+        missing = set(names) - set(CHARTS)
+        if len(missing) > 0:
+            raise KeyError(f"Unknown charts: {sorted(missing)}")
+    return [chart for chart in charts if source is None or chart.source == source]
+
+
+def required_columns(names: List[str] = None, source: str = "flights") -> List[str]:
+    """
+    Lists columns needed to compute charts, e.g. to load only them with load_flights()
+
+    :param names: names of the charts, if None all of them are considered
+    :param source: one of SOURCES
+    :returns: union of the columns declared by the charts
+    """
+    columns = [col for chart in select_charts(names, source) for col in chart.columns]
+    return list(dict.fromkeys(columns))
@@ -1,15 +1,26 @@
 from .load_data import (
     prepare_data,
     load_flights,
+    iter_flights,
+    iter_cubes,
     load_airports,
     load_carriers,
     load_plane_data,
 )
 from .optimize import optimize, concatenate
-from .load_airports_additional import load_airports_details
+from .load_airports_additional import load_airports_details, airport_details
+from .kernels import groupby_aggregate
+from .sketches import fleet_sizes
+from .heavy_hitters import most_popular
+from .digests import load_digests
+from .dimensions import enrich
+from .timeseries import load_daily, resample_daily
+from .delay_stats import Query, QUERIES, run_query, query_results, export_results
 
 prepare_data = prepare_data
 load_flights = load_flights
+iter_flights = iter_flights
+iter_cubes = iter_cubes
 load_airports = load_airports
 load_carriers = load_carriers
 load_plane_data = load_plane_data
@@ -17,3 +28,16 @@ optimize = optimize
 concatenate = concatenate
 
 load_airports_details = load_airports_details
+airport_details = airport_details
+groupby_aggregate = groupby_aggregate
+fleet_sizes = fleet_sizes
+most_popular = most_popular
+load_digests = load_digests
+enrich = enrich
+load_daily = load_daily
+resample_daily = resample_daily
+Query = Query
+QUERIES = QUERIES
+run_query = run_query
+query_results = query_results
+export_results = export_results
@@ -2,10 +2,210 @@ import os
 
 
 THRESHOLD = 50
+# number of entries sampled to estimate the number of unique values of a column
+SAMPLE_SIZE = 100_000
 
 ROOT_DIR = os.path.split(os.path.split(os.path.split(__file__)[0])[0])[0]
 DATASETS_FOLDER = os.path.join(ROOT_DIR, "datasets")
 
+# on-disk format of the prepared data, legacy one is converted on prepare_data()
+EXTENSION = ".parquet"
+LEGACY_EXTENSION = ".pkl"
+STATS_EXTENSION = ".stats.json"
+# row groups are the smallest units skipped when reading with filters
+ROW_GROUP_SIZE = 250_000
+# sets of distinct values longer than that are not stored in row group statistics
+STATS_MAX_DISTINCT = 1000
+
+# number of rows decoded at once while converting flights data, it bounds the memory
+# used by each prepare_data() worker regardless of the size of the year
+CHUNK_SIZE = ROW_GROUP_SIZE
+
+# flights data types fixed up front, so that every chunk is decoded the same way
+FLIGHTS_DTYPES = {
+    "Year": "uint16",
+    "Month": "uint8",
+    "DayofMonth": "uint8",
+    "DayOfWeek": "uint8",
+    "DepTime": "float32",
+    "CRSDepTime": "float32",
+    "ArrTime": "float32",
+    "CRSArrTime": "float32",
+    "UniqueCarrier": "object",
+    "FlightNum": "uint16",
+    "TailNum": "object",
+    "ActualElapsedTime": "float32",
+    "CRSElapsedTime": "float32",
+    "AirTime": "float32",
+    "ArrDelay": "float32",
+    "DepDelay": "float32",
+    "Origin": "object",
+    "Dest": "object",
+    "Distance": "float32",
+    "TaxiIn": "float32",
+    "TaxiOut": "float32",
+    "Cancelled": "uint8",
+    "CancellationCode": "object",
+    "Diverted": "uint8",
+    "CarrierDelay": "float32",
+    "WeatherDelay": "float32",
+    "NASDelay": "float32",
+    "SecurityDelay": "float32",
+    "LateAircraftDelay": "float32",
+}
+# categorical columns of flights data and names of the dataset wide dictionaries
+# they are encoded with, Origin and Dest share codes of airports
+FLIGHTS_CATEGORIES = {
+    "UniqueCarrier": "carrier",
+    "TailNum": "tail_num",
+    "Origin": "airport",
+    "Dest": "airport",
+    "CancellationCode": "cancellation_code",
+}
+# undirected routes between two airports have a dataset wide dictionary of their own,
+# every partition stores the Route of its flights encoded with it, see route_codes()
+ROUTE_DICTIONARY = "route"
+ROUTE_SEPARATOR = " - "
+PARTITION_CATEGORIES = {**FLIGHTS_CATEGORIES, "Route": ROUTE_DICTIONARY}
+DICTIONARIES_FILE = "dictionaries.json"
+MANIFEST_FILE = "manifest.json"
+
+# per year rollup of flights data built on prepare_data(), its keys are derived from
+# flights columns and every measure column gets its non empty count, sum and max
+CUBE_EXTENSION = ".cube" + EXTENSION
+CUBE_KEYS = [
+    "UniqueCarrier",
+    "Month",
+    "DayOfWeek",
+    "DepHour",
+    "Origin",
+    "Dest",
+    "Route",
+    "Cancelled",
+]
+CUBE_MEASURES = [
+    "ActualElapsedTime",
+    "CRSElapsedTime",
+    "AirTime",
+    "ArrDelay",
+    "DepDelay",
+    "CarrierDelay",
+    "WeatherDelay",
+    "NASDelay",
+    "SecurityDelay",
+    "LateAircraftDelay",
+]
+
+# small per year rollups of flights data built on prepare_data() next to the cube, for the charts
+# grouping by keys left out of it, so the cube does not grow by their combinations.
+# Each of them holds only the number of flights of every combination of its keys
+ROLLUP_EXTENSION = ".rollup" + EXTENSION
+ROLLUP_KEYS = {
+    "hours": ["UniqueCarrier", "DepHour", "ArrHour"],
+    "cancellations": ["UniqueCarrier", "Cancelled", "CancellationCode"],
+}
+
+# per year sketches of distinct tail numbers of every carrier built on prepare_data(),
+# exact ones are bitsets over the dataset wide tail number codes, approximate ones HyperLogLog registers
+SKETCH_EXTENSION = ".sketch" + EXTENSION
+SKETCH_KINDS = ["exact", "hll"]
+# relative standard error of the HyperLogLog sketches, it sets their number of registers
+HLL_ERROR = 0.01
+
+# per year summaries of the most frequent routes and airports built out of the rollup cubes
+# on prepare_data(), each of them keeps counts of at most TOPK_CAPACITY keys
+TOPK_EXTENSION = ".topk" + EXTENSION
+TOPK_SUMMARIES = ["routes", "airports"]
+TOPK_CAPACITY = 1000
+
+# per year t-digests of delays of every carrier and month built on prepare_data(),
+# compression bounds the number of centroids of each digest
+DIGEST_EXTENSION = ".digest" + EXTENSION
+DIGEST_COLUMNS = [
+    "ArrDelay",
+    "DepDelay",
+    "CarrierDelay",
+    "WeatherDelay",
+    "NASDelay",
+    "SecurityDelay",
+    "LateAircraftDelay",
+]
+DIGEST_COMPRESSION = 100
+
+# per year sufficient statistics of delay causes of every carrier and plane built on
+# prepare_data(): number of non empty values, their sum and number of positive ones,
+# grouped delay statistics queries are answered out of them
+DELAY_STATS_EXTENSION = ".delays" + EXTENSION
+DELAY_STATS_KEYS = ["UniqueCarrier", "TailNum"]
+DELAY_STATS_COLUMNS = [
+    "CarrierDelay",
+    "WeatherDelay",
+    "NASDelay",
+    "SecurityDelay",
+    "LateAircraftDelay",
+]
+QUERIES_RESULTS_DIR = os.path.join(os.path.split(ROOT_DIR)[0], "queries_results")
+
+# per year daily time series of flights data built on prepare_data(): number of flights arriving
+# on every day, by their day of the week, and non empty count and sum of DAILY_MEASURES.
+# Days are int32 ordinals, numbers of days since 1970-01-01
+DAILY_EXTENSION = ".daily" + EXTENSION
+DAILY_KEYS = ["Day", "DayOfWeek"]
+DAILY_MEASURES = ["ArrDelay", "DepDelay"]
+
+# tables drawn on the map of airports, prepared on first use: outline of the country
+# as vertices of its polygons in longitude and latitude, and locations of airports
+# in the order of the airport dictionary
+BASEMAP_TABLE = "basemap"
+BASEMAP_COUNTRY = "United States of America"
+AIRPORT_GEOMETRY_TABLE = "airport_geometry"
+
+# reference table of airport details from the openflights database, read from AIRPORTS_DETAILS_FILE
+# in the data directory, downloaded there only if it's missing, and stored with a fixed schema.
+# Its index holds the row of every airport of the airport dictionary, -1 if it has no details
+AIRPORTS_DETAILS_URL = (
+    "https://raw.githubusercontent.com/jpatokal/openflights/master/data/airports.dat"
+)
+AIRPORTS_DETAILS_FILE = "airports.dat"
+AIRPORTS_DETAILS_TABLE = "airports_details"
+AIRPORTS_DETAILS_INDEX_TABLE = "airports_details_index"
+AIRPORTS_DETAILS_DTYPES = {
+    "airportID": "int32",
+    "name": "object",
+    "city": "object",
+    "country": "category",
+    "iata": "object",
+    "icao": "object",
+    "lat": "float32",
+    "lon": "float32",
+    "altitude": "float32",
+    "timezone": "float32",
+    "dst": "category",
+    "tz": "category",
+    "type": "category",
+    "source": "category",
+}
+
+# dimension tables flights data is enriched with and their key columns, flights columns looking
+# their rows up by codes of the dictionaries of the columns. The row of every code is stored
+# in a table named after the dimension table with DIMENSION_INDEX_SUFFIX
+DIMENSION_KEYS = {"carriers": "Code", "plane-data": "tailnum", "airports": "iata"}
+DIMENSIONS = {
+    "UniqueCarrier": "carriers",
+    "TailNum": "plane-data",
+    "Origin": "airports",
+    "Dest": "airports",
+}
+DIMENSION_INDEX_SUFFIX = "_index"
+
+# hhmm encoded times of flights data and names of the datetime columns they are decoded into
+TIMES = {
+    "DepTime": "Departure",
+    "CRSDepTime": "CRSDeparture",
+    "ArrTime": "Arrival",
+    "CRSArrTime": "CRSArrival",
+}
+
 URL = "https://dataverse.harvard.edu/dataset.xhtml?persistentId=doi:10.7910/DVN/HG7NV7#"
 ALLOWED_DELAY = 3
 TIME_DELTA = 0.25
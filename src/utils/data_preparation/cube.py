@@ -0,0 +1,379 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from typing import Callable, Dict, List, Tuple
+
+from .optimize import concatenate
+from .kernels import group_count, group_max, group_sum
+from .storage import DICTIONARIES_KEY, to_pandas, write_partition
+from .constants import (
+    CHUNK_SIZE,
+    CUBE_EXTENSION,
+    CUBE_KEYS,
+    CUBE_MEASURES,
+    PARTITION_CATEGORIES,
+    ROLLUP_EXTENSION,
+    ROLLUP_KEYS,
+)
+
+# columns of flights data the cube is built from
+CUBE_SOURCES = [
+    "UniqueCarrier",
+    "DayOfWeek",
+    "Departure",
+    "Origin",
+    "Dest",
+    "Route",
+    "Cancelled",
+    "TailNum",
+] + CUBE_MEASURES
+# categorical keys of the cube encoded with the dataset wide dictionaries
+CUBE_CATEGORIES = {
+    col: name for col, name in PARTITION_CATEGORIES.items() if col in CUBE_KEYS
+}
+# columns of flights data the small rollups are built from
+ROLLUP_SOURCES = [
+    "UniqueCarrier",
+    "Departure",
+    "Arrival",
+    "Cancelled",
+    "CancellationCode",
+]
+# categorical keys of every small rollup encoded with the dataset wide dictionaries
+ROLLUP_CATEGORIES = {
+    name: {
+        col: dictionary
+        for col, dictionary in PARTITION_CATEGORIES.items()
+        if col in keys
+    }
+    for name, keys in ROLLUP_KEYS.items()
+}
+
+
+def cube_path(path: str) -> str:
+    """
+    Returns path of the file holding the rollup cube of a year partition
+
+    :param path: columnar file path of the year
+    :returns: path to the cube file
+    """
+    return os.path.splitext(path)[0] + CUBE_EXTENSION
+
+
+def rollup_path(path: str, name: str) -> str:
+    """
+    Returns path of the file holding a small rollup of a year partition
+
+    :param path: columnar file path of the year
+    :param name: one of ROLLUP_KEYS
+    :returns: path to the rollup file
+    """
+    assert name in ROLLUP_KEYS, f"Unknown rollup {name}"
+    return os.path.splitext(path)[0] + "." + name + ROLLUP_EXTENSION
+
+
+def cube_measures() -> Dict[str, str]:
+    """
+    Lists measure columns of the cube and how they are merged
+
+    :returns: mapping of cube column into "sum" or "max"
+    """
+    measures = {"count": "sum", "TailNum_count": "sum"}
+    for col in CUBE_MEASURES:
+        measures[col + "_count"] = "sum"
+        measures[col + "_sum"] = "sum"
+        measures[col + "_max"] = "max"
+    return measures
+
+
+def time_part(col: pd.Series, part: str) -> np.ndarray:
+    """
+    Extracts part of datetimes, missing ones get -1. Parts are computed on the underlying integers.
+
+    :param col: datetime column
+    :param part: "month" or "hour"
+    :returns: int8 array
+    """
+    values = col.values
+    if values.dtype != np.dtype("datetime64[ns]"):
+        return getattr(col.dt, part).fillna(-1).values.astype(np.int8)
+
+    if part == "month":
+        parts = values.astype("datetime64[M]").view(np.int64) % 12 + 1
+    else:
+        parts = values.view(np.int64) // (3600 * 10**9) % 24
+    return np.where(np.isnat(values), -1, parts).astype(np.int8)
+
+
+# how each key of the cube and of the small rollups is derived from flights data
+KEY_SOURCES = {
+    "UniqueCarrier": lambda flights: flights["UniqueCarrier"].values,
+    "Month": lambda flights: time_part(flights["Departure"], "month"),
+    "DayOfWeek": lambda flights: flights["DayOfWeek"].values,
+    "DepHour": lambda flights: time_part(flights["Departure"], "hour"),
+    "ArrHour": lambda flights: time_part(flights["Arrival"], "hour"),
+    "Origin": lambda flights: flights["Origin"].values,
+    "Dest": lambda flights: flights["Dest"].values,
+    "Route": lambda flights: flights["Route"].values,
+    "Cancelled": lambda flights: flights["Cancelled"].values,
+    "CancellationCode": lambda flights: flights["CancellationCode"].values,
+}
+
+
+def cube_keys(flights: pd.DataFrame, keys: List[str] = CUBE_KEYS) -> pd.DataFrame:
+    """
+    Derives key columns of flights data
+
+    :param flights: DataFrame holding flights data
+    :param keys: keys to derive, some of KEY_SOURCES
+    :returns: DataFrame with a column for each of keys
+    """
+    return pd.DataFrame({key: KEY_SOURCES[key](flights) for key in keys})
+
+
+def group_keys(keys: pd.DataFrame) -> Tuple[np.ndarray, pd.DataFrame]:
+    """
+    Numbers groups of rows with the same keys. Categorical and integer keys are combined
+    into a single integer code per row, which is the group number itself if there are few
+    enough possible combinations, otherwise the codes are hashed once. Missing keys form groups too.
+
+    :param keys: DataFrame holding key columns
+    :returns: int64 array with the group number of each row and DataFrame with keys of each group,
+        groups which do not occur in keys may be numbered too, their keys are missing
+    """
+    codes = np.zeros(len(keys), dtype=np.int64)
+    radixes = []
+    for col in keys.columns:
+        values = keys[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # missing values have code -1
+            col_codes = values.cat.codes.values.astype(np.int64) + 1
+            radix = len(values.cat.categories) + 1
+            low = -1
+        elif values.dtype.kind in "iub" and len(values) > 0:
+            low = int(values.min())
+            col_codes = values.values.astype(np.int64) - low
+            radix = int(values.max()) - low + 1
+        else:
+            radix = None
+        if radix is None or np.prod([r for _, _, r in radixes] + [radix]) >= 2**62:
+            grouped = keys.groupby(
+                list(keys.columns), observed=True, dropna=False, sort=False
+            )
+            ids = grouped.ngroup().values.astype(np.int64)
+            # groups are numbered in the order of their first rows
+            first = np.diff(np.maximum.accumulate(ids), prepend=-1) > 0
+            return ids, keys.loc[first].reset_index(drop=True)
+        codes = codes * radix + col_codes
+        radixes.append((col, low, radix))
+
+    size = int(np.prod([radix for _, _, radix in radixes]))
+    if size <= max(4 * len(codes), 2**16):
+        ids, groups = codes, np.arange(size)
+    else:
+        groups = pd.unique(codes)
+        ids = pd.Index(groups).get_indexer(codes).astype(np.int64)
+
+    # keys of the groups are decoded from their codes
+    decoded = {}
+    for col, low, radix in reversed(radixes):
+        groups, col_codes = np.divmod(groups, radix)
+        if isinstance(keys[col].dtype, pd.CategoricalDtype):
+            decoded[col] = pd.Categorical.from_codes(
+                col_codes - 1, dtype=keys[col].dtype
+            )
+        else:
+            decoded[col] = (col_codes + low).astype(keys[col].dtype)
+    return ids, pd.DataFrame({col: decoded[col] for col in keys.columns})
+
+
+def rollup(
+    keys: pd.DataFrame, flights: pd.DataFrame, measures: List[str] = None
+) -> pd.DataFrame:
+    """
+    Rolls flights data up by keys. Every combination of keys present in flights gets
+    the requested measures, see cube_measures(). Measures are computed with the grouped
+    aggregation kernels over group numbers.
+
+    :param keys: DataFrame holding some of the columns returned by cube_keys(), aligned with flights
+    :param flights: DataFrame holding flights data the measures are computed from
+    :param measures: measures to compute, if None all of cube_measures() are computed,
+        besides these a column with the "_positive" suffix gets the number of its positive values
+    :returns: DataFrame with key columns and measure columns
+    """
+    if measures is None:
+        measures = list(cube_measures())
+    ids, cube = group_keys(keys)
+    counts = group_count(ids, len(cube))
+    present = counts > 0
+    cube = cube.loc[present].reset_index(drop=True)
+
+    for measure in measures:
+        if measure == "count":
+            values = counts
+        elif measure == "TailNum_count":
+            values = np.bincount(ids, flights["TailNum"].notna().values, len(counts))
+            values = values.astype(np.int64)
+        else:
+            col, kind = measure.rsplit("_", 1)
+            col = flights[col].values
+            if kind == "count":
+                values = group_count(ids, len(counts), col)
+            elif kind == "positive":
+                values = np.bincount(ids, col > 0, len(counts)).astype(np.int64)
+            elif kind == "sum":
+                values = group_sum(ids, len(counts), col)
+            else:
+                values = group_max(ids, len(counts), col)
+                if col.dtype.kind != "f":
+                    values = np.where(present, values, 0).astype(col.dtype)
+        cube[measure] = values[present]
+    return cube
+
+
+def build_cube(flights: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rolls flights data up into a cube keyed by CUBE_KEYS. Every combination of keys present
+    in flights gets the number of flights, the number of known tail numbers and the number of
+    non empty values, sum and max of each of CUBE_MEASURES.
+
+    :param flights: DataFrame holding CUBE_SOURCES columns of flights data
+    :returns: DataFrame with key columns and measure columns
+    """
+    return rollup(cube_keys(flights), flights)
+
+
+def merge_cubes(cubes: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Merges cubes of separate parts of flights data into the cube of all of them
+
+    :param cubes: cubes returned by build_cube()
+    :returns: merged cube, sorted by its keys
+    """
+    cube = concatenate(cubes)
+    grouped = cube.groupby(CUBE_KEYS, observed=True, dropna=False, sort=True)
+    return grouped.agg(cube_measures()).reset_index()
+
+
+def fold(
+    parts: List[pd.DataFrame | pd.Series],
+    merge: Callable[[List[pd.DataFrame | pd.Series]], pd.DataFrame | pd.Series],
+    max_rows: int = CHUNK_SIZE,
+) -> List[pd.DataFrame | pd.Series]:
+    """
+    Folds summaries of consecutive chunks of flights data into the first one, which holds everything
+    merged so far, as soon as the others hold more than max_rows rows. So they don't pile up
+    until the whole year is summarized and each merge handles at least max_rows new rows.
+
+    :param parts: merged summary followed by summaries of the chunks, e.g. cubes returned by build_cube()
+    :param merge: function merging summaries into one, e.g. merge_cubes()
+    :param max_rows: number of rows of the summaries kept unmerged
+    :returns: list with the merged summary or parts if the others are small enough
+    """
+    if sum(len(part) for part in parts[1:]) > max_rows:
+        return [merge(parts)]
+    return parts
+
+
+def fold_cubes(
+    cubes: List[pd.DataFrame], max_rows: int = CHUNK_SIZE
+) -> List[pd.DataFrame]:
+    """
+    Folds cubes of consecutive chunks of flights data into the first cube, see fold()
+
+    :param cubes: merged cube followed by cubes returned by build_cube()
+    :param max_rows: number of rows of the cubes kept unmerged
+    :returns: list with the merged cube or cubes if the others are small enough
+    """
+    return fold(cubes, merge_cubes, max_rows)
+
+
+def cube_categories(path: str, keys: List[str] = CUBE_KEYS) -> Dict[str, str]:
+    """
+    Lists categorical keys of the cube encoded with the dataset wide dictionaries,
+    the same ones which are encoded in the year partition
+
+    :param path: columnar file path of the year
+    :param keys: keys of the cube, or of one of the small rollups
+    :returns: mapping of column name into name of the dictionary
+    """
+    metadata = pq.read_schema(path).metadata or {}
+    encoded = json.loads(metadata.get(DICTIONARIES_KEY, b"{}"))
+    return {col: name for col, name in encoded.items() if col in keys}
+
+
+def cube_current(path: str) -> bool:
+    """
+    Tells whether the cube of a year partition exists and is keyed by CUBE_KEYS,
+    cubes of older versions were keyed by more of them
+
+    :param path: columnar file path of the year
+    :returns: True if the cube doesn't have to be built again
+    """
+    if not os.path.exists(cube_path(path)):
+        return False
+    names = pq.read_schema(cube_path(path)).names
+    return set(names).difference(cube_measures()) == set(CUBE_KEYS)
+
+
+def write_cube(path: str) -> None:
+    """
+    Builds and saves the cube of a year partition written without it, one row group at a time
+
+    :param path: columnar file path of the year
+    """
+    file = pq.ParquetFile(path)
+    cubes = []
+    for i in range(file.num_row_groups):
+        table = file.read_row_group(i, columns=CUBE_SOURCES, use_pandas_metadata=True)
+        cubes = fold_cubes(cubes + [build_cube(to_pandas(table, path))])
+    write_partition(merge_cubes(cubes), cube_path(path), cube_categories(path))
+
+
+def build_rollups(flights: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    Rolls flights data up into the small rollups, each one keyed by its ROLLUP_KEYS.
+    Every combination of keys present in flights gets the number of flights.
+
+    :param flights: DataFrame holding ROLLUP_SOURCES columns of flights data
+    :returns: mapping of each of ROLLUP_KEYS into its rollup
+    """
+    return {
+        name: rollup(cube_keys(flights, keys), flights, ["count"])
+        for name, keys in ROLLUP_KEYS.items()
+    }
+
+
+def merge_rollups(rollups: List[Dict[str, pd.DataFrame]]) -> Dict[str, pd.DataFrame]:
+    """
+    Merges small rollups of separate parts of flights data into the rollups of all of them.
+    They are small enough to be merged as every part comes.
+
+    :param rollups: mappings returned by build_rollups()
+    :returns: mapping of each of ROLLUP_KEYS into its merged rollup, sorted by its keys
+    """
+    merged = {}
+    for name, keys in ROLLUP_KEYS.items():
+        parts = concatenate([r[name] for r in rollups])
+        grouped = parts.groupby(keys, observed=True, dropna=False, sort=True)
+        merged[name] = grouped.agg({"count": "sum"}).reset_index()
+    return merged
+
+
+def write_rollups(path: str) -> None:
+    """
+    Builds and saves the small rollups of a year partition written without them, one row group at a time
+
+    :param path: columnar file path of the year
+    """
+    file = pq.ParquetFile(path)
+    rollups = []
+    for i in range(file.num_row_groups):
+        table = file.read_row_group(i, columns=ROLLUP_SOURCES, use_pandas_metadata=True)
+        rollups = [merge_rollups(rollups + [build_rollups(to_pandas(table, path))])]
+    for name, rollup in merge_rollups(rollups).items():
+        keys = ROLLUP_KEYS[name]
+        write_partition(rollup, rollup_path(path, name), cube_categories(path, keys))
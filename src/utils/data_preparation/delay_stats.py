@@ -0,0 +1,271 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from typing import Callable, Dict, List, NamedTuple
+
+from .cube import fold, group_keys, rollup
+from .dimensions import enrich
+from .kernels import group_sum
+from .storage import (
+    list_partitions,
+    partition_path,
+    read_cached,
+    read_partition,
+    to_pandas,
+    write_partition,
+)
+from .constants import (
+    DATASETS_FOLDER,
+    DELAY_STATS_COLUMNS,
+    DELAY_STATS_EXTENSION,
+    DELAY_STATS_KEYS,
+    DIMENSIONS,
+    FLIGHTS_CATEGORIES,
+)
+
+# columns of flights data the statistics are built from
+DELAY_STATS_SOURCES = DELAY_STATS_KEYS + DELAY_STATS_COLUMNS
+DELAY_STATS_CATEGORIES = {
+    col: FLIGHTS_CATEGORIES[col] for col in ["UniqueCarrier", "TailNum"]
+}
+# sufficient statistics of every column: number of non empty values, their sum and number of positive ones
+STATISTICS = ["count", "sum", "positive"]
+
+# measures of a column computed out of its statistics, they are named f"{measure}_{column}"
+MEASURES: Dict[str, Callable] = {
+    "mean": lambda count, sum, positive: sum / count,
+    "percentage_delayed_by": lambda count, sum, positive: 100 * positive / count,
+}
+
+
+def delay_stats_path(path: str) -> str:
+    """
+    Returns path of the file holding statistics of delay causes of a year partition
+
+    :param path: columnar file path of the year
+    :returns: path to the statistics file
+    """
+    return os.path.splitext(path)[0] + DELAY_STATS_EXTENSION
+
+
+def statistics_columns(columns: List[str] = DELAY_STATS_COLUMNS) -> List[str]:
+    """
+    Lists columns holding statistics of delay causes
+
+    :param columns: some of DELAY_STATS_COLUMNS
+    :returns: f"{column}_{statistic}" for every column and each of STATISTICS
+    """
+    return [f"{col}_{statistic}" for col in columns for statistic in STATISTICS]
+
+
+def build_delay_stats(flights: pd.DataFrame) -> pd.DataFrame:
+    """
+    Sums up statistics of delay causes of every carrier and plane of flights data.
+    Groups without any known delay cause are skipped, so are years before they were reported.
+
+    :param flights: DataFrame holding DELAY_STATS_SOURCES columns
+    :returns: DataFrame with DELAY_STATS_KEYS columns and statistics_columns()
+    """
+    keys = flights[DELAY_STATS_KEYS]
+    stats = rollup(keys, flights, statistics_columns())
+    counts = stats[[f"{col}_count" for col in DELAY_STATS_COLUMNS]].values
+    return stats.loc[counts.any(axis=1)].reset_index(drop=True)
+
+
+def merge_delay_stats(stats: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Merges statistics of separate parts of flights data into the statistics of all of them.
+    Statistics are merged by all of their key columns, so that statistics of e.g. every carrier
+    are merged once the plane column is dropped.
+
+    :param stats: DataFrames with the same key columns and statistics columns
+    :raises: ValueError if there are no statistics
+    :returns: merged statistics
+    """
+    if len(stats) == 0:
+        raise ValueError("No statistics to merge")
+    stats = pd.concat(stats, ignore_index=True)
+    statistics = [col for col in stats.columns if col.rsplit("_", 1)[-1] in STATISTICS]
+    ids, merged = group_keys(stats.drop(columns=statistics))
+    for col in statistics:
+        merged[col] = group_sum(ids, len(merged), stats[col].values)
+        if col.endswith("_sum"):
+            continue
+        merged[col] = merged[col].astype(np.int64)
+    present = np.bincount(ids, minlength=len(merged)) > 0
+    return merged.loc[present].reset_index(drop=True)
+
+
+def write_delay_stats(path: str) -> None:
+    """
+    Builds and saves statistics of delay causes of a year partition written without them,
+    one row group at a time
+
+    :param path: columnar file path of the year
+    """
+    file = pq.ParquetFile(path)
+    stats = []
+    for i in range(file.num_row_groups):
+        table = file.read_row_group(
+            i, columns=DELAY_STATS_SOURCES, use_pandas_metadata=True
+        )
+        stats = fold(
+            stats + [build_delay_stats(to_pandas(table, path))], merge_delay_stats
+        )
+    write_partition(
+        merge_delay_stats(stats), delay_stats_path(path), DELAY_STATS_CATEGORIES
+    )
+
+
+class Query(NamedTuple):
+    """
+    Grouped delay statistics query, every measure of every column is computed for every group of flights.
+    It is answered out of the statistics stored for every year by prepare_data(), see run_query().
+
+    :param keys: columns flights are grouped by, some of DELAY_STATS_KEYS or columns of the dimension
+        tables of UniqueCarrier and TailNum, e.g. aircraft_type of planes, see enrich()
+    :param columns: some of DELAY_STATS_COLUMNS
+    :param measures: some of MEASURES
+    :param years: "all" or list of years, see list_partitions()
+    :param order: column of the results they are sorted by descending, if None they are sorted by keys
+    """
+
+    keys: List[str]
+    columns: List[str] = DELAY_STATS_COLUMNS
+    measures: List[str] = list(MEASURES)
+    years: str | List[str] = "all"
+    order: str = None
+
+
+class QueryState(NamedTuple):
+    """
+    Statistics of the groups of a query merged over the years it has seen, see run_query()
+
+    :param query: the query
+    :param stats: DataFrame with the keys of the query and statistics_columns() of its columns
+    :param versions: modification times of the statistics files of the years, by their names
+    """
+
+    query: Query
+    stats: pd.DataFrame
+    versions: Dict[str, float]
+
+
+# queries of queries_results, by names of their files
+QUERIES = {
+    "carriers_vs_delays": Query(["UniqueCarrier"]),
+    "aircraft_types_vs_delays": Query(
+        ["aircraft_type", "engine_type"], order="percentage_delayed_by_CarrierDelay"
+    ),
+}
+
+
+def group_stats(
+    stats: pd.DataFrame, query: Query, dir: str = DATASETS_FOLDER
+) -> pd.DataFrame:
+    """
+    Merges statistics of a year into the groups of a query, attributes of carriers and planes are
+    looked up first. Groups with missing keys, e.g. planes without plane data, are skipped.
+
+    :param stats: DataFrame returned by build_delay_stats()
+    :param query: the query
+    :param dir: target data directory
+    :raises: ValueError if some key of the query isn't known
+    :returns: DataFrame with the keys of the query and statistics_columns() of its columns
+    """
+    attributes = {}
+    unknown = [key for key in query.keys if key not in DELAY_STATS_KEYS]
+    for col in DELAY_STATS_KEYS if len(unknown) > 0 else []:
+        table = read_cached(partition_path(DIMENSIONS[col], dir))
+        cols = [key for key in unknown if key in table.columns]
+        if len(cols) > 0:
+            attributes[col] = cols
+            unknown = [key for key in unknown if key not in cols]
+    if len(unknown) > 0:
+        raise ValueError(f"Unknown keys {unknown}")
+
+    statistics = stats[statistics_columns(query.columns)]
+    if len(attributes) > 0:
+        stats = pd.concat([stats, enrich(stats, attributes, dir)], axis=1)
+    known = stats[query.keys].notna().all(axis=1).values
+    grouped = pd.concat([stats[query.keys], statistics], axis=1).loc[known]
+    return merge_delay_stats([grouped])
+
+
+def run_query(
+    query: Query, dir: str = DATASETS_FOLDER, state: QueryState = None
+) -> QueryState:
+    """
+    Answers a grouped delay statistics query out of the statistics stored for every year
+    by prepare_data(), data itself is not read. Given the state of an earlier run of the query,
+    only the years prepared since are read, unless some year was prepared again.
+
+    :param query: the query
+    :param dir: target data directory
+    :param state: state returned by an earlier run_query() of the same query, if any
+    :raises: ValueError if there are no years
+    :returns: state of the query, see query_results()
+    """
+    paths = list_partitions(query.years, dir)
+    versions = {
+        os.path.basename(path): os.path.getmtime(delay_stats_path(path))
+        for path in paths
+    }
+    if state is None or state.query != query:
+        state = QueryState(query, None, {})
+    if any(versions.get(name) != mtime for name, mtime in state.versions.items()):
+        state = QueryState(query, None, {})
+
+    stats = [] if state.stats is None else [state.stats]
+    for path in paths:
+        if os.path.basename(path) not in state.versions:
+            stats.append(
+                group_stats(read_partition(delay_stats_path(path)), query, dir)
+            )
+    return QueryState(query, merge_delay_stats(stats), versions)
+
+
+def query_results(state: QueryState) -> pd.DataFrame:
+    """
+    Computes the measures of the groups of a query, measures of groups without values are empty
+
+    :param state: state returned by run_query()
+    :returns: DataFrame with the keys of the query and f"{measure}_{column}" columns, for every column
+        and each of its measures
+    """
+    query = state.query
+    results = state.stats[query.keys].copy()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for col in query.columns:
+            stats = [
+                state.stats[f"{col}_{statistic}"].values for statistic in STATISTICS
+            ]
+            for measure in query.measures:
+                results[f"{measure}_{col}"] = MEASURES[measure](*stats)
+    if query.order is not None:
+        results = results.sort_values(query.order, ascending=False, kind="stable")
+    else:
+        # categories are sorted by their values rather than their codes
+        results = results.sort_values(
+            query.keys,
+            key=lambda col: col.astype(str) if col.dtype == "category" else col,
+        )
+    return results.reset_index(drop=True)
+
+
+def export_results(state: QueryState, name: str, dir: str, decimals: int = 2) -> str:
+    """
+    Saves the results of a query as a .csv file, see query_results(). There is no default
+    directory, so results checked in QUERIES_RESULTS_DIR are replaced only if it's passed.
+
+    :param state: state returned by run_query()
+    :param name: name of the file, e.g. one of QUERIES
+    :param dir: target directory
+    :param decimals: number of decimals the measures are rounded to
+    :returns: path of the file
+    """
+    path = os.path.join(dir, name + ".csv")
+    query_results(state).round(decimals).to_csv(path, index=False)
+    return path
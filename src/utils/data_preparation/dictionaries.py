@@ -0,0 +1,93 @@
+import os
+import json
+import pandas as pd
+
+from typing import Dict, List
+
+from .constants import (
+    DATASETS_FOLDER,
+    DICTIONARIES_FILE,
+    FLIGHTS_CATEGORIES,
+    PARTITION_CATEGORIES,
+)
+
+# loaded dictionaries with modification times of their files
+_cache = {}
+
+
+def dictionaries_path(dir: str = DATASETS_FOLDER) -> str:
+    """
+    Returns path of the file holding category dictionaries of the dataset
+
+    :param dir: target data directory
+    :returns: path to the file
+    """
+    return os.path.join(dir, DICTIONARIES_FILE)
+
+
+def load_dictionaries(dir: str = DATASETS_FOLDER) -> Dict[str, pd.Index]:
+    """
+    Loads category dictionaries shared by all the years of flights data.
+    Position of a value in its dictionary is its code in every partition.
+
+    :param dir: target data directory
+    :returns: mapping of dictionary name into its values, empty if nothing was stored yet
+    """
+    path = dictionaries_path(dir)
+    if not os.path.exists(path):
+        return {}
+
+    mtime = os.path.getmtime(path)
+    if path not in _cache or _cache[path][0] != mtime:
+        with open(path, "r") as f:
+            dictionaries = {
+                name: pd.Index(values, dtype=object)
+                for name, values in json.load(f).items()
+            }
+        _cache[path] = (mtime, dictionaries)
+    return _cache[path][1]
+
+
+def save_dictionaries(
+    dictionaries: Dict[str, pd.Index], dir: str = DATASETS_FOLDER
+) -> None:
+    """
+    Saves category dictionaries of the dataset
+
+    :param dictionaries: mapping of dictionary name into its values
+    :param dir: target data directory
+    """
+    path = dictionaries_path(dir)
+    with open(path + ".part", "w") as f:
+        json.dump({name: list(values) for name, values in dictionaries.items()}, f)
+    os.replace(path + ".part", path)
+
+
+def update_dictionaries(
+    dictionaries: Dict[str, pd.Index], found: List[Dict[str, set]]
+) -> Dict[str, pd.Index]:
+    """
+    Appends newly found values to the dictionaries. Values already present keep their
+    positions, so partitions encoded before remain valid.
+
+    :param dictionaries: mapping of dictionary name into its values
+    :param found: mappings of dictionary name into values found in each source file
+    :returns: updated dictionaries
+    """
+    updated = {}
+    for name in set(PARTITION_CATEGORIES.values()):
+        values = dictionaries.get(name, pd.Index([], dtype=object))
+        new = set().union(*[f.get(name, set()) for f in found])
+        new = sorted(new.difference(values))
+        updated[name] = values.append(pd.Index(new, dtype=object))
+    return updated
+
+
+def column_categories(dictionaries: Dict[str, pd.Index]) -> Dict[str, pd.Index]:
+    """
+    Maps categorical columns of flights data into the values of their dictionaries
+
+    :param dictionaries: mapping of dictionary name into its values
+    :returns: mapping of column name into its categories
+    """
+    return {col: dictionaries[name] for col, name in FLIGHTS_CATEGORIES.items()}
@@ -0,0 +1,224 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from typing import List
+
+from .cube import fold, group_keys, time_part
+from .storage import (
+    Filter,
+    list_partitions,
+    read_partition,
+    to_pandas,
+    write_partition,
+)
+from .constants import (
+    DATASETS_FOLDER,
+    DIGEST_COLUMNS,
+    DIGEST_COMPRESSION,
+    DIGEST_EXTENSION,
+    FLIGHTS_CATEGORIES,
+)
+
+# columns of flights data the digests are built from
+DIGEST_SOURCES = ["UniqueCarrier", "Departure"] + DIGEST_COLUMNS
+# columns of the digests apart from their keys
+CENTROIDS = ["mean", "weight"]
+DIGEST_CATEGORIES = {"UniqueCarrier": FLIGHTS_CATEGORIES["UniqueCarrier"]}
+
+
+def digest_path(path: str) -> str:
+    """
+    Returns path of the file holding t-digests of delays of a year partition
+
+    :param path: columnar file path of the year
+    :returns: path to the digest file
+    """
+    return os.path.splitext(path)[0] + DIGEST_EXTENSION
+
+
+def compress(
+    keys: pd.DataFrame,
+    means: np.ndarray,
+    weights: np.ndarray,
+    compression: int = DIGEST_COMPRESSION,
+) -> pd.DataFrame:
+    """
+    Clusters weighted values of every group of keys into t-digest centroids. Values of each group
+    are sorted and split where the arcsine scale function of their quantile crosses an integer,
+    so clusters are small in the tails and there are at most compression / 2 + 3 of them.
+    The smallest and the largest value of each group are kept as centroids of their own.
+    Values are all processed at once, they can be centroids of other digests themselves.
+
+    :param keys: DataFrame holding key columns of the values
+    :param means: values, or means of centroids
+    :param weights: numbers of values, or weights of centroids
+    :param compression: t-digest compression parameter
+    :returns: DataFrame with key columns, "mean" and "weight" of the centroids, sorted by keys and means
+    """
+    ids, groups = group_keys(keys)
+    if len(ids) == 0:
+        return keys.assign(mean=np.zeros(0), weight=np.zeros(0, dtype=np.int64))
+    # stable sorts of few bit integers are radix sorts, much faster than np.lexsort()
+    order = np.argsort(means)
+    narrow = ids[order].astype(np.min_scalar_type(ids.max()))
+    order = order[np.argsort(narrow, kind="stable")]
+    ids, means, weights = ids[order], means[order], weights[order]
+
+    # quantile of the middle of every value within its group
+    first = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    last = np.r_[first[1:], len(ids)] - 1
+    counts = last - first + 1
+    before = np.cumsum(weights) - weights
+    before = before - np.repeat(before[first], counts)
+    totals = np.repeat(np.add.reduceat(weights, first), counts)
+    quantiles = (before + weights / 2) / totals
+
+    size = compression // 2 + 3
+    scale = compression / (2 * np.pi) * np.arcsin(2 * quantiles - 1) + compression / 4
+    clusters = np.floor(scale).astype(np.int64) + 1
+    clusters[last] = size - 1
+    clusters[first] = 0
+
+    starts = np.flatnonzero(np.r_[True, np.diff(ids * size + clusters) != 0])
+    weight = np.add.reduceat(weights, starts)
+    mean = np.add.reduceat(means * weights, starts) / weight
+
+    centroids = groups.iloc[ids[starts]].reset_index(drop=True)
+    centroids["mean"] = mean.astype(np.float64)
+    centroids["weight"] = weight.astype(np.int64)
+    return centroids
+
+
+def build_digests(
+    flights: pd.DataFrame, compression: int = DIGEST_COMPRESSION
+) -> pd.DataFrame:
+    """
+    Builds t-digests of every column of DIGEST_COLUMNS for every carrier and month of departure
+    of flights data, see compress(). Empty values are skipped, unknown months are -1.
+
+    :param flights: DataFrame holding DIGEST_SOURCES columns
+    :param compression: t-digest compression parameter
+    :returns: DataFrame with UniqueCarrier, Month, column, mean and weight columns
+    """
+    carriers = flights["UniqueCarrier"].values
+    n = len(DIGEST_COLUMNS)
+    months = time_part(flights["Departure"], "month")
+    columns = pd.Categorical.from_codes(
+        np.repeat(np.arange(n), len(flights)), DIGEST_COLUMNS
+    )
+    values = np.concatenate([flights[col].values for col in DIGEST_COLUMNS])
+    known = ~np.isnan(values)
+
+    keys = pd.DataFrame(
+        {
+            "UniqueCarrier": pd.Categorical.from_codes(
+                np.tile(carriers.codes, n)[known], dtype=carriers.dtype
+            ),
+            "Month": np.tile(months, n)[known],
+            "column": columns[known],
+        }
+    )
+    values = values[known].astype(np.float64)
+    return compress(keys, values, np.ones(len(values), dtype=np.int64), compression)
+
+
+def merge_digests(
+    digests: List[pd.DataFrame], compression: int = DIGEST_COMPRESSION
+) -> pd.DataFrame:
+    """
+    Merges t-digests of separate parts of flights data into the digests of all of them.
+    Digests are merged by all of their key columns, so that digests of e.g. every season are merged
+    once months are mapped into seasons and digests of all carriers once the carrier column is dropped.
+
+    :param digests: DataFrames with the same key columns, mean and weight columns
+    :param compression: t-digest compression parameter
+    :raises: ValueError if there are no digests
+    :returns: merged digests
+    """
+    if len(digests) == 0:
+        raise ValueError("No digests to merge")
+    digest = pd.concat(digests, ignore_index=True)
+    keys = digest[[col for col in digest.columns if col not in CENTROIDS]]
+    return compress(
+        keys, digest["mean"].values, digest["weight"].values, compression=compression
+    )
+
+
+def quantiles(digest: pd.DataFrame, probabilities: List[float]) -> pd.DataFrame:
+    """
+    Estimates quantiles of every digest, interpolating between the centers of its centroids
+
+    :param digest: DataFrame returned by compress() or merge_digests()
+    :param probabilities: probabilities of the quantiles, from 0 to 1
+    :returns: DataFrame indexed by keys of the digests, with a column for each probability
+    """
+    keys = digest[[col for col in digest.columns if col not in CENTROIDS]]
+    ids, groups = group_keys(keys)
+    weights = digest["weight"].values
+    first = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    counts = np.diff(np.r_[first, len(ids)])
+    totals = np.add.reduceat(weights, first)
+
+    # centers of the centroids within their digests, digests are laid one after another
+    before = np.cumsum(weights) - weights
+    offsets = before[first]
+    centers = before + weights / 2
+    low, high = centers[first], centers[np.r_[first[1:], len(ids)] - 1]
+
+    result = {}
+    for p in probabilities:
+        targets = np.clip(offsets + p * totals, low, high)
+        result[p] = np.interp(targets, centers, digest["mean"].values)
+    index = pd.MultiIndex.from_frame(groups.iloc[ids[first]])
+    return pd.DataFrame(result, index=index)
+
+
+def read_digests(path: str, filters: List[Filter] = None) -> pd.DataFrame:
+    """
+    Reads t-digests saved by write_digests(), columns of all of them share the same categories
+
+    :param path: file path
+    :param filters: list of (column, operator, value) triples, see read_partition()
+    :returns: DataFrame with UniqueCarrier, Month, column, mean and weight columns
+    """
+    digest = read_partition(path, filters=filters)
+    digest["column"] = pd.Categorical(digest["column"], categories=DIGEST_COLUMNS)
+    return digest
+
+
+def write_digests(path: str) -> None:
+    """
+    Builds and saves t-digests of a year partition written without them, one row group at a time
+
+    :param path: columnar file path of the year
+    """
+    file = pq.ParquetFile(path)
+    digests = []
+    for i in range(file.num_row_groups):
+        table = file.read_row_group(i, columns=DIGEST_SOURCES, use_pandas_metadata=True)
+        digests = fold(digests + [build_digests(to_pandas(table, path))], merge_digests)
+    write_partition(merge_digests(digests), digest_path(path), DIGEST_CATEGORIES)
+
+
+def load_digests(
+    years: str | List[str] = "all",
+    columns: List[str] = None,
+    dir: str = DATASETS_FOLDER,
+) -> pd.DataFrame:
+    """
+    Loads t-digests of delays of every carrier and month stored for every year by prepare_data(),
+    merged over years. Data itself is not read.
+
+    :param years: "all" or list of years, see list_partitions()
+    :param columns: some of DIGEST_COLUMNS, if None all of them are loaded
+    :param dir: target data directory
+    :raises: ValueError if there are no years
+    :returns: DataFrame with UniqueCarrier, Month, column, mean and weight columns
+    """
+    filters = None if columns is None else [("column", "in", columns)]
+    digests = [
+        read_digests(digest_path(path), filters) for path in list_partitions(years, dir)
+    ]
+    return merge_digests(digests)
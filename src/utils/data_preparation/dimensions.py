@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+
+from typing import Dict, List
+
+from .dictionaries import dictionaries_path, load_dictionaries
+from .storage import outdated, partition_path, read_cached, write_partition
+from .constants import (
+    DATASETS_FOLDER,
+    DIMENSION_INDEX_SUFFIX,
+    DIMENSION_KEYS,
+    DIMENSIONS,
+    FLIGHTS_CATEGORIES,
+)
+
+
+def key_rows(keys: pd.Series, codes: pd.Index) -> np.ndarray:
+    """
+    Finds the row of a table holding every key, the first one if there are more of them
+
+    :param keys: key column of the table
+    :param codes: keys to be found
+    :returns: int32 array of the rows, -1 for the keys which aren't in the table
+    """
+    keys = keys.dropna().drop_duplicates()
+    positions = pd.Index(keys.values).get_indexer(codes)
+    return np.where(positions < 0, -1, keys.index.values[positions]).astype(np.int32)
+
+
+def gather_rows(values: pd.Series, rows: np.ndarray, codes: pd.Index) -> np.ndarray:
+    """
+    Looks up rows of a table for every value of a categorical column, by the codes of its values
+
+    :param values: categorical Series
+    :param rows: row of every code of codes, -1 if there is none, see key_rows()
+    :param codes: dictionary the rows were found for, categories of values are usually the same
+    :returns: int array of the rows of the values, -1 for missing values and the ones without a row
+    """
+    categories = values.cat.categories
+    if categories.equals(codes[: len(categories)]):
+        lookup = rows[: len(categories)]
+    else:
+        lookup = np.r_[rows, -1][codes.get_indexer(categories)]
+    return np.r_[lookup, -1][values.cat.codes.values]
+
+
+def take_rows(table: pd.DataFrame, rows: np.ndarray, cols: List[str]) -> pd.DataFrame:
+    """
+    Takes rows of a table, rows -1 are empty and integer columns become floats then
+
+    :param table: DataFrame
+    :param rows: int array of the rows, see gather_rows()
+    :param cols: columns to be taken
+    :returns: DataFrame with cols columns and a row for every one of rows
+    """
+    return pd.DataFrame(
+        {
+            col: pd.api.extensions.take(table[col].values, rows, allow_fill=True)
+            for col in cols
+        }
+    )
+
+
+def dimension_index(name: str, dir: str = DATASETS_FOLDER) -> np.ndarray:
+    """
+    Loads the rows of a dimension table of every code of the dictionary its flights columns are
+    encoded with, see DIMENSIONS. It is prepared on first use and again whenever the table
+    or the dictionary change, it is kept in memory afterwards.
+
+    :param name: one of DIMENSION_KEYS
+    :param dir: target data directory
+    :returns: int32 array, element i is the row of code i, -1 if the table has no such key
+    """
+    column = [col for col, table in DIMENSIONS.items() if table == name][0]
+    table = partition_path(name, dir)
+    path = partition_path(name + DIMENSION_INDEX_SUFFIX, dir)
+    if outdated(path, [table, dictionaries_path(dir)]):
+        codes = load_dictionaries(dir).get(FLIGHTS_CATEGORIES[column], pd.Index([]))
+        keys = read_cached(table)[DIMENSION_KEYS[name]]
+        write_partition(pd.DataFrame({"row": key_rows(keys, codes)}), path)
+    return read_cached(path)["row"].values
+
+
+def enrich(
+    flights: pd.DataFrame,
+    attributes: Dict[str, List[str] | Dict[str, str]],
+    dir: str = DATASETS_FOLDER,
+) -> pd.DataFrame:
+    """
+    Looks up attributes of carriers, planes or airports of flights, e.g. models of the planes.
+    Rows of the dimension tables are gathered by codes of the flights columns, no merge is made,
+    so every flight gets a single row. Attributes of flights with missing keys or keys which
+    aren't in the tables are empty, integer attributes become floats then.
+
+    :param flights: DataFrame holding the categorical columns of DIMENSIONS looked up
+    :param attributes: mapping of flights column of DIMENSIONS into columns of its dimension table,
+        or into a mapping of these columns into names they get, e.g.
+        {"TailNum": ["model"], "Origin": {"lat": "OriginLat"}, "Dest": {"lat": "DestLat"}}
+    :param dir: target data directory
+    :raises: ValueError if some name is given twice or flights already have such a column
+    :returns: DataFrame with the attributes, indexed like flights
+    """
+    dictionaries = load_dictionaries(dir)
+    attached = []
+    for column, cols in attributes.items():
+        name = DIMENSIONS[column]
+        names = cols if isinstance(cols, dict) else {col: col for col in cols}
+        codes = dictionaries.get(FLIGHTS_CATEGORIES[column], pd.Index([]))
+        rows = gather_rows(flights[column], dimension_index(name, dir), codes)
+        table = read_cached(partition_path(name, dir))
+        attached.append(take_rows(table, rows, list(names)).rename(columns=names))
+
+    result = pd.concat(attached, axis=1).set_index(flights.index)
+    taken = result.columns[
+        result.columns.duplicated() | result.columns.isin(flights.columns)
+    ]
+    if len(taken) > 0:
+        raise ValueError(f"Columns {list(taken)} are already there")
+    return result
@@ -0,0 +1,108 @@
+import os
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+
+from typing import List
+from matplotlib.path import Path
+
+from .dictionaries import load_dictionaries
+from .load_data import load_airports
+from .storage import partition_path, read_cached, write_partition
+from .constants import (
+    DATASETS_FOLDER,
+    AIRPORT_GEOMETRY_TABLE,
+    BASEMAP_COUNTRY,
+    BASEMAP_TABLE,
+    FLIGHTS_CATEGORIES,
+)
+
+
+def write_basemap(dir: str = DATASETS_FOLDER) -> None:
+    """
+    Saves the outline of BASEMAP_COUNTRY out of the naturalearth dataset shipped with geopandas.
+    Its polygons are stored as vertices of their rings, ready to be drawn in longitude and latitude.
+
+    :param dir: target data directory
+    """
+    world = gpd.read_file(gpd.datasets.get_path("naturalearth_lowres"))
+    country = world.loc[world["name"] == BASEMAP_COUNTRY].geometry.explode(
+        index_parts=False
+    )
+    rings = [
+        (i, j, np.asarray(ring.coords)[:, :2])
+        for i, polygon in enumerate(country)
+        for j, ring in enumerate([polygon.exterior] + list(polygon.interiors))
+    ]
+    vertices = pd.DataFrame(
+        {
+            "polygon": np.concatenate([np.full(len(xy), i) for i, _, xy in rings]),
+            "ring": np.concatenate([np.full(len(xy), j) for _, j, xy in rings]),
+            "x": np.concatenate([xy[:, 0] for _, _, xy in rings]),
+            "y": np.concatenate([xy[:, 1] for _, _, xy in rings]),
+        }
+    ).astype({"polygon": np.int32, "ring": np.int32})
+    write_partition(vertices, partition_path(BASEMAP_TABLE, dir))
+
+
+def load_basemap(dir: str = DATASETS_FOLDER) -> List[Path]:
+    """
+    Loads the outline of BASEMAP_COUNTRY, prepared on first use and kept in memory afterwards
+
+    :param dir: target data directory
+    :returns: a path of each polygon, made of the paths of its exterior and interior rings
+    """
+    path = partition_path(BASEMAP_TABLE, dir)
+    if not os.path.exists(path):
+        write_basemap(dir)
+    vertices = read_cached(path)
+
+    polygon, ring = vertices["polygon"].values, vertices["ring"].values
+    starts = np.flatnonzero(np.r_[True, np.diff(polygon) != 0, True])
+    rings = np.flatnonzero(np.r_[True, np.diff(ring) != 0])
+    xy = vertices[["x", "y"]].values
+    return [
+        Path.make_compound_path(
+            *[
+                Path(ring_xy)
+                for ring_xy in np.split(
+                    xy[start:stop], rings[(rings > start) & (rings < stop)] - start
+                )
+            ]
+        )
+        for start, stop in zip(starts[:-1], starts[1:])
+    ]
+
+
+def write_airport_geometry(dir: str = DATASETS_FOLDER) -> None:
+    """
+    Saves locations and cities of airports in the order of the airport dictionary,
+    so that they are looked up by airport codes. Airports missing in airports data have empty rows.
+
+    :param dir: target data directory
+    """
+    codes = load_dictionaries(dir)[FLIGHTS_CATEGORIES["Origin"]]
+    airports = load_airports(dir, ["iata", "city", "lat", "long"])
+    airports = airports.drop_duplicates(subset=["iata"]).set_index("iata")
+    geometry = airports.reindex(pd.Index(codes, name="iata"))
+    geometry["known"] = pd.Index(codes).isin(airports.index)
+    write_partition(geometry.reset_index(), partition_path(AIRPORT_GEOMETRY_TABLE, dir))
+
+
+def airport_geometry(dir: str = DATASETS_FOLDER) -> pd.DataFrame:
+    """
+    Loads locations of airports, row i describes the airport of code i of the airport dictionary.
+    It is prepared on first use and again whenever airports data or the dictionary change,
+    it is kept in memory afterwards.
+
+    :param dir: target data directory
+    :returns: DataFrame with iata, city, lat, long and known columns, it must not be modified
+    """
+    path = partition_path(AIRPORT_GEOMETRY_TABLE, dir)
+    airports = partition_path("airports", dir)
+    size = len(load_dictionaries(dir)[FLIGHTS_CATEGORIES["Origin"]])
+    if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(airports):
+        write_airport_geometry(dir)
+    elif len(read_cached(path)) != size:
+        write_airport_geometry(dir)
+    return read_cached(path)
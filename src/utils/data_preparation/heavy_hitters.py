@@ -0,0 +1,200 @@
+import os
+import numpy as np
+import pandas as pd
+
+from typing import Dict, List, NamedTuple
+
+from .cube import cube_path, group_keys
+from .kernels import group_sum
+from .storage import list_partitions, read_partition, write_partition
+from .constants import (
+    DATASETS_FOLDER,
+    FLIGHTS_CATEGORIES,
+    ROUTE_DICTIONARY,
+    TOPK_CAPACITY,
+    TOPK_EXTENSION,
+    TOPK_SUMMARIES,
+)
+
+# key columns of each summary and the dataset wide dictionaries they are encoded with
+TOPK_KEYS = {"routes": ["Route"], "airports": ["Airport"]}
+TOPK_CATEGORIES = {"Route": ROUTE_DICTIONARY, "Airport": FLIGHTS_CATEGORIES["Origin"]}
+
+
+class HeavyHitters(NamedTuple):
+    """
+    Space-Saving summary of the most frequent keys. True count of a listed key is
+    between count - error and count, count of any key which isn't listed is at most floor.
+    Summaries of separate parts of flights data can be merged, see merge_heavy_hitters().
+
+    :param counts: DataFrame with key columns, "count" and "error", sorted by count descending
+    :param floor: upper bound of counts of the keys which aren't listed
+    """
+
+    counts: pd.DataFrame
+    floor: int
+
+
+def topk_path(path: str, name: str) -> str:
+    """
+    Returns path of the file holding a summary of the most frequent keys of a year partition
+
+    :param path: columnar file path of the year
+    :param name: one of TOPK_SUMMARIES
+    :returns: path to the summary file
+    """
+    assert name in TOPK_SUMMARIES, f"Unknown summary {name}"
+    return os.path.splitext(path)[0] + "." + name + TOPK_EXTENSION
+
+
+def truncate(counts: pd.DataFrame, floor: int, capacity: int) -> HeavyHitters:
+    """
+    Keeps capacity keys with the highest counts, ties are broken by the order of the keys.
+    The highest count dropped becomes the floor if it is higher.
+
+    :param counts: DataFrame with key columns, "count" and "error"
+    :param floor: upper bound of counts of the keys which aren't listed in counts
+    :param capacity: maximum number of keys kept
+    :returns: the summary
+    """
+    keys = [counts[col].cat.codes.values for col in reversed(counts.columns[:-2])]
+    order = np.lexsort(keys + [-counts["count"].values])
+    if len(order) > capacity:
+        floor = max(floor, int(counts["count"].values[order[capacity]]))
+    counts = counts.iloc[order[:capacity]].reset_index(drop=True)
+    return HeavyHitters(counts, floor)
+
+
+def heavy_hitters(
+    keys: pd.DataFrame, weights: np.ndarray = None, capacity: int = TOPK_CAPACITY
+) -> HeavyHitters:
+    """
+    Summarizes the most frequent keys. Counts are exact before they are truncated to capacity keys,
+    so errors of the listed keys are 0. Rows with missing keys are skipped.
+
+    :param keys: DataFrame holding categorical key columns
+    :param weights: counts of the rows, e.g. numbers of flights of the rows of a rollup cube,
+        if None every row counts once
+    :param capacity: maximum number of keys kept
+    :returns: the summary
+    """
+    known = keys.notna().all(axis=1).values
+    keys = keys.loc[known]
+    weights = np.ones(len(keys)) if weights is None else weights[known]
+
+    ids, groups = group_keys(keys)
+    counts = group_sum(ids, len(groups), weights).astype(np.int64)
+    groups["count"] = counts
+    groups["error"] = np.zeros(len(groups), dtype=np.int64)
+    return truncate(groups.loc[counts > 0], 0, capacity)
+
+
+def merge_heavy_hitters(
+    summaries: List[HeavyHitters], capacity: int = TOPK_CAPACITY
+) -> HeavyHitters:
+    """
+    Merges summaries of separate parts of flights data into the summary of all of them.
+    A key missing in some summary may have occurred there up to its floor times, so counts and errors
+    of such keys grow by the floor.
+
+    :param summaries: summaries with the same key columns
+    :param capacity: maximum number of keys kept
+    :raises: ValueError if there are no summaries
+    :returns: merged summary
+    """
+    if len(summaries) == 0:
+        raise ValueError("No summaries to merge")
+    floor = sum(summary.floor for summary in summaries)
+    counts = pd.concat(
+        [
+            # floors of the summaries the key is listed in are added back
+            summary.counts.assign(
+                count=summary.counts["count"] - summary.floor,
+                error=summary.counts["error"] - summary.floor,
+            )
+            for summary in summaries
+        ],
+        ignore_index=True,
+    )
+
+    ids, groups = group_keys(counts.iloc[:, :-2])
+    for col in ["count", "error"]:
+        sums = group_sum(ids, len(groups), counts[col].values)
+        groups[col] = sums.astype(np.int64) + floor
+    present = np.bincount(ids, minlength=len(groups)) > 0
+    return truncate(groups.loc[present], floor, capacity)
+
+
+def build_heavy_hitters(
+    cube: pd.DataFrame, capacity: int = TOPK_CAPACITY
+) -> Dict[str, HeavyHitters]:
+    """
+    Summarizes the most popular routes and airports of flights data out of its rollup cube.
+    Routes are undirected, see route_codes(), airports count both their departures and arrivals.
+
+    :param cube: DataFrame holding Route, Origin, Dest and count columns of a rollup cube
+    :param capacity: maximum number of keys kept by each summary
+    :returns: mapping of each of TOPK_SUMMARIES into its summary
+    """
+    counts = cube["count"].values
+    airports = pd.DataFrame(
+        {"Airport": pd.concat([cube["Origin"], cube["Dest"]], ignore_index=True)}
+    )
+    return {
+        "routes": heavy_hitters(cube[TOPK_KEYS["routes"]], counts, capacity),
+        "airports": heavy_hitters(airports, np.r_[counts, counts], capacity),
+    }
+
+
+def write_heavy_hitters(summary: HeavyHitters, path: str) -> None:
+    """
+    Saves a summary into a columnar file, its floor is repeated in a column
+
+    :param summary: the summary
+    :param path: target file path
+    """
+    encoded = {col: TOPK_CATEGORIES[col] for col in summary.counts.columns[:-2]}
+    write_partition(summary.counts.assign(floor=summary.floor), path, encoded)
+
+
+def read_heavy_hitters(path: str) -> HeavyHitters:
+    """
+    Loads a summary saved by write_heavy_hitters()
+
+    :param path: file path
+    :returns: the summary
+    """
+    counts = read_partition(path)
+    floor = int(counts["floor"].iloc[0]) if len(counts) > 0 else 0
+    return HeavyHitters(counts.drop(columns="floor"), floor)
+
+
+def write_topk(path: str) -> None:
+    """
+    Builds and saves summaries of a year partition written without them out of its rollup cube
+
+    :param path: columnar file path of the year
+    """
+    cube = read_partition(cube_path(path), ["Route", "Origin", "Dest", "count"])
+    for name, summary in build_heavy_hitters(cube).items():
+        write_heavy_hitters(summary, topk_path(path, name))
+
+
+def most_popular(
+    name: str, years: str | List[str] = "all", k: int = 10, dir: str = DATASETS_FOLDER
+) -> pd.DataFrame:
+    """
+    Finds the most popular routes or airports over years, merging the summaries stored
+    for every year by prepare_data(). Data itself is not read.
+
+    :param name: one of TOPK_SUMMARIES
+    :param years: "all" or list of years, see list_partitions()
+    :param k: number of keys to find, at most TOPK_CAPACITY
+    :param dir: target data directory
+    :raises: ValueError if there are no years
+    :returns: DataFrame with key columns, "count" and "error", the true number of flights
+        is between count - error and count
+    """
+    paths = [topk_path(path, name) for path in list_partitions(years, dir)]
+    summary = merge_heavy_hitters([read_heavy_hitters(path) for path in paths])
+    return summary.counts.iloc[:k]
@@ -0,0 +1,165 @@
+import numpy as np
+import pandas as pd
+
+from typing import Tuple
+
+# aggregations computed by the kernels
+KERNELS = ["count", "sum", "max", "min", "mean"]
+
+
+def key_codes(key: pd.Series) -> Tuple[np.ndarray, pd.Index]:
+    """
+    Encodes group keys as dense integer codes. Categorical keys use their codes,
+    integer keys are shifted by their minimum, others are factorized.
+    Codes start from 1, so that missing keys get 0 and need no filtering.
+
+    :param key: column holding group keys
+    :returns: codes of the keys and Index of the keys each code from 1 on stands for
+    """
+    if isinstance(key.dtype, pd.CategoricalDtype):
+        index = pd.CategoricalIndex(key.cat.categories, dtype=key.dtype, name=key.name)
+        return key.cat.codes.values.astype(np.intp) + 1, index
+    if key.dtype.kind in "iub" and len(key) > 0:
+        low, high = int(key.min()), int(key.max())
+        index = pd.Index(np.arange(low, high + 1).astype(key.dtype), name=key.name)
+        return key.values.astype(np.intp) - (low - 1), index
+    codes, uniques = pd.factorize(key, sort=True)
+    return codes.astype(np.intp) + 1, pd.Index(uniques, name=key.name)
+
+
+def group_count(codes: np.ndarray, size: int, values: np.ndarray = None) -> np.ndarray:
+    """
+    Counts rows of each group, or their non empty values
+
+    :param codes: group codes of the rows, from 0 to size - 1
+    :param size: number of groups
+    :param values: values of the rows, if None all the rows are counted
+    :returns: int64 array of counts
+    """
+    if values is None or values.dtype.kind != "f":
+        return np.bincount(codes, minlength=size).astype(np.int64)
+    return np.bincount(codes, ~np.isnan(values), size).astype(np.int64)
+
+
+def group_sum(codes: np.ndarray, size: int, values: np.ndarray) -> np.ndarray:
+    """
+    Sums values of each group, empty values are skipped and groups without values sum to 0
+
+    :param codes: group codes of the rows, from 0 to size - 1
+    :param size: number of groups
+    :param values: values of the rows
+    :returns: float64 array of sums
+    """
+    if values.dtype.kind == "f":
+        values = np.where(np.isnan(values), 0, values)
+    return np.bincount(codes, values, size)
+
+
+def group_max(codes: np.ndarray, size: int, values: np.ndarray) -> np.ndarray:
+    """
+    Finds the maximum value of each group, empty values are skipped
+
+    :param codes: group codes of the rows, from 0 to size - 1
+    :param size: number of groups
+    :param values: values of the rows
+    :returns: float array of maximums, NaN for groups without values
+    """
+    result = np.full(size, np.nan, dtype=np.result_type(values.dtype, np.float32))
+    np.fmax.at(result, codes, values)
+    return result
+
+
+def group_min(codes: np.ndarray, size: int, values: np.ndarray) -> np.ndarray:
+    """
+    Finds the minimum value of each group, empty values are skipped
+
+    :param codes: group codes of the rows, from 0 to size - 1
+    :param size: number of groups
+    :param values: values of the rows
+    :returns: float array of minimums, NaN for groups without values
+    """
+    result = np.full(size, np.nan, dtype=np.result_type(values.dtype, np.float32))
+    np.fmin.at(result, codes, values)
+    return result
+
+
+def group_mean(codes: np.ndarray, size: int, values: np.ndarray) -> np.ndarray:
+    """
+    Averages values of each group, empty values are skipped
+
+    :param codes: group codes of the rows, from 0 to size - 1
+    :param size: number of groups
+    :param values: values of the rows
+    :returns: float64 array of means, NaN for groups without values
+    """
+    counts = group_count(codes, size, values)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return group_sum(codes, size, values) / counts
+
+
+def groupby_aggregate(
+    key: pd.Series, values: pd.Series = None, how: str = "count", observed: bool = False
+) -> pd.Series:
+    """
+    Aggregates values grouped by key, the same way key.groupby(key)[values].agg(how) does
+    (size() if values is None), including the order and the dtypes of the result.
+    Rows with missing keys are skipped. Keys are expected to be small dense integers or categories.
+
+    :param key: column holding group keys
+    :param values: column holding values aligned with key, if None rows are counted
+    :param how: one of KERNELS
+    :param observed: if False all the categories of a categorical key are listed, see pd.DataFrame.groupby()
+    :returns: Series indexed by the keys
+    """
+    assert how in KERNELS, f"Unknown aggregation {how}"
+    assert values is not None or how == "count", "Only count doesn't need values"
+    codes, index = key_codes(key)
+    data = None if values is None else values.values
+
+    # the first group holds rows with missing keys
+    size = len(index) + 1
+    counts = group_count(codes, size)
+    if counts[0] > len(codes) // 2:
+        # mostly missing keys, e.g. cancellation codes, are cheaper to filter out first
+        known = codes > 0
+        codes = codes[known]
+        data = None if data is None else data[known]
+        counts[0] = 0
+    present = counts[1:] > 0
+    if how == "count":
+        result = counts if data is None else group_count(codes, size, data)
+    elif how == "sum":
+        result = group_sum(codes, size, data)
+    else:
+        kernel = {"max": group_max, "min": group_min, "mean": group_mean}[how]
+        result = kernel(codes, size, data)
+
+    result = result[1:]
+    if observed or not isinstance(key.dtype, pd.CategoricalDtype):
+        index, result = index[present], result[present]
+    return pd.Series(
+        result.astype(result_dtype(data, how, present.all() or observed)),
+        index=index,
+        name=None if values is None else values.name,
+    )
+
+
+def result_dtype(values: np.ndarray | None, how: str, complete: bool) -> np.dtype:
+    """
+    Decides the dtype pandas gives to the aggregates of values
+
+    :param values: aggregated values, None if rows are counted
+    :param how: one of KERNELS
+    :param complete: whether every group has some rows
+    :returns: dtype of the aggregates
+    """
+    if how == "count":
+        return np.dtype(np.int64)
+    kind = values.dtype.kind
+    if how == "sum" and kind in "iub":
+        return np.dtype(np.uint64 if kind == "u" else np.int64)
+    if how in ["max", "min"] and kind in "iub":
+        return values.dtype if complete else np.dtype(np.float64)
+    if kind == "f":
+        return values.dtype
+    return np.dtype(np.float64)
@@ -1,37 +1,169 @@
-import pandas as pd
 import os
-from .constants import DATASETS_FOLDER
-
-URL = "https://raw.githubusercontent.com/jpatokal/openflights/master/data/airports.dat"
-
-
-def load_airports_details():
-    try:
-        airports_details = pd.read_pickle(
-            os.path.join(DATASETS_FOLDER, "airports_details.pkl")
-        )
-    except:
-        airports_details = pd.read_csv(
-            URL,
-            header=None,
-            names=[
-                "airportID",
-                "name",
-                "city",
-                "country",
-                "iata",
-                "icao",
-                "lat",
-                "lon",
-                "altitude",
-                "timezone",
-                "dst",
-                "tz",
-                "type",
-                "source",
-            ],
-        )
-        airports_details.to_pickle(
-            os.path.join(DATASETS_FOLDER, "airports_details.pkl")
-        )
-    return airports_details
+import logging
+import numpy as np
+import pandas as pd
+import urllib.request
+
+from typing import List
+
+from .dictionaries import dictionaries_path, load_dictionaries
+from .load_data import load_airports
+from .dimensions import gather_rows, key_rows, take_rows
+from .storage import outdated, partition_path, read_cached, write_partition
+from .constants import (
+    DATASETS_FOLDER,
+    AIRPORTS_DETAILS_DTYPES,
+    AIRPORTS_DETAILS_FILE,
+    AIRPORTS_DETAILS_INDEX_TABLE,
+    AIRPORTS_DETAILS_TABLE,
+    AIRPORTS_DETAILS_URL,
+    FLIGHTS_CATEGORIES,
+    LEGACY_EXTENSION,
+)
+
+# columns of the airports table matching the airport details, used when there are no details
+AIRPORTS_COLUMNS = {
+    "iata": "iata",
+    "airport": "name",
+    "city": "city",
+    "country": "country",
+    "lat": "lat",
+    "long": "lon",
+}
+# data directories which airport details couldn't be downloaded into, they aren't tried again
+_offline = set()
+
+
+def validate_airports_details(details: pd.DataFrame) -> pd.DataFrame:
+    """
+    Casts airport details to AIRPORTS_DETAILS_DTYPES, missing columns are empty
+
+    :param details: DataFrame with some of AIRPORTS_DETAILS_DTYPES columns
+    :raises: ValueError if there is no iata column or some column isn't in AIRPORTS_DETAILS_DTYPES
+    :returns: DataFrame with AIRPORTS_DETAILS_DTYPES columns
+    """
+    unknown = [col for col in details.columns if col not in AIRPORTS_DETAILS_DTYPES]
+    if "iata" not in details.columns or len(unknown) > 0:
+        raise ValueError(f"Not airport details, columns: {list(details.columns)}")
+
+    details = details.reindex(columns=list(AIRPORTS_DETAILS_DTYPES))
+    details["airportID"] = details["airportID"].fillna(-1)
+    return details.astype(AIRPORTS_DETAILS_DTYPES).reset_index(drop=True)
+
+
+def read_airports_details(path: str) -> pd.DataFrame:
+    """
+    Reads airport details in the openflights airports.dat format
+
+    :param path: file path or URL
+    :returns: DataFrame with AIRPORTS_DETAILS_DTYPES columns
+    """
+    details = pd.read_csv(
+        path,
+        header=None,
+        names=list(AIRPORTS_DETAILS_DTYPES),
+        na_values=["\\N"],
+        keep_default_na=False,
+    )
+    return validate_airports_details(details)
+
+
+def write_airports_details(dir: str = DATASETS_FOLDER) -> bool:
+    """
+    Prepares the airport details out of the ones pickled by older versions or AIRPORTS_DETAILS_FILE
+    in dir, the latter is downloaded from AIRPORTS_DETAILS_URL only if both of them are missing
+
+    :param dir: target data directory
+    :returns: whether the details were prepared, False if the file is missing and can't be downloaded,
+        downloading is tried once per process
+    """
+    path = partition_path(AIRPORTS_DETAILS_TABLE, dir)
+    legacy = os.path.join(dir, AIRPORTS_DETAILS_TABLE + LEGACY_EXTENSION)
+    if os.path.exists(legacy):
+        write_partition(validate_airports_details(pd.read_pickle(legacy)), path)
+        os.remove(legacy)
+        return True
+
+    source = os.path.join(dir, AIRPORTS_DETAILS_FILE)
+    if not os.path.exists(source):
+        if dir in _offline:
+            return False
+        try:
+            logging.info(f"Downloading {AIRPORTS_DETAILS_URL}.")
+            with urllib.request.urlopen(AIRPORTS_DETAILS_URL, timeout=10) as response:
+                content = response.read()
+        except OSError as e:
+            logging.warning(f"Unable to download airport details: {e}")
+            _offline.add(dir)
+            return False
+        with open(source, "wb") as f:
+            f.write(content)
+
+    write_partition(read_airports_details(source), path)
+    return True
+
+
+def load_airports_details(dir: str = DATASETS_FOLDER) -> pd.DataFrame:
+    """
+    Loads details of airports of the openflights database. They are prepared on first use,
+    details prepared by older versions are validated. If they can't be prepared offline
+    nor downloaded, they are made of the airports table, with the columns it has.
+
+    :param dir: target data directory
+    :returns: DataFrame with AIRPORTS_DETAILS_DTYPES columns, it must not be modified
+    """
+    path = partition_path(AIRPORTS_DETAILS_TABLE, dir)
+    if not os.path.exists(path) and not write_airports_details(dir):
+        airports = load_airports(dir, list(AIRPORTS_COLUMNS))
+        return validate_airports_details(airports.rename(columns=AIRPORTS_COLUMNS))
+
+    details = read_cached(path)
+    if dict(details.dtypes.astype(str)) != AIRPORTS_DETAILS_DTYPES:
+        write_partition(validate_airports_details(details), path)
+        details = read_cached(path)
+    return details
+
+
+def airports_details_index(dir: str = DATASETS_FOLDER) -> np.ndarray:
+    """
+    Loads the rows of the airport details of the airports, element i is the row of the airport
+    of code i of the airport dictionary, -1 if it has no details. It is prepared on first use
+    and again whenever the details or the dictionary change, it is kept in memory afterwards.
+
+    :param dir: target data directory
+    :returns: int32 array, it must not be modified
+    """
+    details = load_airports_details(dir)
+    codes = load_dictionaries(dir).get(FLIGHTS_CATEGORIES["Origin"], pd.Index([]))
+    table = partition_path(AIRPORTS_DETAILS_TABLE, dir)
+    # details made of the airports table aren't stored, neither are their rows
+    if not os.path.exists(table):
+        return key_rows(details["iata"], codes)
+
+    path = partition_path(AIRPORTS_DETAILS_INDEX_TABLE, dir)
+    if outdated(path, [table, dictionaries_path(dir)]):
+        index = pd.DataFrame({"row": key_rows(details["iata"], codes)})
+        write_partition(index, path)
+    return read_cached(path)["row"].values
+
+
+def airport_details(
+    airports: pd.Series, cols: List[str] = None, dir: str = DATASETS_FOLDER
+) -> pd.DataFrame:
+    """
+    Looks up details of the airports of flights, e.g. their coordinates and timezones.
+    Rows are gathered by the codes of the airports, no merge is made. Details of airports
+    which are missing or have no details are empty, integer columns become floats then.
+
+    :param airports: categorical Series of airports, e.g. Origin or Dest column of flights data
+    :param cols: desired columns of AIRPORTS_DETAILS_DTYPES, if None all of them
+    :param dir: target data directory
+    :returns: DataFrame with the details of every airport, indexed like airports
+    """
+    details = load_airports_details(dir)
+    rows = airports_details_index(dir)
+    codes = load_dictionaries(dir).get(FLIGHTS_CATEGORIES["Origin"], pd.Index([]))
+
+    rows = gather_rows(airports, rows, codes)
+    cols = list(AIRPORTS_DETAILS_DTYPES) if cols is None else cols
+    return take_rows(details, rows, cols).set_index(airports.index)
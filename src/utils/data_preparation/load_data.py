@@ -1,23 +1,215 @@
 import os
 import sys
+import copy
 import logging
 import pandas as pd
+import pyarrow.parquet as pq
 import traceback
 import warnings
 
-from typing import List
+from typing import Callable, List, Dict, Iterator, NamedTuple
 from zipfile import ZipFile
 from multiprocessing import Pool
 from multiprocessing.pool import ThreadPool
+from pandas.io.parsers import TextFileReader
 
 from .download import download
-from .optimize import optimize, concatenate
-from .constants import DATASETS_FOLDER
+from .manifest import load_manifest, save_manifest, settings, is_current, record
+from .dictionaries import (
+    load_dictionaries,
+    save_dictionaries,
+    update_dictionaries,
+    column_categories,
+)
+from .cube import (
+    cube_path,
+    build_cube,
+    merge_cubes,
+    fold,
+    fold_cubes,
+    write_cube,
+    cube_current,
+    rollup_path,
+    build_rollups,
+    merge_rollups,
+    write_rollups,
+    CUBE_CATEGORIES,
+    ROLLUP_CATEGORIES,
+)
+from .sketches import (
+    sketch_path,
+    build_sketches,
+    merge_sketches,
+    fold_sketches,
+    write_sketch,
+    write_sketches,
+)
+from .heavy_hitters import (
+    topk_path,
+    build_heavy_hitters,
+    write_heavy_hitters,
+    write_topk,
+)
+from .digests import (
+    digest_path,
+    build_digests,
+    merge_digests,
+    write_digests,
+    DIGEST_CATEGORIES,
+)
+from .delay_stats import (
+    delay_stats_path,
+    build_delay_stats,
+    merge_delay_stats,
+    write_delay_stats,
+    DELAY_STATS_CATEGORIES,
+)
+from .timeseries import daily_path, build_daily, merge_daily, write_daily
+from .routes import route_labels, route_index, route_codes, write_routes
+from .dimensions import enrich
+from .optimize import optimize, categorize, cast_datetimes, decode_times
+from .storage import (
+    partition_path,
+    stats_path,
+    list_partitions,
+    write_partition,
+    PartitionWriter,
+    write_statistics,
+    outdated,
+    read_partition,
+    read_partitions,
+    Filter,
+)
+from .constants import (
+    DATASETS_FOLDER,
+    EXTENSION,
+    LEGACY_EXTENSION,
+    CHUNK_SIZE,
+    FLIGHTS_DTYPES,
+    FLIGHTS_CATEGORIES,
+    PARTITION_CATEGORIES,
+    ROUTE_DICTIONARY,
+    ROLLUP_KEYS,
+    SKETCH_KINDS,
+    TOPK_SUMMARIES,
+)
+
+
+class Artefact(NamedTuple):
+    """
+    Files built for every year partition of flights data next to it, e.g. its rollup cube.
+    They are built while a .bz2 file is converted, years prepared without them get them
+    built out of the partition by prepare_data().
+
+    :param paths: function returning paths of the files of a year partition
+    :param write: function building and saving the files of a year partition
+    :param current: function telling whether the files of a year partition are up to date,
+        if None they are once all of them exist
+    """
+
+    paths: Callable[[str], List[str]]
+    write: Callable[[str], None]
+    current: Callable[[str], bool] = None
+
+    def outdated(self, path: str) -> bool:
+        """
+        Tells whether the files of a year partition have to be built
+
+        :param path: columnar file path of the year
+        :returns: True if some of the files is missing or they are not up to date
+        """
+        if self.current is not None:
+            return not self.current(path)
+        return not all(os.path.exists(p) for p in self.paths(path))
 
 
-def unpack(dir: str, filename: str, datetime_features: List[str] = []) -> None:
+def topk_current(path: str) -> bool:
     """
-    Unpacks a filename into a dir
+    Tells whether summaries of a year partition exist and are newer than its cube they are built out of
+
+    :param path: columnar file path of the year
+    :returns: True if the summaries don't have to be built again
+    """
+    sources = [cube_path(path)]
+    return not any(outdated(topk_path(path, n), sources) for n in TOPK_SUMMARIES)
+
+
+# files built for every year partition, in the order they are built as some are built out of others
+ARTEFACTS = [
+    Artefact(lambda path: [cube_path(path)], write_cube, cube_current),
+    Artefact(lambda path: [rollup_path(path, n) for n in ROLLUP_KEYS], write_rollups),
+    Artefact(lambda path: [sketch_path(path, k) for k in SKETCH_KINDS], write_sketches),
+    Artefact(
+        lambda path: [topk_path(path, n) for n in TOPK_SUMMARIES],
+        write_topk,
+        topk_current,
+    ),
+    Artefact(lambda path: [digest_path(path)], write_digests),
+    Artefact(lambda path: [delay_stats_path(path)], write_delay_stats),
+    Artefact(lambda path: [daily_path(path)], write_daily),
+]
+
+
+def read_csv(filepath: str, **kwargs) -> pd.DataFrame | TextFileReader:
+    """
+    Reads a .csv or a .csv.bz2 file
+
+    :param filepath: file path
+    :param kwargs: arguments that will be passed to pd.read_csv()
+    :returns: DataFrame with read data or a reader of its chunks if chunksize was passed
+    """
+    compression = "bz2" if filepath.endswith(".bz2") else None
+    return pd.read_csv(
+        filepath, compression=compression, encoding="ISO-8859-1", **kwargs
+    )
+
+
+def collect_categories(filepath: str, chunksize: int = CHUNK_SIZE) -> Dict[str, set]:
+    """
+    Collects values of the categorical columns of flights data and the routes flown
+    by streaming through the file, only these columns are decoded
+
+    :param filepath: file path
+    :param chunksize: number of rows decoded at once
+    :returns: mapping of dictionary name into values found in the file
+    """
+    found = {name: set() for name in PARTITION_CATEGORIES.values()}
+    with read_csv(
+        filepath, usecols=list(FLIGHTS_CATEGORIES), dtype=str, chunksize=chunksize
+    ) as reader:
+        for chunk in reader:
+            for col, name in FLIGHTS_CATEGORIES.items():
+                found[name].update(chunk[col].dropna().unique())
+            found[ROUTE_DICTIONARY].update(route_labels(chunk["Origin"], chunk["Dest"]))
+    return found
+
+
+def unpack(
+    dir: str,
+    filename: str,
+    datetime_features: List[str] = [],
+    chunksize: int | None = CHUNK_SIZE,
+    dictionaries: Dict[str, pd.Index] = None,
+) -> dict:
+    """
+    Unpacks a filename into a dir. Flights data is converted chunk by chunk, with
+    types and categories fixed up front, so at most chunksize rows are held in memory.
+    Its categorical columns are encoded with the dataset wide dictionaries, so is the Route
+    of every flight, see route_codes().
+    Flights data is also rolled up into a cube, see build_cube(), and into small rollups
+    for keys left out of it, see build_rollups(). Distinct tail numbers
+    of every carrier are sketched, see build_sketches(). The most popular routes and airports
+    are summarized out of the cube, see build_heavy_hitters(). Delays of every carrier and month
+    are summarized by t-digests, see build_digests(), and statistics of delay causes of every
+    carrier and plane are summed up, see build_delay_stats(). Flights arriving on every day are
+    counted into the daily time series, see build_daily().
+
+    :param dir: target data directory
+    :param filename: name of the file to be converted
+    :param datetime_features: List of columns that can be casted to datetime, which significantly reduces space usage
+    :param chunksize: number of flights data rows converted at once, if None entire file is converted at once
+    :param dictionaries: dataset wide dictionaries containing all values of the file, if None they are updated with the file's values
+    :returns: entry of the manifest describing the file
     """
     warnings.simplefilter("ignore")
 
@@ -25,44 +217,195 @@ def unpack(dir: str, filename: str, datetime_features: List[str] = []) -> None:
         compression = filename.endswith(".bz2")
 
         filepath = os.path.join(dir, filename)
-        newfilepath = os.path.splitext(filepath)[0]
-        if compression:
-            newfilepath = os.path.splitext(newfilepath)[0] + ".pkl"
+        newfilepath = partition_path(filename.split(".")[0], dir)
+
+        if not compression:
+            df = read_csv(filepath)
+            old_size = sys.getsizeof(df)
+            optimize(df, datetime_features)
+            new_size = sys.getsizeof(df)
+            write_partition(df, newfilepath)
         else:
-            newfilepath += ".pkl"
-
-        if not os.path.exists(newfilepath):
-            if compression:
-                df = pd.read_csv(filepath, compression="bz2", encoding="ISO-8859-1")
+            if dictionaries is None:
+                found = collect_categories(filepath, chunksize or CHUNK_SIZE)
+                dictionaries = update_dictionaries(load_dictionaries(dir), [found])
+                save_dictionaries(dictionaries, dir)
+            categories = column_categories(dictionaries)
+            # routes are looked up by pairs of airports, see route_codes()
+            routes = route_index(dictionaries)
+
+            if chunksize is None:
+                df = read_csv(filepath)
+                old_size = sys.getsizeof(df)
+                optimize(df, datetime_features, flights_data=True)
+                categorize(df, categories)
+                df["Route"] = route_codes(
+                    df["Origin"], df["Dest"], dictionaries, routes
+                )
+                new_size = sys.getsizeof(df)
+                write_partition(df, newfilepath, PARTITION_CATEGORIES)
+                cubes = [build_cube(df)]
+                rollups = [build_rollups(df)]
+                sketches = {kind: [s] for kind, s in build_sketches(df).items()}
+                digests = [build_digests(df)]
+                delays = [build_delay_stats(df)]
+                days = [build_daily(df)]
             else:
-                df = pd.read_csv(filepath, encoding="ISO-8859-1")
+                old_size, new_size = 0, 0
+                cubes, rollups, digests, delays, days = [], [], [], [], []
+                sketches = {kind: [] for kind in SKETCH_KINDS}
+                with PartitionWriter(
+                    newfilepath, PARTITION_CATEGORIES
+                ) as writer, read_csv(
+                    filepath, dtype=FLIGHTS_DTYPES, chunksize=chunksize
+                ) as reader:
+                    for df in reader:
+                        old_size += sys.getsizeof(df)
+                        cast_datetimes(df, datetime_features)
+                        categorize(df, categories)
+                        decode_times(df)
+                        df["Route"] = route_codes(
+                            df["Origin"], df["Dest"], dictionaries, routes
+                        )
+                        new_size += sys.getsizeof(df)
+                        writer.write(df)
+                        # summaries are merged as they come, see fold()
+                        cubes = fold_cubes(cubes + [build_cube(df)], chunksize)
+                        rollups = [merge_rollups(rollups + [build_rollups(df)])]
+                        sketches = fold_sketches(
+                            sketches, build_sketches(df), chunksize
+                        )
+                        digests = fold(
+                            digests + [build_digests(df)], merge_digests, chunksize
+                        )
+                        delays = fold(
+                            delays + [build_delay_stats(df)],
+                            merge_delay_stats,
+                            chunksize,
+                        )
+                        days = fold(days + [build_daily(df)], merge_daily, chunksize)
+
+            # summaries of the last chunks are merged into the ones of the year,
+            # files of every one of ARTEFACTS are written
+            cube = merge_cubes(cubes)
+            write_partition(cube, cube_path(newfilepath), CUBE_CATEGORIES)
+            for name, rollup in merge_rollups(rollups).items():
+                rollupfilepath = rollup_path(newfilepath, name)
+                write_partition(rollup, rollupfilepath, ROLLUP_CATEGORIES[name])
+            for kind in SKETCH_KINDS:
+                sketch = merge_sketches(sketches[kind], kind)
+                write_sketch(sketch, sketch_path(newfilepath, kind))
+            for name, summary in build_heavy_hitters(cube).items():
+                write_heavy_hitters(summary, topk_path(newfilepath, name))
+            digests = merge_digests(digests)
+            write_partition(digests, digest_path(newfilepath), DIGEST_CATEGORIES)
+            delays = merge_delay_stats(delays)
+            write_partition(
+                delays, delay_stats_path(newfilepath), DELAY_STATS_CATEGORIES
+            )
+            write_partition(merge_daily(days), daily_path(newfilepath))
 
-        # remove them to save storage, optimize their space usage
-        os.remove(filepath)
-        old_size = sys.getsizeof(df)
-        optimize(df, datetime_features, flights_data=compression)
-        new_size = sys.getsizeof(df)
-
-        df.to_pickle(newfilepath)
         logging.info(
             f"Converted {filepath}. Original size {old_size} bytes shrinked to {new_size} bytes ({new_size/old_size:1.5f})"
         )
+        paths = [newfilepath]
+        if compression:
+            paths += [p for artefact in ARTEFACTS for p in artefact.paths(newfilepath)]
+        artefacts = [f for p in paths for f in [p, stats_path(p)]]
+        return record(filepath, [os.path.basename(f) for f in artefacts])
     except Exception as e:
         print(traceback.format_exc())
         raise e
 
 
-def prepare_data(dir: str = DATASETS_FOLDER, datetime_features: List[str] = []) -> None:
+def legacy_categories(filepath: str) -> Dict[str, set]:
+    """
+    Collects values of the categorical columns of a .pkl file prepared by older versions
+
+    :param filepath: file path
+    :returns: mapping of dictionary name into values found in the file, empty if it doesn't hold flights data
+    """
+    df = pd.read_pickle(filepath)
+    found = {}
+    for col, name in FLIGHTS_CATEGORIES.items():
+        if col in df.columns:
+            found.setdefault(name, set()).update(df[col].dropna().unique())
+    return found
+
+
+def migrate(dir: str, filenames: List[str]) -> None:
     """
-    Downloads and extracts data. It assumes 3 possible situations:
-    - dir is empty, so it downloads and extracts data on its own,
-    - dir contains only a zip archive, so it extracts it on its own,
-    - dir contains both a zip archive and its extracted data, it does nothing.
+    Converts .pkl files prepared by older versions into the columnar format. Their years have
+    categories of their own, values of all of them are added to the dataset wide dictionaries first,
+    so every year is encoded with them like the converted ones.
+
+    :param dir: target data directory
+    :param filenames: names of the .pkl files
+    """
+    filepaths = [os.path.join(dir, filename) for filename in filenames]
+    years = [fp for fp, f in zip(filepaths, filenames) if f[:-4].isnumeric()]
+    found = [legacy_categories(filepath) for filepath in years]
+    if len(found) > 0:
+        dictionaries = update_dictionaries(load_dictionaries(dir), found)
+        save_dictionaries(dictionaries, dir)
+
+    for filename, filepath in zip(filenames, filepaths):
+        df = pd.read_pickle(filepath)
+        encoded = {}
+        if filepath in years:
+            encoded = {
+                col: name
+                for col, name in FLIGHTS_CATEGORIES.items()
+                if col in df.columns
+            }
+            categorize(df, {col: dictionaries[name] for col, name in encoded.items()})
+        write_partition(df, partition_path(filename[:-4], dir), encoded)
+        os.remove(filepath)
+        logging.info(f"Migrated {filepath} to the columnar format.")
+
+
+def extract(path: str, dir: str, everything: bool = True) -> None:
+    """
+    Extracts a zip archive into dir
+
+    :param path: archive path
+    :param dir: target data directory
+    :param everything: if False, members that were already converted are not extracted
+    """
+    logging.info(f"Extracting {path}.")
+    with ZipFile(path, "r") as f:
+        members = f.namelist()
+        if not everything:
+            members = [
+                member
+                for member in members
+                if not os.path.exists(partition_path(member.split(".")[0], dir))
+            ]
+        f.extractall(dir, members)
+
+
+def prepare_data(
+    dir: str = DATASETS_FOLDER,
+    datetime_features: List[str] = None,
+    chunksize: int | None = CHUNK_SIZE,
+    processes: int = None,
+) -> None:
+    """
+    Downloads, extracts and converts data. What was done is recorded in a manifest, so only
+    new or changed files are processed, if everything is up to date it only checks sizes and
+    modification times of the files:
+    - if dir does not exist, data is downloaded into it,
+    - new or changed zip archives are extracted,
+    - new or changed .csv and .csv.bz2 files are converted into the columnar format,
+      source files are kept.
 
     .. warning:: This function strongly relies on the URL structure. Any errors are most likely caused by its chenges.
 
     :param dir: target data directory
-    :param datetime_features: List of columns that can be casted to datetime, which significantly reduces space usage
+    :param datetime_features: List of columns that can be casted to datetime, which significantly reduces space usage.
+        If it differs from the one recorded for a file, the file is converted again. If None, recorded ones are kept.
+    :param chunksize: number of flights data rows converted at once by each worker, if None entire files are converted at once
+    :param processes: number of worker processes, if None os.cpu_count() is used
     """
 
     # if data is not downloaded onto local machine
@@ -72,99 +415,263 @@ def prepare_data(dir: str = DATASETS_FOLDER, datetime_features: List[str] = [])
         os.makedirs(dir)
         download(dir)
 
-    # if data is still only a zip archive
-    if len(os.listdir(dir)) == 1:
-        logging.info("Extracting data.")
-        zip_file = os.path.join(dir, os.listdir(dir)[0])
-        with ZipFile(zip_file, "r") as f:
-            f.extractall(dir)
-
-    # decompress the bz2 archives if they aren't already decompressed
-    # put them and all of .csv in .pkl format with optimised space usage
-    args = [
-        (dir, filename, datetime_features)
-        for filename in sorted(os.listdir(dir))
-        if filename.endswith(".bz2") or filename.endswith(".csv")
-    ]
-    # with ThreadPool() as p:
-    with Pool() as p:
-        p.starmap(unpack, args)
+    manifest = load_manifest(dir)
+    recorded = copy.deepcopy(manifest)
+
+    # extract new or changed archives, members of a new one that were
+    # converted before the manifest existed are not extracted again
+    for filename in sorted(os.listdir(dir)):
+        if filename.endswith(".zip"):
+            path = os.path.join(dir, filename)
+            entry = manifest["archives"].get(filename)
+            if not is_current(entry, path, dir):
+                extract(path, dir, everything=entry is not None)
+                manifest["archives"][filename] = record(path, [])
+
+    # data prepared by older versions is kept as .pkl, convert it
+    legacy = [f for f in sorted(os.listdir(dir)) if f.endswith(LEGACY_EXTENSION)]
+    if len(legacy) > 0:
+        migrate(dir, legacy)
+    routed = set(manifest["routes"]).difference(f[:-4] + EXTENSION for f in legacy)
+
+    # files written without row group statistics can't be filtered efficiently
+    for filename in sorted(os.listdir(dir)):
+        path = os.path.join(dir, filename)
+        if filename.endswith(EXTENSION) and not os.path.exists(stats_path(path)):
+            write_statistics(path)
+
+    # years prepared without routes of their flights, their cubes are rebuilt. Years known
+    # to hold routes are listed in the manifest, so only the other ones are opened
+    for path in list_partitions("all", dir):
+        name = os.path.basename(path)
+        if name not in routed:
+            if "Route" not in pq.read_schema(path).names:
+                write_routes(path)
+            routed.add(name)
+
+    # years prepared without some of their ARTEFACTS, or with outdated ones, e.g. cubes keyed
+    # by more keys or summaries of the most popular routes older than the cubes they are built out of
+    for artefact in ARTEFACTS:
+        for path in list_partitions("all", dir):
+            if artefact.outdated(path):
+                artefact.write(path)
+
+    # put new or changed .bz2 archives and .csv files in columnar format with optimised space usage
+    pending = {}
+    for filename in sorted(os.listdir(dir)):
+        if filename.endswith(".bz2") or filename.endswith(".csv"):
+            entry = manifest["sources"].get(filename)
+            features = datetime_features
+            if features is None:
+                features = (
+                    [] if entry is None else entry["settings"]["datetime_features"]
+                )
+            current = is_current(entry, os.path.join(dir, filename), dir)
+            if not current or entry["settings"] != settings(features):
+                pending[filename] = features
+
+    if len(pending) > 0:
+        flights = [os.path.join(dir, f) for f in pending if f.endswith(".bz2")]
+        # with ThreadPool() as p:
+        with Pool(processes) as p:
+            # categories of all the years are known before any of them is converted,
+            # so every partition is encoded with the same dictionaries
+            dictionaries = load_dictionaries(dir)
+            if len(flights) > 0:
+                found = p.starmap(
+                    collect_categories,
+                    [(filepath, chunksize or CHUNK_SIZE) for filepath in flights],
+                )
+                dictionaries = update_dictionaries(dictionaries, found)
+                save_dictionaries(dictionaries, dir)
+
+            args = [
+                (dir, filename, features, chunksize, dictionaries)
+                for filename, features in pending.items()
+            ]
+            entries = p.starmap(unpack, args)
+
+        for (filename, features), entry in zip(pending.items(), entries):
+            manifest["sources"][filename] = {**entry, "settings": settings(features)}
+            # only flights data in .bz2 archives is converted with routes
+            name = os.path.basename(partition_path(filename.split(".")[0], dir))
+            if filename.endswith(".bz2"):
+                routed.add(name)
+            else:
+                routed.discard(name)
+
+    manifest["routes"] = sorted(routed)
+
+    if manifest != recorded:
+        save_manifest(manifest, dir)
+
+
+def flights_filters(
+    carriers: List[str] = None,
+    origins: List[str] = None,
+    dests: List[str] = None,
+    start: str | pd.Timestamp = None,
+    end: str | pd.Timestamp = None,
+    cancelled: int = None,
+) -> List[Filter]:
+    """
+    Builds row filters of flights data, see load_flights()
+
+    :returns: list of (column, operator, value) triples
+    """
+    filters = []
+    if carriers is not None:
+        filters.append(("UniqueCarrier", "in", carriers))
+    if origins is not None:
+        filters.append(("Origin", "in", origins))
+    if dests is not None:
+        filters.append(("Dest", "in", dests))
+    if start is not None:
+        filters.append(("Departure", ">=", start))
+    if end is not None:
+        filters.append(("Departure", "<", end))
+    if cancelled is not None:
+        filters.append(("Cancelled", "==", cancelled))
+    return filters
 
 
 def load_flights(
-    years: str | List[str] = "all", cols: List[str] = None, dir: str = DATASETS_FOLDER
+    years: str | List[str] = "all",
+    cols: List[str] = None,
+    dir: str = DATASETS_FOLDER,
+    carriers: List[str] = None,
+    origins: List[str] = None,
+    dests: List[str] = None,
+    start: str | pd.Timestamp = None,
+    end: str | pd.Timestamp = None,
+    cancelled: int = None,
+    threads: int = None,
+    attributes: Dict[str, List[str] | Dict[str, str]] = None,
 ) -> pd.DataFrame:
     """
-    Loads flight data into memory
+    Loads flight data into memory. Row filters are checked against row group statistics
+    stored by prepare_data(), so row groups that cannot match are never read.
+    Years are read in parallel straight into preallocated columns, see read_partitions().
+    Categorical columns have the categories of the whole dataset, whatever years are loaded.
 
     :param years: "all" or all possible data, List of str from {"1987", ..., "2008"} for specific ones
     :param cols: desired columns to be loaded, if None entire data is loaded
     :param dir: target data directory
+    :param carriers: if given, only flights of these carriers (UniqueCarrier) are loaded
+    :param origins: if given, only flights from these airports (Origin) are loaded
+    :param dests: if given, only flights to these airports (Dest) are loaded
+    :param start: if given, only flights with Departure >= start are loaded
+    :param end: if given, only flights with Departure < end are loaded
+    :param cancelled: if given, only flights with Cancelled == cancelled are loaded
+    :param threads: number of threads reading the years, if None os.cpu_count() is used
+    :param attributes: if given, attributes of carriers, planes or airports added to flights,
+        e.g. {"TailNum": ["aircraft_type", "engine_type"]}, see enrich()
     :returns: DataFrame with loaded data
     """
     prepare_data(dir)
     assert len(years) > 0, "Must have at least one year specified"
+    filters = flights_filters(carriers, origins, dests, start, end, cancelled)
+    keys = [] if attributes is None or cols is None else list(attributes)
+    keys = [col for col in dict.fromkeys(keys) if col not in cols]
+
+    # only the column chunks of cols are read from disk, years are read in parallel
+    paths = list_partitions(years, dir)
+    flights = read_partitions(
+        paths, None if cols is None else cols + keys, filters, threads
+    )
+    if attributes is not None:
+        for col, values in enrich(flights, attributes, dir).items():
+            flights[col] = values.values
+        flights.drop(columns=keys, inplace=True)
+    return flights
+
+
+def iter_flights(
+    years: str | List[str] = "all",
+    cols: List[str] = None,
+    dir: str = DATASETS_FOLDER,
+    **kwargs,
+) -> Iterator[pd.DataFrame]:
+    """
+    Loads flight data one year at a time, so that only a single year is held in memory
+
+    :param years: "all" or all possible data, List of str from {"1987", ..., "2008"} for specific ones
+    :param cols: desired columns to be loaded, if None entire data is loaded
+    :param dir: target data directory
+    :param kwargs: row filters, see load_flights()
+    :returns: iterator over DataFrames with loaded data of consecutive years
+    """
+    prepare_data(dir)
+    assert len(years) > 0, "Must have at least one year specified"
+    filters = flights_filters(**kwargs)
 
-    if years == "all":
-        files = [
-            os.path.join(dir, file)
-            for file in sorted(os.listdir(dir))
-            if file.endswith(".pkl") and file.split(".")[0].isnumeric()
-        ]
-    else:
-        files = [
-            os.path.join(dir, file)
-            for file in sorted(os.listdir(dir))
-            if file.split(".")[0] in years and file.endswith(".pkl")
-        ]
+    for path in list_partitions(years, dir):
+        yield read_partition(path, cols, filters)
 
-    if cols is None:
-        flights = [pd.read_pickle(file) for file in files]
-    else:
-        flights = [pd.read_pickle(file).loc[:, cols] for file in files]
 
-    return concatenate(flights)
+def iter_cubes(
+    years: str | List[str] = "all",
+    cols: List[str] = None,
+    dir: str = DATASETS_FOLDER,
+) -> Iterator[pd.DataFrame]:
+    """
+    Loads rollup cubes of flights data one year at a time, see build_cube()
+
+    :param years: "all" or all possible data, List of str from {"1987", ..., "2008"} for specific ones
+    :param cols: desired columns to be loaded, if None entire cubes are loaded
+    :param dir: target data directory
+    :returns: iterator over DataFrames with cubes of consecutive years
+    """
+    prepare_data(dir)
+    assert len(years) > 0, "Must have at least one year specified"
+
+    for path in list_partitions(years, dir):
+        yield read_partition(cube_path(path), cols)
 
 
-def load_pkl(filename: str, dir: str = DATASETS_FOLDER):
+def load_table(name: str, dir: str = DATASETS_FOLDER, cols: List[str] = None):
     """
-    Utility function that loads a .pkl file into a pd.DataFrame
+    Utility function that loads a prepared table into a pd.DataFrame
 
-    :param str filename: file name
+    :param str name: table name
     :param dir: target data directory
+    :param cols: desired columns to be loaded, if None entire table is loaded
     :returns: DataFrame with loaded data
     """
-    return pd.read_pickle(os.path.join(dir, filename))
+    return read_partition(partition_path(name, dir), cols)
 
 
-def load_airports(dir: str = DATASETS_FOLDER) -> pd.DataFrame:
+def load_airports(dir: str = DATASETS_FOLDER, cols: List[str] = None) -> pd.DataFrame:
     """
-    Loads airports from airports.csv
+    Loads airports data prepared from airports.csv
 
     :param dir: target data directory
+    :param cols: desired columns to be loaded, if None entire table is loaded
     :returns: DataFrame with loaded data
     """
-    return load_pkl("airports.pkl", dir)
+    return load_table("airports", dir, cols)
 
 
-def load_carriers(dir: str = DATASETS_FOLDER) -> pd.DataFrame:
+def load_carriers(dir: str = DATASETS_FOLDER, cols: List[str] = None) -> pd.DataFrame:
     """
-    Loads carriers data from carriers.pkl
+    Loads carriers data prepared from carriers.csv
 
     :param dir: target data directory
+    :param cols: desired columns to be loaded, if None entire table is loaded
     :returns: DataFrame with loaded data
     """
-    return load_pkl("carriers.pkl", dir)
+    return load_table("carriers", dir, cols)
 
 
-def load_plane_data(dir: str = DATASETS_FOLDER) -> pd.DataFrame:
+def load_plane_data(dir: str = DATASETS_FOLDER, cols: List[str] = None) -> pd.DataFrame:
     """
-    Loads plane data from plane-data.pkl
+    Loads plane data prepared from plane-data.csv
 
     :param dir: target data directory
+    :param cols: desired columns to be loaded, if None entire table is loaded
     :returns: DataFrame with loaded data
     """
-    return load_pkl("plane-data.pkl", dir)
+    return load_table("plane-data", dir, cols)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,125 @@
+import os
+import json
+import hashlib
+
+from typing import List
+
+from .constants import DATASETS_FOLDER, MANIFEST_FILE, THRESHOLD
+
+
+def manifest_path(dir: str = DATASETS_FOLDER) -> str:
+    """
+    Returns path of the manifest of prepared data
+
+    :param dir: target data directory
+    :returns: path to the file
+    """
+    return os.path.join(dir, MANIFEST_FILE)
+
+
+def load_manifest(dir: str = DATASETS_FOLDER) -> dict:
+    """
+    Loads the manifest, which records every source file (archives included) with its size,
+    modification time and checksum, settings it was converted with and resulting artefacts.
+    Year partitions known to hold the Route column are listed too, see write_routes().
+
+    :param dir: target data directory
+    :returns: manifest, empty if data was never prepared
+    """
+    try:
+        with open(manifest_path(dir), "r") as f:
+            return {"routes": [], **json.load(f)}
+    except FileNotFoundError:
+        return {"sources": {}, "archives": {}, "routes": []}
+
+
+def save_manifest(manifest: dict, dir: str = DATASETS_FOLDER) -> None:
+    """
+    Saves the manifest
+
+    :param manifest: manifest to be saved
+    :param dir: target data directory
+    """
+    path = manifest_path(dir)
+    with open(path + ".part", "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(path + ".part", path)
+
+
+def settings(datetime_features: List[str], threshold: int = THRESHOLD) -> dict:
+    """
+    Returns settings that affect the result of a conversion
+
+    :param datetime_features: List of columns that can be casted to datetime
+    :param threshold: int from 0 to 100, see optimize_objects()
+    :returns: settings to be recorded in the manifest
+    """
+    return {"datetime_features": sorted(datetime_features), "threshold": threshold}
+
+
+def signature(path: str) -> dict:
+    """
+    Returns size and modification time of a file, both are cheap to check
+
+    :param path: file path
+    :returns: dict with size and mtime
+    """
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+
+
+def checksum(path: str, block_size: int = 2**20) -> str:
+    """
+    Computes the checksum of a file without loading it into memory
+
+    :param path: file path
+    :param block_size: number of bytes read at once
+    :returns: hex digest of the file's contents
+    """
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def is_current(entry: dict | None, path: str, dir: str = DATASETS_FOLDER) -> bool:
+    """
+    Checks whether a file is recorded in the manifest as it is now and all its artefacts exist.
+    Only size and modification time are compared, if they differ the checksum decides and
+    the entry is updated with the new signature.
+
+    :param entry: entry of the manifest describing the file or None if it is not recorded
+    :param path: file path
+    :param dir: target data directory
+    :returns: True if nothing has to be done with the file
+    """
+    if entry is None:
+        return False
+    if not all(os.path.exists(os.path.join(dir, f)) for f in entry["artefacts"]):
+        return False
+
+    current = signature(path)
+    if current["size"] == entry["size"] and current["mtime"] == entry["mtime"]:
+        return True
+    if current["size"] == entry["size"] and checksum(path) == entry["checksum"]:
+        entry.update(current)  # only touched, contents are the same
+        return True
+    return False
+
+
+def record(path: str, artefacts: List[str], **kwargs) -> dict:
+    """
+    Creates an entry of the manifest describing a file
+
+    :param path: file path
+    :param artefacts: names of the files created out of it
+    :param kwargs: additional information to be recorded
+    :returns: the entry
+    """
+    return {
+        **signature(path),
+        "checksum": checksum(path),
+        "artefacts": artefacts,
+        **kwargs,
+    }
@@ -1,8 +1,11 @@
+import logging
 import pandas as pd
 import numpy as np
-from typing import List
+from typing import List, Dict, Tuple
 
-from .constants import THRESHOLD
+from .constants import THRESHOLD, SAMPLE_SIZE, TIMES
+
+NS_PER_MINUTE = 60 * 10**9
 
 
 def optimize_floats(df: pd.DataFrame) -> None:
@@ -33,6 +36,62 @@ def optimize_ints(df: pd.DataFrame) -> None:
     )
 
 
+def estimate_cardinality(
+    col: pd.Series, sample_size: int = SAMPLE_SIZE
+) -> Tuple[int, int, int]:
+    """
+    Estimates the number of unique values of col out of a uniform sample of its entries,
+    using the Guaranteed-Error Estimator, which ratio error is bounded by sqrt(len(col) / sample_size).
+    If col is not longer than sample_size its values are counted exactly.
+
+    :param col: column holding data
+    :param sample_size: number of sampled entries
+    :returns: lower bound, estimate and upper bound of the number of unique values
+    """
+    n = len(col)
+    if n <= sample_size:
+        exact = len(col.unique())
+        return exact, exact, exact
+
+    rng = np.random.default_rng(42)
+    idxs = rng.choice(n, sample_size, replace=False, shuffle=False)
+    counts = col.iloc[idxs].value_counts(dropna=False, sort=False).values
+    seen, seen_once = len(counts), int((counts == 1).sum())
+
+    error = np.sqrt(n / sample_size)
+    estimate = error * seen_once + seen - seen_once
+    lower = int(max(seen, estimate / error))
+    upper = int(min(n, estimate * error))
+    return lower, int(estimate), upper
+
+
+def is_categorical(col: pd.Series, threshold: int = THRESHOLD) -> bool:
+    """
+    Decides whether col should be casted to pd.category, that is if less or equal to threshold %
+    of its entries are unique. Exact count of unique values is computed only if the
+    estimate is not clearly above or below the threshold.
+
+    :param col: column holding data
+    :param threshold: int from 0 to 100
+    :returns: True if col should be casted to pd.category
+    """
+    limit = len(col) * threshold / 100.0
+    lower, estimate, upper = estimate_cardinality(col)
+
+    if upper <= limit:
+        decision, reason = True, "estimate"
+    elif lower > limit:
+        decision, reason = False, "estimate"
+    else:
+        decision, reason = len(col.unique()) <= limit, "exact count"
+
+    logging.info(
+        f"Column {col.name}: ~{estimate} unique values (between {lower} and {upper}) "
+        f"out of {len(col)}, {'' if decision else 'not '}casting to category based on {reason}"
+    )
+    return decision
+
+
 def optimize_objects(
     df: pd.DataFrame, datetime_features: List[str], threshold: int = THRESHOLD
 ) -> None:
@@ -46,30 +105,101 @@ def optimize_objects(
     """
     for col in df.select_dtypes(include=np.object_):
         if col not in datetime_features:
-            if not (type(df[col][0]) == list):
-                num_unique_values = len(df[col].unique())
-                num_total_values = len(df[col])
-                if num_unique_values / num_total_values <= threshold / 100.0:
+            # lists are not hashable, so such columns can't be categories
+            first = df[col].first_valid_index()
+            if first is not None and isinstance(df[col][first], list):
+                continue
+            try:
+                if is_categorical(df[col], threshold):
                     df[col] = df[col].astype("category")
+            except TypeError:
+                logging.info(f"Column {col}: holds unhashable values, left as it is")
         else:
             df[col] = pd.to_datetime(df[col])
 
 
-def convert_to_hhmm(df: pd.DataFrame) -> pd.DataFrame:
+def cast_datetimes(df: pd.DataFrame, datetime_features: List[str]) -> None:
+    """
+    Casts datetime_features to pd.datetime the way optimize_objects() does, for data whose other
+    columns have their types fixed up front, e.g. chunks of flights data. Missing columns are skipped.
+
+    :param df: DataFrame holding data
+    :param datetime_features: List of columns that can be casted to datetime
+    """
+    for col in datetime_features:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col])
+
+
+def hhmm_to_minutes(hhmm: np.ndarray) -> np.ndarray:
+    """
+    Converts hhmm encoded times into minutes since midnight. Missing times are treated
+    as 0000 and times from 2400 on are rolled over to the same day's early hours.
+
+    :param hhmm: array of times encoded as hh * 100 + mm, may contain NaN
+    :raises: ValueError if some time can't be decoded
+    :returns: int64 array of minutes since midnight
+    """
+    if hhmm.dtype.kind == "f":
+        hhmm = np.where(np.isnan(hhmm), 0, hhmm)
+    hhmm = hhmm.astype(np.int16).astype(np.int64)
+    hhmm = np.where(hhmm >= 2400, hhmm - 2400, hhmm)
+    hours, minutes = np.divmod(hhmm, 100)
+
+    if ((hours < 0) | (hours > 23) | (minutes > 59)).any():
+        raise ValueError("Times out of the hhmm range")
+    return hours * 60 + minutes
+
+
+def to_days(years: np.ndarray, months: np.ndarray, days: np.ndarray) -> np.ndarray:
     """
-    Converts every column of df into a hhmm string format
+    Builds dates out of their integer components
 
-    :returns: modified df
+    :param years: array of years
+    :param months: array of months, 1 to 12
+    :param days: array of days of month, 1 to 31
+    :raises: ValueError if some date does not exist
+    :returns: datetime64[D] array
     """
-    df = df.fillna(0).astype(np.int16).astype(str)
-    for col in df.columns:
-        df[col] = df[col].str.zfill(4)
-        bad_idxs = df[col] >= "2400"
-        df.loc[bad_idxs, col] = (
-            (df.loc[bad_idxs, col].astype(np.int16) - 2400).astype(str).str.zfill(4)
-        )
+    months = (years.astype(np.int64) - 1970) * 12 + months.astype(np.int64) - 1
+    months = months.astype("datetime64[M]")
+    dates = months.astype("datetime64[D]") + (days.astype(np.int64) - 1)
 
-    return df
+    if (dates.astype("datetime64[M]") != months).any():
+        raise ValueError("Day out of range for month")
+    return dates
+
+
+def categorize(df: pd.DataFrame, categories: Dict[str, pd.Index]) -> None:
+    """
+    Casts columns of df to pd.category with categories fixed up front, so that
+    separately processed chunks of data share the same categories
+
+    :param df: DataFrame holding data
+    :param categories: mapping of column name into its categories
+    """
+    for col, col_categories in categories.items():
+        df[col] = pd.Categorical(df[col], categories=col_categories)
+
+
+def decode_times(df: pd.DataFrame) -> None:
+    """
+    Replaces Year, Month, DayofMonth and hhmm times of flights data with datetime columns.
+    Dates are decoded once and shared by all four times, everything is done on integers.
+
+    :param df: DataFrame holding flights data
+    """
+    days = to_days(df["Year"].values, df["Month"].values, df["DayofMonth"].values)
+    days = days.astype("datetime64[ns]").view(np.int64)
+
+    for original_name, new_name in TIMES.items():
+        minutes = hhmm_to_minutes(df[original_name].values)
+        df[new_name] = (days + minutes * NS_PER_MINUTE).view("datetime64[ns]")
+
+    df.drop(
+        columns=["Year", "Month", "DayofMonth"] + list(TIMES.keys()),
+        inplace=True,
+    )
 
 
 def optimize(
@@ -88,48 +218,99 @@ def optimize(
     optimize_objects(df, datetime_features)
 
     if flights_data:
-        dates = {
-            "DepTime": "Departure",
-            "CRSDepTime": "CRSDeparture",
-            "ArrTime": "Arrival",
-            "CRSArrTime": "CRSArrival",
-        }
-
-        df.loc[:, list(dates.keys())] = convert_to_hhmm(df.loc[:, list(dates.keys())])
-
-        for original_name, new_name in dates.items():
-            df[new_name] = pd.to_datetime(
-                dict(
-                    year=df["Year"],
-                    month=df["Month"],
-                    day=df["DayofMonth"],
-                    hour=df[original_name].str[:2],
-                    minute=df[original_name].str[2:],
-                )
+        decode_times(df)
+
+
+def recode(col: pd.Series, categories: pd.Index, out: np.ndarray) -> None:
+    """
+    Writes codes of col values in categories into out, without materializing the values
+
+    :param col: column holding data, categorical or all empty
+    :param categories: categories containing all values of col
+    :param out: array the codes are written into
+    """
+    if not isinstance(col.dtype, pd.CategoricalDtype):
+        out[:] = pd.Categorical(col.values, categories=categories).codes
+    elif col.cat.categories.equals(categories):
+        out[:] = col.cat.codes.values
+    else:
+        # missing values have code -1, which picks the appended -1
+        lookup = np.append(categories.get_indexer(col.cat.categories), -1)
+        np.take(lookup.astype(out.dtype), col.cat.codes.values, out=out)
+
+
+def concatenate_column(
+    cols: List[pd.Series], threshold: int = THRESHOLD
+) -> np.ndarray | pd.Categorical:
+    """
+    Concatenates columns into a single array, which is the only allocation of the result size.
+    Categorical columns sharing categories have their codes concatenated as they are, others
+    are re-encoded with the union of the categories if it is small enough.
+
+    :param cols: columns to concatenate, the type of the last one decides the type of the result
+    :param threshold: result will be left as categorical if unique values are less threshold % of all values
+    :returns: concatenated values
+    """
+    target_size = sum(len(col) for col in cols)
+    starts = np.cumsum([0] + [len(col) for col in cols])
+    dtype = cols[-1].dtype
+
+    if isinstance(dtype, pd.CategoricalDtype):
+        if any(col.dtype != dtype for col in cols):
+            # if not category than it must have been all empty
+            uc = pd.api.types.union_categoricals(
+                [
+                    pd.Categorical.from_codes([], dtype=col.dtype)
+                    for col in cols
+                    if isinstance(col.dtype, pd.CategoricalDtype)
+                ]
             )
+            dtype = uc.dtype
+        if len(dtype.categories) / target_size <= threshold / 100.0:
+            codes = np.empty(
+                target_size, dtype=pd.Categorical([], dtype=dtype).codes.dtype
+            )
+            for col, start, stop in zip(cols, starts, starts[1:]):
+                recode(col, dtype.categories, codes[start:stop])
+            return pd.Categorical.from_codes(codes, dtype=dtype)
+        dtype = np.dtype(object)
+
+    if not all(col.dtype == dtype for col in cols) or not isinstance(dtype, np.dtype):
+        return pd.concat(cols, ignore_index=True).values
 
-        df.drop(
-            columns=["Year", "Month", "DayofMonth"] + list(dates.keys()),
-            inplace=True,
-        )
+    values = np.empty(target_size, dtype=dtype)
+    for col, start, stop in zip(cols, starts, starts[1:]):
+        values[start:stop] = np.asarray(col)
+    return values
 
 
 def concatenate(dfs: List[pd.DataFrame], threshold: int = THRESHOLD) -> pd.DataFrame:
     """
-    Concatenate while preserving categorical columns.
+    Concatenate while preserving categorical columns. Frames are not modified,
+    each column of the result is allocated once and filled with the values of the frames.
 
     :param dfs: list of DataFrames to concatenate
     :param threshold: target column will be left as categorical if unique values are less threshold % of all values
     """
     assert len(dfs) >= 1, "dfs cannot be empty"
-    target_size = sum([df.shape[0] for df in dfs])
-
-    for col in dfs[-1].select_dtypes(include="category").columns:
-        # if not category than it must have been all empty
-        uc = pd.api.types.union_categoricals(
-            [df[col] for df in dfs if df[col].dtype == "category"]
-        )
-        if len(uc.categories) / target_size <= threshold / 100.0:
-            for df in dfs:
-                df[col] = pd.Categorical(df[col].values, categories=uc.categories)
-    return pd.concat(dfs, ignore_index=True)
+    columns = dfs[0].columns
+    if not all(df.columns.equals(columns) for df in dfs) or not columns.is_unique:
+        # missing columns are filled by pd.concat, frames are copied to leave them untouched
+        dfs = [df.copy(deep=False) for df in dfs]
+        target_size = sum([df.shape[0] for df in dfs])
+        for col in dfs[-1].select_dtypes(include="category").columns:
+            uc = pd.api.types.union_categoricals(
+                [df[col] for df in dfs if df[col].dtype == "category"]
+            )
+            if len(uc.categories) / target_size <= threshold / 100.0:
+                for df in dfs:
+                    df[col] = pd.Categorical(df[col].values, categories=uc.categories)
+        return pd.concat(dfs, ignore_index=True)
+
+    return pd.DataFrame(
+        {
+            col: concatenate_column([df[col] for df in dfs], threshold)
+            for col in columns
+        },
+        copy=False,
+    )
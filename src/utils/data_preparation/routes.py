@@ -0,0 +1,126 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from typing import Dict
+
+from .cube import write_cube
+from .storage import DICTIONARIES_KEY, PartitionWriter, read_partition, to_pandas
+from .dictionaries import load_dictionaries, save_dictionaries, update_dictionaries
+from .constants import FLIGHTS_CATEGORIES, ROUTE_DICTIONARY, ROUTE_SEPARATOR
+
+
+def route_labels(origin: pd.Series, dest: pd.Series) -> set:
+    """
+    Collects labels of the undirected routes flown between airports, codes of both airports
+    are ordered alphabetically, e.g. "ABE - ATL". Flights from an airport to itself have no route.
+
+    :param origin: Origin column of flights data
+    :param dest: Dest column of flights data, aligned with origin
+    :returns: set of the labels
+    """
+    pairs = pd.DataFrame({"Origin": origin, "Dest": dest}).dropna().drop_duplicates()
+    first = pairs["Origin"].astype(str).values
+    second = pairs["Dest"].astype(str).values
+    low, high = np.minimum(first, second), np.maximum(first, second)
+    return set(low[low != high] + ROUTE_SEPARATOR + high[low != high])
+
+
+def pair_keys(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """
+    Numbers unordered pairs of codes, the pair of low <= high is high * (high + 1) / 2 + low,
+    so the numbers don't change when codes are appended
+
+    :param first: codes of the first elements of the pairs
+    :param second: codes of the second elements of the pairs
+    :returns: int64 array of the numbers
+    """
+    low = np.minimum(first, second).astype(np.int64)
+    high = np.maximum(first, second).astype(np.int64)
+    return high * (high + 1) // 2 + low
+
+
+def route_index(dictionaries: Dict[str, pd.Index]) -> pd.Index:
+    """
+    Numbers routes of the route dictionary by pairs of codes of their airports in the airport
+    dictionary, see pair_keys(). Labels are parsed once, so it is built once and used for all the
+    chunks of flights data encoded with the same dictionaries.
+
+    :param dictionaries: dataset wide dictionaries
+    :returns: pd.Index of the numbers, position of a number is the code of its route
+    """
+    airports = dictionaries[FLIGHTS_CATEGORIES["Origin"]]
+    routes = dictionaries[ROUTE_DICTIONARY]
+    if len(routes) == 0:
+        return pd.Index([], dtype=np.int64)
+    ends = routes.str.split(ROUTE_SEPARATOR, n=1, expand=True)
+    return pd.Index(
+        pair_keys(
+            airports.get_indexer(ends.get_level_values(0)),
+            airports.get_indexer(ends.get_level_values(1)),
+        )
+    )
+
+
+def route_codes(
+    origin: pd.Series,
+    dest: pd.Series,
+    dictionaries: Dict[str, pd.Index],
+    index: pd.Index = None,
+) -> pd.Categorical:
+    """
+    Encodes undirected routes of flights with the route dictionary. Routes are looked up by pairs
+    of airport codes, so flights between two airports share their route in either direction.
+    Flights with a missing airport or from an airport to itself have missing routes.
+
+    :param origin: Origin column of flights data, cheapest if encoded with the airport dictionary
+    :param dest: Dest column of flights data, aligned with origin
+    :param dictionaries: dataset wide dictionaries holding all the airports and routes of the flights, see route_labels()
+    :param index: numbers of the routes returned by route_index(), if None they are built
+    :returns: pd.Categorical of the routes
+    """
+    airports = dictionaries[FLIGHTS_CATEGORIES["Origin"]]
+    origin, dest = origin.astype("category"), dest.astype("category")
+    if not origin.cat.categories.equals(airports):
+        origin = origin.cat.set_categories(airports)
+    if not dest.cat.categories.equals(airports):
+        dest = dest.cat.set_categories(airports)
+
+    if index is None:
+        index = route_index(dictionaries)
+    first, second = origin.cat.codes.values, dest.cat.codes.values
+    codes = index.get_indexer(pair_keys(first, second))
+    codes[(first < 0) | (second < 0) | (first == second)] = -1
+    return pd.Categorical.from_codes(codes, categories=dictionaries[ROUTE_DICTIONARY])
+
+
+def write_routes(path: str) -> None:
+    """
+    Adds the Route column to a year partition written without it, one row group at a time.
+    Airports and routes of the year are added to the dictionaries first, the rollup cube is rebuilt afterwards.
+
+    :param path: columnar file path of the year
+    """
+    dir = os.path.dirname(path)
+    airports = read_partition(path, ["Origin", "Dest"])
+    found = {
+        FLIGHTS_CATEGORIES["Origin"]: set(airports["Origin"].dropna().unique())
+        | set(airports["Dest"].dropna().unique()),
+        ROUTE_DICTIONARY: route_labels(airports["Origin"], airports["Dest"]),
+    }
+    dictionaries = update_dictionaries(load_dictionaries(dir), [found])
+    save_dictionaries(dictionaries, dir)
+
+    index = route_index(dictionaries)
+    file = pq.ParquetFile(path)
+    encoded = json.loads(
+        (file.schema_arrow.metadata or {}).get(DICTIONARIES_KEY, b"{}")
+    )
+    with PartitionWriter(path, {**encoded, "Route": ROUTE_DICTIONARY}) as writer:
+        for i in range(file.num_row_groups):
+            df = to_pandas(file.read_row_group(i, use_pandas_metadata=True), path)
+            df["Route"] = route_codes(df["Origin"], df["Dest"], dictionaries, index)
+            writer.write(df)
+    write_cube(path)
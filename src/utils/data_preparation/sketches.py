@@ -0,0 +1,378 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from typing import Dict, List, Tuple
+
+from .cube import fold
+from .kernels import groupby_aggregate
+from .storage import list_partitions, read_partition, to_pandas, write_partition
+from .constants import (
+    CHUNK_SIZE,
+    DATASETS_FOLDER,
+    FLIGHTS_CATEGORIES,
+    HLL_ERROR,
+    SKETCH_EXTENSION,
+    SKETCH_KINDS,
+)
+
+# columns of flights data the sketches are built from, distinct tail numbers are counted per carrier
+SKETCH_SOURCES = ["UniqueCarrier", "TailNum"]
+# columns of the stored sketches, key of every register is encoded with the dataset wide dictionary
+SKETCH_COLUMNS = ["UniqueCarrier", "position", "register"]
+SKETCH_CATEGORIES = {"UniqueCarrier": FLIGHTS_CATEGORIES["UniqueCarrier"]}
+
+
+def sketch_path(path: str, kind: str) -> str:
+    """
+    Returns path of the file holding sketches of distinct tail numbers of a year partition
+
+    :param path: columnar file path of the year
+    :param kind: one of SKETCH_KINDS
+    :returns: path to the sketch file
+    """
+    assert kind in SKETCH_KINDS, f"Unknown sketch {kind}"
+    return os.path.splitext(path)[0] + "." + kind + SKETCH_EXTENSION
+
+
+def hll_precision(error: float = HLL_ERROR) -> int:
+    """
+    Finds the number of index bits of HyperLogLog registers giving a relative standard error
+
+    :param error: desired relative standard error of the estimates
+    :returns: precision, there are 2 ** precision registers per key
+    """
+    return int(np.clip(np.ceil(np.log2((1.04 / error) ** 2)), 4, 18))
+
+
+def distinct_pairs(
+    keys: pd.Series, values: pd.Series
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Finds distinct pairs of key and value codes, rows with missing keys or values are skipped
+
+    :param keys: categorical column, its categories are expected to be few
+    :param values: categorical column aligned with keys
+    :returns: key codes and value codes of the pairs, codes of all the keys present
+    """
+    key_codes = keys.cat.codes.values.astype(np.intp)
+    value_codes = values.cat.codes.values.astype(np.intp)
+    size = len(values.cat.categories)
+
+    present = np.bincount(key_codes + 1, minlength=len(keys.cat.categories) + 1)
+    known = (key_codes >= 0) & (value_codes >= 0)
+    seen = np.zeros(len(keys.cat.categories) * size, dtype=bool)
+    seen[key_codes[known] * size + value_codes[known]] = True
+    pairs = np.flatnonzero(seen)
+    return pairs // size, pairs % size, np.flatnonzero(present[1:])
+
+
+def sketch_series(
+    keys: pd.Series,
+    key_codes: np.ndarray,
+    positions: np.ndarray,
+    registers: np.ndarray,
+    present: np.ndarray,
+) -> pd.Series:
+    """
+    Builds a sparse sketch out of its non empty registers. The first register of every key
+    present is always kept, so that keys without any value are listed too.
+
+    :param keys: categorical column the sketch is keyed by
+    :param key_codes: key code of every register
+    :param positions: position of every register
+    :param registers: values of the registers
+    :param present: codes of all the keys present
+    :returns: uint8 Series of registers indexed by key and position, sorted
+    """
+    key_codes = np.concatenate([key_codes, present])
+    positions = np.concatenate([positions, np.zeros(len(present), dtype=np.intp)])
+    registers = np.concatenate([registers, np.zeros(len(present), dtype=np.uint8)])
+
+    order = np.lexsort((registers, positions, key_codes))
+    key_codes, positions = key_codes[order], positions[order]
+    # the last of equal registers is the largest one
+    last = np.r_[
+        (key_codes[1:] != key_codes[:-1]) | (positions[1:] != positions[:-1]), True
+    ]
+    index = pd.MultiIndex.from_arrays(
+        [
+            pd.Categorical.from_codes(key_codes[last], dtype=keys.dtype),
+            positions[last].astype(np.uint32),
+        ],
+        names=[keys.name, "position"],
+    )
+    return pd.Series(registers[order][last], index=index, name="register")
+
+
+def exact_sketch(keys: pd.Series, values: pd.Series) -> pd.Series:
+    """
+    Builds bitsets of distinct values of every key over the codes of values. Bit of a value is set
+    in the byte at its code // 8, the same way np.packbits() packs bits. Only non zero bytes are kept.
+    Values must be encoded with the dataset wide dictionaries, so that bitsets of all the partitions
+    share the codes and can be merged.
+
+    :param keys: categorical column
+    :param values: categorical column aligned with keys
+    :returns: uint8 Series of bitset bytes indexed by key and position
+    """
+    key_codes, value_codes, present = distinct_pairs(keys, values)
+    size = (len(values.cat.categories) + 7) // 8
+
+    registers = np.zeros(len(keys.cat.categories) * size, dtype=np.uint8)
+    bits = (128 >> (value_codes % 8)).astype(np.uint8)
+    np.bitwise_or.at(registers, key_codes * size + value_codes // 8, bits)
+    found = np.flatnonzero(registers)
+    return sketch_series(keys, found // size, found % size, registers[found], present)
+
+
+def hll_sketch(
+    keys: pd.Series, values: pd.Series, precision: int = hll_precision()
+) -> pd.Series:
+    """
+    Builds HyperLogLog sketches of distinct values of every key. Values are hashed, the lowest
+    precision bits of the hash select the register and the rank of the lowest set bit of the rest
+    is kept, the highest one for each register. Only non zero registers are kept.
+
+    :param keys: categorical column
+    :param values: categorical column aligned with keys
+    :param precision: number of index bits, see hll_precision()
+    :returns: uint8 Series of registers indexed by key and position
+    """
+    key_codes, value_codes, present = distinct_pairs(keys, values)
+    size = 1 << precision
+
+    categories = np.asarray(values.cat.categories, dtype=object)
+    hashes = pd.util.hash_array(categories)[value_codes]
+    rest = hashes >> np.uint64(precision)
+    ranks = lowest_bit_rank(rest, 64 - precision)
+
+    registers = np.zeros(len(keys.cat.categories) * size, dtype=np.uint8)
+    positions = (hashes & np.uint64(size - 1)).astype(np.intp)
+    np.maximum.at(registers, key_codes * size + positions, ranks)
+    found = np.flatnonzero(registers)
+    return sketch_series(keys, found // size, found % size, registers[found], present)
+
+
+def lowest_bit_rank(bits: np.ndarray, width: int) -> np.ndarray:
+    """
+    Finds positions of the lowest set bits, counted from 1
+
+    :param bits: uint64 array
+    :param width: number of meaningful bits, rank of 0 is width + 1
+    :returns: uint8 array of ranks
+    """
+    lowest = bits & (~bits + np.uint64(1))
+    # lowest is a power of 2, its exponent is exact
+    ranks = np.frexp(lowest.astype(np.float64))[1]
+    return np.where(bits == 0, width + 1, ranks).astype(np.uint8)
+
+
+def build_sketches(flights: pd.DataFrame) -> Dict[str, pd.Series]:
+    """
+    Builds sketches of distinct tail numbers of every carrier of flights data
+
+    :param flights: DataFrame holding SKETCH_SOURCES columns encoded with the dataset wide dictionaries
+    :returns: mapping of each of SKETCH_KINDS into its sketch
+    """
+    keys, values = flights["UniqueCarrier"], flights["TailNum"]
+    return {"exact": exact_sketch(keys, values), "hll": hll_sketch(keys, values)}
+
+
+def merge_sketches(sketches: List[pd.Series], kind: str) -> pd.Series:
+    """
+    Merges sketches of separate parts of flights data into the sketch of all of them.
+    Bitsets are merged with bitwise or, HyperLogLog registers with max.
+
+    :param sketches: sketches of the same kind
+    :param kind: one of SKETCH_KINDS
+    :raises: ValueError if there are no sketches
+    :returns: merged sketch, sorted by its keys and positions
+    """
+    assert kind in SKETCH_KINDS, f"Unknown sketch {kind}"
+    if len(sketches) == 0:
+        raise ValueError("No sketches to merge")
+    if len(sketches) == 1:
+        return sketches[0]
+
+    return combine_registers(pd.concat(sketches), kind)
+
+
+def fold_sketches(
+    sketches: Dict[str, List[pd.Series]],
+    chunk: Dict[str, pd.Series],
+    max_rows: int = CHUNK_SIZE,
+) -> Dict[str, List[pd.Series]]:
+    """
+    Adds sketches of the next chunk of flights data to the ones of the previous chunks,
+    sketches of every kind are folded into the first one of that kind, see fold()
+
+    :param sketches: mapping of each of SKETCH_KINDS into its merged sketch followed by sketches of the chunks
+    :param chunk: sketches returned by build_sketches()
+    :param max_rows: number of registers of the sketches of every kind kept unmerged
+    :returns: mapping of each of SKETCH_KINDS into its folded sketches
+    """
+    return {
+        kind: fold(
+            sketches[kind] + [chunk[kind]],
+            lambda parts: merge_sketches(parts, kind),
+            max_rows,
+        )
+        for kind in SKETCH_KINDS
+    }
+
+
+def combine_registers(sketch: pd.Series, kind: str) -> pd.Series:
+    """
+    Combines registers of sketch at the same key and position into one
+
+    :param sketch: sketch which registers may repeat
+    :param kind: one of SKETCH_KINDS
+    :returns: sketch sorted by its keys and positions
+    """
+    keys = pd.Categorical(sketch.index.get_level_values(0))
+    positions = sketch.index.get_level_values(1).values.astype(np.int64)
+    width = positions.max(initial=0) + 1
+    flat = keys.codes.astype(np.int64) * width + positions
+    flat, ids = np.unique(flat, return_inverse=True)
+
+    registers = np.zeros(len(flat), dtype=np.uint8)
+    merge = np.bitwise_or if kind == "exact" else np.maximum
+    merge.at(registers, ids, sketch.values)
+    index = pd.MultiIndex.from_arrays(
+        [
+            pd.Categorical.from_codes(flat // width, dtype=keys.dtype),
+            (flat % width).astype(np.uint32),
+        ],
+        names=sketch.index.names,
+    )
+    return pd.Series(registers, index=index, name=sketch.name)
+
+
+def fold_hll(sketch: pd.Series, precision: int, new_precision: int) -> pd.Series:
+    """
+    Reduces the number of registers of HyperLogLog sketches, the result is the same as if they
+    were built with new_precision. Index bits dropped from positions become the lowest bits of the rest.
+
+    :param sketch: HyperLogLog sketch
+    :param precision: number of index bits sketch was built with
+    :param new_precision: smaller number of index bits
+    :returns: sketch with 2 ** new_precision registers per key
+    """
+    assert new_precision <= precision, "Registers can only be folded"
+    if new_precision == precision:
+        return sketch
+    positions = sketch.index.get_level_values("position").values.astype(np.uint64)
+    dropped = positions >> np.uint64(new_precision)
+    ranks = lowest_bit_rank(dropped, 0).astype(np.intp)
+    ranks = np.where(dropped == 0, precision - new_precision + sketch.values, ranks)
+    ranks = np.where(sketch.values == 0, 0, ranks)
+
+    index = pd.MultiIndex.from_arrays(
+        [
+            sketch.index.get_level_values(0),
+            (positions & np.uint64((1 << new_precision) - 1)).astype(np.uint32),
+        ],
+        names=sketch.index.names,
+    )
+    folded = pd.Series(ranks.astype(np.uint8), index=index, name=sketch.name)
+    return combine_registers(folded, "hll")
+
+
+def count_distinct(sketch: pd.Series, precision: int = None) -> pd.Series:
+    """
+    Counts distinct values of every key of sketches
+
+    :param sketch: exact or HyperLogLog sketch
+    :param precision: number of index bits of HyperLogLog sketch, if None sketch holds exact bitsets
+    :returns: int64 Series of the counts indexed by the keys present
+    """
+    keys = pd.Series(sketch.index.get_level_values(0))
+    registers = sketch.values
+    if precision is None:
+        bits = np.unpackbits(registers).reshape(-1, 8).sum(axis=1)
+        counts = pd.Series(bits.astype(np.int64))
+        return groupby_aggregate(keys, counts, "sum", observed=True).rename(None)
+
+    size = 1 << precision
+    empty = pd.Series((registers == 0).astype(np.int64))
+    weights = pd.Series(
+        np.where(registers == 0, 0.0, np.ldexp(1.0, -registers.astype(np.intp)))
+    )
+    # registers which aren't stored are empty
+    zeros = size - groupby_aggregate(keys, None, "count", observed=True)
+    zeros += groupby_aggregate(keys, empty, "sum", observed=True)
+    total = zeros + groupby_aggregate(keys, weights, "sum", observed=True)
+
+    alpha = 0.7213 / (1 + 1.079 / size)
+    estimates = alpha * size**2 / total.values
+    # small cardinalities are estimated by linear counting
+    small = (estimates <= 2.5 * size) & (zeros.values > 0)
+    with np.errstate(divide="ignore"):
+        linear = size * np.log(size / zeros.values)
+    estimates = np.where(small, linear, estimates)
+    return pd.Series(np.rint(estimates).astype(np.int64), index=total.index)
+
+
+def write_sketch(sketch: pd.Series, path: str) -> None:
+    """
+    Saves sketches into a columnar file, with key and position of every register
+
+    :param sketch: exact or HyperLogLog sketch
+    :param path: target file path
+    """
+    write_partition(sketch.reset_index(), path, SKETCH_CATEGORIES)
+
+
+def read_sketch(path: str) -> pd.Series:
+    """
+    Loads sketches saved by write_sketch()
+
+    :param path: file path
+    :returns: the sketch
+    """
+    return read_partition(path, SKETCH_COLUMNS).set_index(SKETCH_COLUMNS[:2])[
+        "register"
+    ]
+
+
+def write_sketches(path: str) -> None:
+    """
+    Builds and saves sketches of a year partition written without them, one row group at a time
+
+    :param path: columnar file path of the year
+    """
+    file = pq.ParquetFile(path)
+    sketches = {kind: [] for kind in SKETCH_KINDS}
+    for i in range(file.num_row_groups):
+        table = file.read_row_group(i, columns=SKETCH_SOURCES, use_pandas_metadata=True)
+        sketches = fold_sketches(sketches, build_sketches(to_pandas(table, path)))
+    for kind in SKETCH_KINDS:
+        sketch = merge_sketches(sketches[kind], kind)
+        write_sketch(sketch, sketch_path(path, kind))
+
+
+def fleet_sizes(
+    years: str | List[str] = "all",
+    kind: str = "exact",
+    error: float = HLL_ERROR,
+    dir: str = DATASETS_FOLDER,
+) -> pd.Series:
+    """
+    Counts distinct tail numbers of every carrier over years, merging the sketches stored
+    for every year by prepare_data(). Data itself is not read.
+
+    :param years: "all" or list of years, see list_partitions()
+    :param kind: one of SKETCH_KINDS, "hll" gives estimates
+    :param error: relative standard error of "hll" estimates, not smaller than HLL_ERROR they are stored with
+    :param dir: target data directory
+    :raises: ValueError if there are no years
+    :returns: int64 Series of the counts indexed by carriers
+    """
+    paths = [sketch_path(path, kind) for path in list_partitions(years, dir)]
+    sketch = merge_sketches([read_sketch(path) for path in paths], kind)
+    if kind == "exact":
+        return count_distinct(sketch)
+    precision = hll_precision(max(error, HLL_ERROR))
+    return count_distinct(fold_hll(sketch, hll_precision(), precision), precision)
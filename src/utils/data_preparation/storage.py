@@ -0,0 +1,535 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from typing import List, Tuple, Dict, Any
+from multiprocessing.pool import ThreadPool
+
+from .dictionaries import load_dictionaries
+from .optimize import concatenate
+from .constants import (
+    DATASETS_FOLDER,
+    EXTENSION,
+    STATS_EXTENSION,
+    ROW_GROUP_SIZE,
+    STATS_MAX_DISTINCT,
+)
+
+# filters are (column, operator, value) triples, all of them must hold for a row
+Filter = Tuple[str, str, Any]
+OPERATORS = ["in", "==", ">=", ">", "<=", "<"]
+# key of the file metadata listing columns stored as codes of the dataset wide dictionaries
+DICTIONARIES_KEY = b"dictionaries"
+# tables read by read_cached() with modification times of their files
+_cache = {}
+
+
+def partition_path(name: str, dir: str = DATASETS_FOLDER) -> str:
+    """
+    Returns path of the columnar file holding the name table (or year partition)
+
+    :param name: table name (e.g. "airports") or year (e.g. "1988")
+    :param dir: target data directory
+    :returns: path to the file
+    """
+    return os.path.join(dir, name + EXTENSION)
+
+
+def stats_path(path: str) -> str:
+    """
+    Returns path of the file holding row group statistics of the columnar file
+
+    :param path: columnar file path
+    :returns: path to the statistics file
+    """
+    return os.path.splitext(path)[0] + STATS_EXTENSION
+
+
+def list_partitions(years: str | List[str] = "all", dir: str = DATASETS_FOLDER):
+    """
+    Lists year partitions of flights data present in dir
+
+    :param years: "all" or all possible data, List of str from {"1987", ..., "2008"} for specific ones
+    :param dir: target data directory
+    :returns: sorted list of paths to the year partitions
+    """
+    names = [
+        os.path.splitext(file)[0]
+        for file in sorted(os.listdir(dir))
+        if file.endswith(EXTENSION)
+    ]
+    if years == "all":
+        names = [name for name in names if name.isnumeric()]
+    else:
+        names = [name for name in names if name in years]
+    return [partition_path(name, dir) for name in names]
+
+
+def column_statistics(col: pd.Series) -> dict:
+    """
+    Computes statistics of a column that allow to decide whether a row filter can match any of its rows.
+    Categorical and text columns keep set of distinct values (if it is small enough), others keep min and max.
+
+    :param col: column of a row group
+    :returns: dict with statistics, empty if nothing useful can be stored
+    """
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        codes = col.cat.codes.values
+        present = np.bincount(codes[codes >= 0], minlength=len(col.cat.categories))
+        distinct = col.cat.categories[present > 0]
+    elif pd.api.types.is_object_dtype(col.dtype):
+        distinct = col.dropna().unique()
+    elif pd.api.types.is_datetime64_any_dtype(col.dtype):
+        col = col.dropna()
+        if col.empty:
+            return {}
+        return {"kind": "M", "min": col.min().value, "max": col.max().value}
+    elif pd.api.types.is_numeric_dtype(col.dtype):
+        values = col.values
+        if values.dtype.kind == "f":
+            values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return {}
+        return {"min": values.min().item(), "max": values.max().item()}
+    else:
+        return {}
+
+    if len(distinct) > STATS_MAX_DISTINCT:
+        return {}
+    return {"distinct": [str(value) for value in distinct]}
+
+
+def row_group_statistics(df: pd.DataFrame) -> dict:
+    """
+    Computes statistics of every column of a row group
+
+    :param df: DataFrame holding a row group
+    :returns: dict with number of rows and statistics of columns
+    """
+    columns = {col: column_statistics(df[col]) for col in df.columns}
+    return {
+        "num_rows": len(df),
+        "columns": {col: stats for col, stats in columns.items() if stats},
+    }
+
+
+def save_statistics(path: str, stats: List[dict]) -> None:
+    """
+    Saves row group statistics of the columnar file
+
+    :param path: columnar file path
+    :param stats: statistics of each row group
+    """
+    with open(stats_path(path), "w") as f:
+        json.dump({"row_groups": stats}, f)
+
+
+def load_statistics(path: str) -> List[dict] | None:
+    """
+    Loads row group statistics of the columnar file
+
+    :param path: columnar file path
+    :returns: statistics of each row group or None if they were not stored
+    """
+    try:
+        with open(stats_path(path), "r") as f:
+            return json.load(f)["row_groups"]
+    except FileNotFoundError:
+        return None
+
+
+class PartitionWriter:
+    """
+    Writes a columnar file incrementally, one row group per written chunk, and stores
+    statistics of every row group next to the file once it is closed. The file is written
+    under a temporary name, so an interrupted write never leaves a partial file behind.
+    Categorical columns encoded with the dataset wide dictionaries are stored as their codes.
+
+    :param path: target file path
+    :param encoded: mapping of categorical column name into name of the dictionary its categories come from
+    """
+
+    def __init__(self, path: str, encoded: Dict[str, str] = None):
+        self.path = path
+        self.tmp_path = path + ".part"
+        self.encoded = {} if encoded is None else encoded
+        self.writer = None
+        self.stats = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            if self.writer is not None:
+                self.writer.close()
+            if os.path.exists(self.tmp_path):
+                os.remove(self.tmp_path)
+
+    def write(self, df: pd.DataFrame) -> None:
+        """
+        Appends df to the file as a single row group, it must have the same columns as the first chunk
+
+        :param df: DataFrame holding a chunk of data
+        """
+        self.stats.append(row_group_statistics(df))
+        if self.encoded:
+            df = df.copy(deep=False)
+            for col in self.encoded:
+                df[col] = df[col].cat.codes
+
+        if self.writer is None:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            metadata = {
+                **table.schema.metadata,
+                DICTIONARIES_KEY: json.dumps(self.encoded),
+            }
+            table = table.replace_schema_metadata(metadata)
+            self.writer = pq.ParquetWriter(self.tmp_path, table.schema)
+        else:
+            table = pa.Table.from_pandas(
+                df, schema=self.writer.schema, preserve_index=False
+            )
+        self.writer.write_table(table, row_group_size=max(len(df), 1))
+
+    def close(self) -> None:
+        """
+        Finishes the file and saves its statistics
+        """
+        if self.writer is None:
+            raise ValueError("Nothing was written")
+        self.writer.close()
+        os.replace(self.tmp_path, self.path)
+        save_statistics(self.path, self.stats)
+
+
+def write_partition(
+    df: pd.DataFrame, path: str, encoded: Dict[str, str] = None
+) -> None:
+    """
+    Writes df into a columnar file, so that each column can be later read on its own.
+    Data is split into row groups of ROW_GROUP_SIZE rows, statistics of every row group
+    are stored next to the file.
+
+    :param df: DataFrame holding data
+    :param path: target file path
+    :param encoded: mapping of categorical column name into name of the dictionary its categories come from
+    """
+    with PartitionWriter(path, encoded) as writer:
+        for start in range(0, max(len(df), 1), ROW_GROUP_SIZE):
+            writer.write(df.iloc[start : start + ROW_GROUP_SIZE])
+
+
+def write_statistics(path: str) -> None:
+    """
+    Computes and saves statistics of a columnar file written without them, one row group at a time
+
+    :param path: columnar file path
+    """
+    file = pq.ParquetFile(path)
+    stats = [
+        row_group_statistics(to_pandas(file.read_row_group(i), path))
+        for i in range(file.num_row_groups)
+    ]
+    save_statistics(path, stats)
+
+
+def may_match(stats: dict, filters: List[Filter]) -> bool:
+    """
+    Checks whether any row of a row group may satisfy filters.
+
+    :param stats: statistics of a row group
+    :param filters: list of (column, operator, value) triples
+    :returns: False only if it is certain that no row satisfies filters
+    """
+    if stats["num_rows"] == 0:
+        return False
+
+    for col, op, value in filters:
+        col_stats = stats["columns"].get(col)
+        if col_stats is None:
+            continue  # nothing is known
+        values = value if op == "in" else [value]
+
+        if "distinct" in col_stats:
+            distinct = set(col_stats["distinct"])
+            if op in ["in", "=="]:
+                if not any(str(v) in distinct for v in values):
+                    return False
+            continue
+
+        if col_stats.get("kind") == "M":
+            values = [pd.Timestamp(v).value for v in values]
+        low, high = col_stats["min"], col_stats["max"]
+        if op in ["in", "=="]:
+            matches = any(low <= v <= high for v in values)
+        elif op == ">=":
+            matches = high >= values[0]
+        elif op == ">":
+            matches = high > values[0]
+        elif op == "<=":
+            matches = low <= values[0]
+        else:
+            matches = low < values[0]
+        if not matches:
+            return False
+    return True
+
+
+def filter_mask(df: pd.DataFrame, filters: List[Filter]) -> np.ndarray:
+    """
+    Evaluates filters on df rows
+
+    :param df: DataFrame holding data
+    :param filters: list of (column, operator, value) triples
+    :returns: boolean array, True for rows satisfying all filters
+    """
+    mask = np.ones(len(df), dtype=bool)
+    for col, op, value in filters:
+        if pd.api.types.is_datetime64_any_dtype(df[col].dtype) and op != "in":
+            value = pd.Timestamp(value)
+        if op == "in":
+            mask &= df[col].isin(list(value)).values
+        elif op == "==":
+            mask &= (df[col] == value).values
+        elif op == ">=":
+            mask &= (df[col] >= value).values
+        elif op == ">":
+            mask &= (df[col] > value).values
+        elif op == "<=":
+            mask &= (df[col] <= value).values
+        else:
+            mask &= (df[col] < value).values
+    return mask
+
+
+def encoded_columns(path: str) -> Dict[str, str]:
+    """
+    Lists columns of a columnar file stored as codes of the dataset wide dictionaries
+
+    :param path: file path
+    :returns: mapping of column name into name of the dictionary, empty if none of them is
+    """
+    metadata = pq.read_schema(path).metadata or {}
+    return json.loads(metadata.get(DICTIONARIES_KEY, b"{}"))
+
+
+def to_pandas(table: pa.Table, path: str) -> pd.DataFrame:
+    """
+    Converts a table read from a columnar file into a DataFrame,
+    columns stored as codes are turned back into pd.Categorical
+
+    :param table: table read from the file
+    :param path: file path
+    :returns: DataFrame with read data
+    """
+    metadata = table.schema.metadata or {}
+    encoded = json.loads(metadata.get(DICTIONARIES_KEY, b"{}"))
+    # release arrow buffers column by column while converting to keep peak memory low
+    df = table.to_pandas(split_blocks=True, self_destruct=True)
+
+    encoded = {col: name for col, name in encoded.items() if col in df.columns}
+    if encoded:
+        dictionaries = load_dictionaries(os.path.dirname(path))
+        for col, name in encoded.items():
+            df[col] = pd.Categorical.from_codes(df[col], dictionaries[name])
+    return df
+
+
+def plan_partition(path: str, filters: List[Filter] = None) -> List[Tuple[int, Any]]:
+    """
+    Decides which row groups of a columnar file have to be read and which of their rows satisfy filters.
+    Row groups are skipped based on their statistics, only columns used by filters are read.
+
+    :param path: file path
+    :param filters: list of (column, operator, value) triples, operator is one of OPERATORS
+    :returns: list of (row group index, boolean array of its rows satisfying filters or None if all of them do)
+    """
+    file = pq.ParquetFile(path)
+    groups = list(range(file.num_row_groups))
+    if not filters:
+        return [(i, None) for i in groups]
+
+    for col, op, _ in filters:
+        assert op in OPERATORS, f"Unknown operator {op}"
+
+    stats = load_statistics(path)
+    if stats is not None and len(stats) == len(groups):
+        groups = [i for i in groups if may_match(stats[i], filters)]
+
+    cols = list(dict.fromkeys(col for col, _, _ in filters))
+    table = file.read_row_groups(groups, columns=cols, use_pandas_metadata=True)
+    mask = filter_mask(to_pandas(table, path), filters)
+    sizes = [file.metadata.row_group(i).num_rows for i in groups]
+    return list(zip(groups, np.split(mask, np.cumsum(sizes)[:-1])))
+
+
+def read_partition(
+    path: str, cols: List[str] = None, filters: List[Filter] = None
+) -> pd.DataFrame:
+    """
+    Reads a columnar file. Only the column chunks of cols are read from disk and decoded.
+    Row groups which statistics prove that none of their rows satisfies filters are skipped.
+
+    :param path: file path
+    :param cols: desired columns to be loaded, if None entire data is loaded
+    :param filters: list of (column, operator, value) triples, operator is one of OPERATORS
+    :returns: DataFrame with loaded data
+    """
+    if not filters:
+        table = pq.read_table(path, columns=cols, use_pandas_metadata=True)
+        return to_pandas(table, path)
+
+    plan = plan_partition(path, filters)
+    file = pq.ParquetFile(path)
+    table = file.read_row_groups(
+        [i for i, _ in plan], columns=cols, use_pandas_metadata=True
+    )
+    df = to_pandas(table, path)
+
+    mask = np.concatenate([mask for _, mask in plan] + [np.zeros(0, dtype=bool)])
+    return df.loc[mask].reset_index(drop=True)
+
+
+def read_cached(path: str) -> pd.DataFrame:
+    """
+    Reads a small table once per process, it is read again only if its file changes
+
+    :param path: file path
+    :returns: DataFrame with the table, it must not be modified
+    """
+    mtime = os.path.getmtime(path)
+    if path not in _cache or _cache[path][0] != mtime:
+        _cache[path] = (mtime, read_partition(path))
+    return _cache[path][1]
+
+
+def outdated(path: str, sources: List[str]) -> bool:
+    """
+    Checks whether a file derived from other files has to be written again
+
+    :param path: file path
+    :param sources: paths of the files it is derived from, missing ones are skipped
+    :returns: True if the file is missing or older than some of the sources
+    """
+    if not os.path.exists(path):
+        return True
+    mtimes = [os.path.getmtime(source) for source in sources if os.path.exists(source)]
+    return os.path.getmtime(path) < max(mtimes, default=0)
+
+
+def empty_partition(path: str, cols: List[str] = None) -> pd.DataFrame:
+    """
+    Creates an empty DataFrame with the columns and types a columnar file is read with, without reading any data
+
+    :param path: file path
+    :param cols: desired columns, if None all of them
+    :returns: empty DataFrame
+    """
+    df = to_pandas(pq.ParquetFile(path).schema_arrow.empty_table(), path)
+    return df if cols is None else df.loc[:, cols]
+
+
+def fill_partition(
+    path: str,
+    plan: List[Tuple[int, Any]],
+    columns: Dict[str, np.ndarray],
+    start: int,
+) -> None:
+    """
+    Copies rows of a columnar file into preallocated arrays, one row group at a time.
+    Categorical columns are copied as their codes.
+
+    :param path: file path
+    :param plan: row groups to be read and their rows satisfying filters, see plan_partition()
+    :param columns: mapping of column name into the array it is copied into
+    :param start: position of the first row of the file in the arrays
+    """
+    file = pq.ParquetFile(path)
+    for i, mask in plan:
+        table = file.read_row_group(i, columns=list(columns), use_pandas_metadata=True)
+        df = to_pandas(table, path)
+        stop = start + (len(df) if mask is None else int(mask.sum()))
+        for col, values in columns.items():
+            col_values = df[col].values
+            if isinstance(col_values, pd.Categorical):
+                col_values = col_values.codes
+            values[start:stop] = col_values if mask is None else col_values[mask]
+        start = stop
+
+
+def read_partitions(
+    paths: List[str],
+    cols: List[str] = None,
+    filters: List[Filter] = None,
+    threads: int = None,
+) -> pd.DataFrame:
+    """
+    Reads columnar files into a single DataFrame. Files are read in parallel threads, first only
+    to find out how many of their rows will be loaded, so that each output column is allocated
+    once and every file fills its own slice of it. Apart from the row group being copied,
+    data is held in memory only once.
+    Files which columns have different types, or which categorical columns aren't stored
+    as codes of the dataset wide dictionaries (e.g. ones migrated from the legacy format),
+    are read one by one and concatenated.
+
+    :param paths: file paths, rows are loaded in the same order
+    :param cols: desired columns to be loaded, if None entire data is loaded
+    :param filters: list of (column, operator, value) triples, operator is one of OPERATORS
+    :param threads: number of reading threads, if None os.cpu_count() is used
+    :returns: DataFrame with loaded data
+    """
+    assert len(paths) >= 1, "paths cannot be empty"
+    empty = [empty_partition(path, cols) for path in paths]
+    dtypes = empty[0].dtypes
+    preallocated = all(
+        df.dtypes.index.equals(dtypes.index)
+        and all(dtype == other for dtype, other in zip(df.dtypes, dtypes))
+        for df in empty
+    ) and all(isinstance(dtype, (np.dtype, pd.CategoricalDtype)) for dtype in dtypes)
+    # codes of categorical columns can be copied only if all the files share their dictionaries
+    encoded = [encoded_columns(path) for path in paths]
+    preallocated = preallocated and all(
+        col in encoded[0] and all(e.get(col) == encoded[0][col] for e in encoded)
+        for col, dtype in dtypes.items()
+        if isinstance(dtype, pd.CategoricalDtype)
+    )
+    if not preallocated:
+        return concatenate([read_partition(path, cols, filters) for path in paths])
+
+    with ThreadPool(threads) as p:
+        plans = p.starmap(plan_partition, [(path, filters) for path in paths])
+        sizes = [
+            sum(
+                pq.ParquetFile(path).metadata.row_group(i).num_rows
+                if mask is None
+                else int(mask.sum())
+                for i, mask in plan
+            )
+            for path, plan in zip(paths, plans)
+        ]
+        starts = np.cumsum([0] + sizes)
+
+        columns = {}
+        for col, dtype in dtypes.items():
+            if isinstance(dtype, pd.CategoricalDtype):
+                dtype = empty[0][col].cat.codes.dtype
+            columns[col] = np.empty(starts[-1], dtype=dtype)
+
+        p.starmap(
+            fill_partition,
+            [
+                (path, plan, columns, start)
+                for path, plan, start in zip(paths, plans, starts)
+            ],
+        )
+
+    for col, dtype in dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            columns[col] = pd.Categorical.from_codes(columns[col], dtype=dtype)
+    return pd.DataFrame(columns, copy=False)
@@ -0,0 +1,160 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from typing import List
+
+from .cube import fold, group_keys, rollup
+from .kernels import group_count, group_sum
+from .storage import list_partitions, read_partition, to_pandas, write_partition
+from .constants import (
+    DATASETS_FOLDER,
+    DAILY_EXTENSION,
+    DAILY_KEYS,
+    DAILY_MEASURES,
+)
+
+# columns of flights data the daily time series is built from
+DAILY_SOURCES = ["Arrival", "DayOfWeek"] + DAILY_MEASURES
+# ways the time series is resampled, see resample_daily()
+FREQUENCIES = ["day", "week", "month"]
+
+
+def daily_path(path: str) -> str:
+    """
+    Returns path of the file holding the daily time series of a year partition
+
+    :param path: columnar file path of the year
+    :returns: path to the time series file
+    """
+    return os.path.splitext(path)[0] + DAILY_EXTENSION
+
+
+def daily_columns() -> List[str]:
+    """
+    Lists measure columns of the daily time series, all of them are summed when it is merged
+
+    :returns: "count" and non empty count and sum of each of DAILY_MEASURES
+    """
+    return ["count"] + [
+        f"{col}_{kind}" for col in DAILY_MEASURES for kind in ["count", "sum"]
+    ]
+
+
+def day_ordinals(col: pd.Series) -> np.ndarray:
+    """
+    Turns datetimes into numbers of days since 1970-01-01, computed on the underlying integers
+
+    :param col: datetime column
+    :returns: int32 array, missing datetimes are the lowest int32
+    """
+    values = col.values.astype("datetime64[ns]")
+    days = values.astype("datetime64[D]").view(np.int64)
+    return np.where(np.isnat(values), np.iinfo(np.int32).min, days).astype(np.int32)
+
+
+def build_daily(flights: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rolls flights data up into its daily time series: flights arriving on every day by their
+    day of the week, so overnight flights make a day of their own. Flights which didn't arrive are skipped.
+
+    :param flights: DataFrame holding DAILY_SOURCES columns
+    :returns: DataFrame with DAILY_KEYS columns and daily_columns(), sorted by them
+    """
+    days = day_ordinals(flights["Arrival"])
+    known = days != np.iinfo(np.int32).min
+    keys = pd.DataFrame(
+        {"Day": days[known], "DayOfWeek": flights["DayOfWeek"].values[known]}
+    )
+    return rollup(keys, flights.loc[known, DAILY_MEASURES], daily_columns())
+
+
+def merge_daily(series: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Merges daily time series of separate parts of flights data into the time series of all of them
+
+    :param series: DataFrames returned by build_daily()
+    :raises: ValueError if there are no time series
+    :returns: merged time series, sorted by its keys
+    """
+    if len(series) == 0:
+        raise ValueError("No time series to merge")
+    daily = pd.concat(series, ignore_index=True)
+    ids, merged = group_keys(daily[DAILY_KEYS])
+    present = group_count(ids, len(merged)) > 0
+    for col in daily_columns():
+        sums = group_sum(ids, len(merged), daily[col].values)
+        merged[col] = sums.astype(daily[col].dtype)
+    merged = merged.loc[present].sort_values(DAILY_KEYS)
+    return merged.reset_index(drop=True)
+
+
+def write_daily(path: str) -> None:
+    """
+    Builds and saves the daily time series of a year partition written without it, one row group at a time
+
+    :param path: columnar file path of the year
+    """
+    file = pq.ParquetFile(path)
+    series = []
+    for i in range(file.num_row_groups):
+        table = file.read_row_group(i, columns=DAILY_SOURCES, use_pandas_metadata=True)
+        series = fold(series + [build_daily(to_pandas(table, path))], merge_daily)
+    write_partition(merge_daily(series), daily_path(path))
+
+
+def load_daily(
+    years: str | List[str] = "all", dir: str = DATASETS_FOLDER
+) -> pd.DataFrame:
+    """
+    Loads the daily time series stored for every year by prepare_data(), merged over years.
+    Data itself is not read, the series has a row for every day and day of the week.
+
+    :param years: "all" or list of years, see list_partitions()
+    :param dir: target data directory
+    :raises: ValueError if there are no years
+    :returns: DataFrame with DAILY_KEYS columns and daily_columns(), sorted by them
+    """
+    paths = list_partitions(years, dir)
+    return merge_daily([read_partition(daily_path(path)) for path in paths])
+
+
+def resample_daily(daily: pd.DataFrame, freq: str = "week") -> pd.DataFrame:
+    """
+    Sums the daily time series up over days, weeks starting on Monday or months
+
+    :param daily: DataFrame returned by load_daily()
+    :param freq: one of FREQUENCIES
+    :returns: DataFrame indexed by the first day of every period which has flights,
+        with daily_columns() and "mean" of each of DAILY_MEASURES
+    """
+    assert freq in FREQUENCIES, f"Unknown frequency {freq}"
+    days = daily["Day"].values.astype(np.int64)
+    if freq == "week":
+        # 1970-01-01 was a Thursday
+        starts = days - (days + 3) % 7
+    elif freq == "month":
+        months = days.astype("datetime64[D]").astype("datetime64[M]")
+        starts = months.astype("datetime64[D]").view(np.int64)
+    else:
+        starts = days
+
+    periods, ids = np.unique(starts, return_inverse=True)
+    resampled = pd.DataFrame(
+        {
+            col: group_sum(ids, len(periods), daily[col].values).astype(
+                daily[col].dtype
+            )
+            for col in daily_columns()
+        },
+        index=pd.DatetimeIndex(
+            periods.astype("datetime64[D]").astype("datetime64[ns]"), name=freq.title()
+        ),
+    )
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for col in DAILY_MEASURES:
+            resampled[f"{col}_mean"] = (
+                resampled[f"{col}_sum"] / resampled[f"{col}_count"]
+            )
+    return resampled